@@ -1,10 +1,16 @@
-import streamlit as st
-import pandas as pd
-from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
 import os
 import sys
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+import clock_utils
+import profile_utils
+import startup
+
+# pandas, plotly and Django load after the page shell is on screen, and
+# each section imports only the helpers it uses
+profiler = startup.start_run()
 
 st.set_page_config(
     page_title="Airport Operations Dashboard",
@@ -17,30 +23,46 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
+st.title("✈️ Airport Operations Dashboard")
+
+# sidebar
+st.sidebar.title("Navigation")
+section = st.sidebar.selectbox(
+    "Select Section:",
+    ["Overview", "Flights", "Passengers", "Aircraft", "Crew", "Financial", "Weather"]
+)
+profiler.mark("first_render")
+
+with profiler.stage("import pandas"):
+    import pandas as pd
+
+with profiler.stage("import chart_utils"):
+    from chart_utils import cached_figure
+
 DJANGO_AVAILABLE = False
 try:
-    import django
-    django.setup()
-    
-    from django.db import models
-    from django.utils import timezone as django_timezone
+    with profiler.stage("django.setup"):
+        import django
+        django.setup()
 
-    from flights.models import (
-        Airport, Route, Airline, Pilot, Flight, Passenger, Ticket,
-        Aircraft, CrewMember, FlightCrew, Gate, Runway, Baggage, 
-        Booking, Payment, DiscountCode, Maintenance, Delay, 
-        WeatherReport, SecurityCheck
-    )
-    
-    from flight_utils import update_flight_statuses, update_discount_codes
+    with profiler.stage("import models"):
+        from django.db import models
+        from django.utils import timezone as django_timezone
+
+        from flights.models import (
+            Airport, Route, Airline, Pilot, Flight, Passenger, Ticket,
+            Aircraft, CrewMember, FlightCrew, Gate, Runway, Baggage, 
+            Booking, Payment, DiscountCode, Maintenance, Delay, 
+            WeatherReport, SecurityCheck, SeatMap, FlightStatusEvent, CrewConflict, BaggageStatusCount, ProjectedDelay
+        )
+        # headline metrics read trigger-maintained counters, not COUNT(*)
+        from counter_utils import get_count, get_average, get_status_counts
     
     DJANGO_AVAILABLE = True
 except Exception as e:
     DJANGO_AVAILABLE = False
     st.sidebar.error(f"Django not available: {e}")
 
-st.title("✈️ Airport Operations Dashboard")
-
 def safe_query(query_func, default=None):
     try:
         return query_func()
@@ -48,44 +70,88 @@ def safe_query(query_func, default=None):
         st.error(f"Database error: {e}")
         return default
 
-# sidebar
-st.sidebar.title("Navigation")
+def current_time():
+    # the dashboard's "now": the wall clock, or a simulated one when
+    # DASHBOARD_CLOCK is set or a replay has installed it
+    return clock_utils.localnow() if DJANGO_AVAILABLE else datetime.now()
+
+def writes_enabled():
+    # the dashboard has no login, so controls that change data are shown
+    # only with DASHBOARD_WRITES=1; manage.py commands do the same otherwise
+    return os.environ.get("DASHBOARD_WRITES", "").lower() in ("1", "on", "true", "yes")
+
+def shared(key, query_func, ttl=60):
+    # query_func computed by one dashboard process and shared with the
+    # others through cache_utils
+    from cache_utils import get_or_compute
+    return lambda: get_or_compute(key, query_func, ttl)
+
+def shared_query(key, query_func, default=None, ttl=60):
+    return safe_query(shared(key, query_func, ttl), default)
+
+def start_panels(queries, timeout=10):
+    # runs a section's independent queries concurrently; read each one back
+    # with panel_query where the panel is drawn
+    from panel_utils import PanelQueries
+    return PanelQueries(queries, timeout)
+
+def panel_query(panels, name, default=None):
+    try:
+        return panels.result(name)
+    except TimeoutError:
+        st.error(f"Query timed out: {name}")
+        return default
+    except Exception as e:
+        st.error(f"Database error: {e}")
+        return default
+
 if DJANGO_AVAILABLE:
     st.sidebar.success("✅ Django Available")
 else:
     st.sidebar.warning("⚠️ Database Not Available")
 
-# update flight statuses and discount
-if DJANGO_AVAILABLE:
-    updated_count = update_flight_statuses()
-    update_discount_count = update_discount_codes()
-
-section = st.sidebar.selectbox(
-    "Select Section:",
-    ["Overview", "Flights", "Passengers", "Aircraft", "Crew", "Financial", "Weather"]
-)
+# opt-in sampling profiler around the section, DASHBOARD_PROFILE=1, or ?profile=1
+# where profile_utils allows it
+section_profiler = None
+if profile_utils.profiling_enabled(st.query_params):
+    section_profiler = profile_utils.start(section)
 
 # overview
 if section == "Overview":
     st.header("📊 System Overview")
     
+    def get_airline_flights():
+        airlines = Airline.objects.all()
+        data = []
+        for airline in airlines:
+            data.append({
+                'airline': airline.name,
+                'flights': airline.flights.count()
+            })
+        return pd.DataFrame(data)
+
+    overview = start_panels({
+        'flights': lambda: get_count(Flight),
+        'passengers': lambda: get_count(Passenger),
+        'airlines': lambda: get_count(Airline),
+        'airports': lambda: get_count(Airport),
+        'flight_status': lambda: get_status_counts(Flight),
+        'airline_flights': shared("overview:airline_flights", get_airline_flights),
+    })
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        flights_count = safe_query(lambda: Flight.objects.count(), 0)
-        st.metric("Total Flights", flights_count)
+        st.metric("Total Flights", panel_query(overview, 'flights', 0))
     
     with col2:
-        passengers_count = safe_query(lambda: Passenger.objects.count(), 0)
-        st.metric("Total Passengers", passengers_count)
+        st.metric("Total Passengers", panel_query(overview, 'passengers', 0))
     
     with col3:
-        airlines_count = safe_query(lambda: Airline.objects.count(), 0)
-        st.metric("Airlines", airlines_count)
+        st.metric("Airlines", panel_query(overview, 'airlines', 0))
     
     with col4:
-        airports_count = safe_query(lambda: Airport.objects.count(), 0)
-        st.metric("Airports", airports_count)
+        st.metric("Airports", panel_query(overview, 'airports', 0))
     
     st.divider()
     
@@ -93,57 +159,49 @@ if section == "Overview":
     # flight status diagram
     with col1:
         st.subheader("Flight Status")
-        def get_flight_status():
-            flights = Flight.objects.all()
-            status_counts = {}
-            for flight in flights:
-                status_counts[flight.status] = status_counts.get(flight.status, 0) + 1
-            return status_counts
-        
-        status_data = safe_query(get_flight_status, {})
+        status_data = panel_query(overview, 'flight_status', {})
         if status_data:
-            fig = px.pie(values=list(status_data.values()), names=list(status_data.keys()))
+            fig = cached_figure(
+                "pie", {'status': list(status_data.keys()), 'count': list(status_data.values())},
+                values='count', names='status'
+            )
             st.plotly_chart(fig, use_container_width=True)
     
     # top airlines
     with col2:
         st.subheader("Airlines by Flight Count")
-        def get_airline_flights():
-            airlines = Airline.objects.all()
-            data = []
-            for airline in airlines:
-                data.append({
-                    'airline': airline.name,
-                    'flights': airline.flights.count()
-                })
-            return pd.DataFrame(data)
-        
-        airline_data = safe_query(get_airline_flights, pd.DataFrame())
+        airline_data = panel_query(overview, 'airline_flights', pd.DataFrame())
         if not airline_data.empty:
-            fig = px.bar(airline_data.nlargest(10, 'flights'), x='airline', y='flights')
+            fig = cached_figure("bar", airline_data.nlargest(10, 'flights'), x='airline', y='flights')
             st.plotly_chart(fig, use_container_width=True)
 
 # Flights Section
 elif section == "Flights":
     st.header("🛫 Flight Operations")
+    if DJANGO_AVAILABLE:
+        from flight_utils import board_state_at
+        from seat_utils import get_occupancy
+        from archive_utils import with_history
+        from itinerary_utils import search_itineraries
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        date_filter = st.date_input("Select Date", datetime.now().date())
+        date_filter = st.date_input("Select Date", current_time().date())
     with col2:
         status_filter = st.selectbox("Status", ["All", "Scheduled", "Boarding", "In Flight", "Landed", "Delayed", "Cancelled"])
     with col3:
-        airport_filter = st.selectbox("Airport", ["All"] + list(safe_query(lambda: [airport.city for airport in Airport.objects.all()], [])))
+        airport_filter = st.selectbox("Airport", ["All"] + [airport['city'] for airport in safe_query(lambda: startup.get_reference_data()['airports'], [])])
     
     def get_flights_data():
-        flights = Flight.objects.filter(departure_time__date=date_filter)
+        flights = Flight.objects.filter(departure_time__date=date_filter).select_related('seat_map')
         if status_filter != "All":
             flights = flights.filter(status=status_filter)
         if airport_filter != "All":
             flights = flights.filter(route__departure_airport__code=airport_filter) | flights.filter(route__arrival_airport__code=airport_filter)
         
         data = []
-        for flight in flights:
+        # dates before the archive watermark also read archived flights
+        for flight in with_history(flights, django_timezone.make_aware(datetime.combine(date_filter, datetime.min.time()))):
             departure_time = flight.departure_time.strftime("%H:%M") if flight.departure_time else "N/A"
             arrival_time = flight.arrival_time.strftime("%H:%M") if flight.arrival_time else "N/A"
             data.append({
@@ -155,7 +213,8 @@ elif section == "Flights":
                 'departure': departure_time,
                 'arrival': arrival_time,
                 'status': flight.status,
-                'aircraft': flight.aircraft.registration_number if flight.aircraft else "N/A"
+                'aircraft': flight.aircraft.registration_number if flight.aircraft else "N/A",
+                'load_factor': f"{flight.seat_map.load_factor:.0%}" if hasattr(flight, 'seat_map') else "N/A"
             })
         return pd.DataFrame(data)
     
@@ -165,55 +224,153 @@ elif section == "Flights":
     else:
         st.info("No flight data available")
 
+    with st.expander("🧭 Itinerary Search"):
+        reference_airports = safe_query(lambda: startup.get_reference_data()['airports'], [])
+        airport_codes = {f"{airport['code']} - {airport['city']}": airport['id'] for airport in reference_airports}
+        airport_names = {airport['id']: airport['code'] for airport in reference_airports}
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            origin = st.selectbox("From", list(airport_codes), key="itinerary_from")
+        with col2:
+            destination = st.selectbox("To", list(airport_codes), index=min(1, len(airport_codes) - 1), key="itinerary_to")
+        with col3:
+            depart_time = st.time_input("Depart After", current_time().time().replace(second=0, microsecond=0), key="itinerary_time")
+
+        if DJANGO_AVAILABLE and origin and destination and origin != destination:
+            depart_after = django_timezone.make_aware(datetime.combine(date_filter, depart_time))
+            itineraries = safe_query(
+                lambda: search_itineraries(airport_codes[origin], airport_codes[destination], depart_after),
+                {}
+            )
+            for label, key in [("Earliest Arrival", "earliest_arrival"), ("Fewest Legs", "fewest_legs")]:
+                st.write(f"**{label}**")
+                legs = itineraries.get(key)
+                if legs:
+                    st.dataframe(pd.DataFrame([{
+                        'flight': leg['flight_number'],
+                        'from': airport_names.get(leg['from_airport_id']),
+                        'to': airport_names.get(leg['to_airport_id']),
+                        'departure': leg['departure_time'].strftime('%Y-%m-%d %H:%M'),
+                        'arrival': leg['arrival_time'].strftime('%Y-%m-%d %H:%M')
+                    } for leg in legs]), use_container_width=True, hide_index=True)
+                else:
+                    st.info("No connection within 48 hours")
+
+    with st.expander("🕑 Board State at a Point in Time"):
+        board_time = st.time_input("Time", current_time().time().replace(second=0, microsecond=0))
+        board_at = django_timezone.make_aware(datetime.combine(date_filter, board_time)) if DJANGO_AVAILABLE else None
+        board_data = pd.DataFrame(safe_query(lambda: board_state_at(board_at), []))
+        if not board_data.empty:
+            board_data['departure_time'] = board_data['departure_time'].dt.strftime('%H:%M')
+            board_data['arrival_time'] = board_data['arrival_time'].dt.strftime('%H:%M')
+            st.dataframe(board_data.drop(columns=['id']), use_container_width=True, hide_index=True)
+        else:
+            st.info("No flights around this time")
+
+    with st.expander("📜 Recent Status Changes"):
+        def get_status_events():
+            events = FlightStatusEvent.objects.select_related('flight').order_by('-id')[:20]
+            data = []
+            for event in events:
+                data.append({
+                    'flight': event.flight.flight_number,
+                    'from': event.old_status,
+                    'to': event.new_status,
+                    'cause': event.cause,
+                    'at': event.occurred_at.strftime('%Y-%m-%d %H:%M')
+                })
+            return pd.DataFrame(data)
+
+        status_events = safe_query(get_status_events, pd.DataFrame())
+        if not status_events.empty:
+            st.dataframe(status_events, use_container_width=True, hide_index=True)
+        else:
+            st.info("No status changes recorded yet")
+
+    st.subheader("🔗 Knock-on Delays")
+    def get_knock_on_delays():
+        projected = ProjectedDelay.objects.filter(
+            flight__departure_time__gte=current_time()
+        ).select_related('flight', 'source').order_by('-minutes')[:20]
+        data = []
+        for delay in projected:
+            data.append({
+                'flight': delay.flight.flight_number,
+                'departs': delay.flight.departure_time.strftime('%Y-%m-%d %H:%M'),
+                'projected': delay.minutes,
+                'via': delay.via,
+                'caused by': delay.source.flight_number,
+                'updated': delay.updated_at.strftime('%H:%M:%S')
+            })
+        return pd.DataFrame(data)
+
+    knock_on_delays = safe_query(get_knock_on_delays, pd.DataFrame())
+    if not knock_on_delays.empty:
+        st.dataframe(
+            knock_on_delays,
+            use_container_width=True,
+            hide_index=True,
+            column_config={'projected': st.column_config.NumberColumn('Projected Delay', format='%d min')}
+        )
+    else:
+        st.info("No delays are projected to carry over to later flights")
+
+    st.subheader("💺 Seat Occupancy")
+    occupancy_data = pd.DataFrame(safe_query(lambda: get_occupancy(date_filter), []))
+    if not occupancy_data.empty:
+        occupancy_data['load_factor'] = occupancy_data['load_factor'] * 100
+        fig = cached_figure(
+            "bar",
+            occupancy_data,
+            x='flight__flight_number',
+            y='load_factor',
+            hover_data=['seats_taken', 'capacity'],
+            labels={'flight__flight_number': 'Flight', 'load_factor': 'Load Factor (%)'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No seat maps for this date")
+
 # passengers section
 elif section == "Passengers":
+    if DJANGO_AVAILABLE:
+        from search_utils import search_passengers, get_passenger_details
+        from baggage_utils import BAGGAGE_STATUSES, find_flight, transition_flight_baggage
+        from security_utils import get_checkpoint_throughput, get_airport_throughput, get_uncleared_departures
     st.header("👤 Passenger Information")
     
-    now = django_timezone.now() if DJANGO_AVAILABLE else datetime.now()
+    now = current_time()
     
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Total Passengers", safe_query(lambda: Passenger.objects.count(), 0))
-    with col2:
-        # currently in flight
-        def get_passengers_in_sky():
-            current_flights = Flight.objects.filter(
-                departure_time__lte=now,
-                arrival_time__gte=now,
-                status__in=["In Flight"]
-            )
-            tickets = Ticket.objects.filter(flight__in=current_flights)
-            return tickets.values('passenger').distinct().count()
-        
-        in_sky_count = safe_query(get_passengers_in_sky, 0)
-        st.metric("Passengers in Sky", in_sky_count)
-    with col3:
-        # passengers with recently cancelled flights
-        def get_passengers_cancelled_flights():
-            week_ago = now - timedelta(days=7)
-            cancelled_flights = Flight.objects.filter(
-                status="Cancelled",
-                departure_time__gte=week_ago
-            )
-            tickets = Ticket.objects.filter(flight__in=cancelled_flights)
-            return tickets.values('passenger').distinct().count()
-        
-        cancelled_count = safe_query(get_passengers_cancelled_flights, 0)
-        st.metric("Recent Cancellations (7d)", cancelled_count)
+    # in flight now
+    def get_passengers_in_sky():
+        current_flights = Flight.objects.filter(
+            departure_time__lte=now,
+            arrival_time__gte=now,
+            status__in=["In Flight"]
+        )
+        tickets = Ticket.objects.filter(flight__in=current_flights)
+        return tickets.values('passenger').distinct().count()
+
+    # passengers with recently cancelled flights
+    def get_passengers_cancelled_flights():
+        week_ago = now - timedelta(days=7)
+        cancelled_flights = Flight.objects.filter(
+            status="Cancelled",
+            departure_time__gte=week_ago
+        )
+        tickets = Ticket.objects.filter(flight__in=cancelled_flights)
+        return tickets.values('passenger').distinct().count()
 
-    # current flights with passengers
-    st.subheader("🛫 Currently Flying Passengers")
-    
     def get_current_flights_data():
         current_flights = Flight.objects.filter(
             departure_time__lte=now,
             arrival_time__gte=now,
             status__in=["In Flight"]
-        ).select_related('route', 'route__departure_airport', 'route__arrival_airport')
+        ).select_related('route', 'route__departure_airport', 'route__arrival_airport', 'seat_map')
         
         data = []
         for flight in current_flights:
-            passenger_count = Ticket.objects.filter(flight=flight).count()
+            passenger_count = flight.seat_map.seats_taken if hasattr(flight, 'seat_map') else 0
             if passenger_count > 0:
                 data.append({
                     'flight_number': flight.flight_number,
@@ -225,14 +382,6 @@ elif section == "Passengers":
                 })
         return pd.DataFrame(data)
     
-    current_flights_data = safe_query(get_current_flights_data, pd.DataFrame())
-    if not current_flights_data.empty:
-        st.dataframe(current_flights_data, use_container_width=True)
-    else:
-        st.info("No flights currently in progress")
-
-    st.subheader("🏆 Top 10 Frequent Flyers")
-    
     def get_top_passengers():
         passengers = Passenger.objects.annotate(
             ticket_count=models.Count('ticket')
@@ -258,109 +407,176 @@ elif section == "Passengers":
             })
         return pd.DataFrame(data)
 
-    top_passengers_data = safe_query(get_top_passengers, pd.DataFrame())
+    passenger_panels = start_panels({
+        'total': lambda: get_count(Passenger),
+        'in_sky': get_passengers_in_sky,
+        'cancelled': get_passengers_cancelled_flights,
+        'current_flights': get_current_flights_data,
+        'top_passengers': get_top_passengers,
+    })
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Passengers", panel_query(passenger_panels, 'total', 0))
+    with col2:
+        st.metric("Passengers in Sky", panel_query(passenger_panels, 'in_sky', 0))
+    with col3:
+        st.metric("Recent Cancellations (7d)", panel_query(passenger_panels, 'cancelled', 0))
+
+    st.subheader("🔍 Passenger Lookup")
+    search_query = st.text_input("Name, passport, flight or ticket/booking reference (e.g. T123, B45)")
+    if search_query.strip():
+        search_results = safe_query(lambda: search_passengers(search_query), [])
+        if search_results:
+            results_df = pd.DataFrame(search_results)
+            st.dataframe(results_df.drop(columns=['id']), use_container_width=True, hide_index=True)
+            
+            choices = {f"{result['name']} ({result['passport_number']})": result['id'] for result in search_results}
+            selected = st.selectbox("Show details for", list(choices))
+            details = safe_query(lambda: get_passenger_details(choices[selected]), {})
+            for title, key in [("Tickets", "tickets"), ("Baggage", "baggage"), ("Security Checks", "security_checks")]:
+                if details.get(key):
+                    st.write(f"**{title}**")
+                    st.dataframe(pd.DataFrame(details[key]), use_container_width=True, hide_index=True)
+        else:
+            st.info("No matching passengers")
+
+    # current flights with passengers
+    st.subheader("🛫 Currently Flying Passengers")
+    
+    current_flights_data = panel_query(passenger_panels, 'current_flights', pd.DataFrame())
+    if not current_flights_data.empty:
+        st.dataframe(current_flights_data, use_container_width=True)
+    else:
+        st.info("No flights currently in progress")
+
+    st.subheader("🏆 Top 10 Frequent Flyers")
+    
+    top_passengers_data = panel_query(passenger_panels, 'top_passengers', pd.DataFrame())
     if not top_passengers_data.empty:
         st.dataframe(top_passengers_data, use_container_width=True)
 
-        fig = px.bar(
+        fig = cached_figure(
+            "bar",
             top_passengers_data, 
             x='name', 
             y='total_tickets',
             title="Top Passengers by Number of Flights",
             color='status',
-            color_discrete_map={"Frequent Flyer": "#03E7F3", "Regular": "#F3FB0E"}
+            color_discrete_map={"Frequent Flyer": "#03E7F3", "Regular": "#F3FB0E"},
+            layout={'xaxis_title': "Passenger", 'yaxis_title': "Number of Flights"}
         )
-        fig.update_layout(xaxis_title="Passenger", yaxis_title="Number of Flights")
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("No passenger data available")
 
     # security
-    st.subheader("🔒 Security Check Status")
+    st.subheader("🔒 Security Checkpoints")
+    live_security = st.toggle("Live refresh (every 5 s)", key="security_live")
 
-    def get_security_check_data():
-        security_checks = SecurityCheck.objects.select_related('passenger', 'flight')
-        
-        status_counts = security_checks.values('status').annotate(
-            count=models.Count('id')
-        ).order_by('status')
-        
-        detailed_data = []
-        for check in security_checks[:10]:  
-            detailed_data.append({
-                'passenger': f"{check.passenger.first_name} {check.passenger.last_name}",
-                'flight': check.flight.flight_number,
-                'status': check.status,
-                'checked_at': check.checked_at.strftime('%Y-%m-%d %H:%M')
-            })
-        
-        return status_counts, pd.DataFrame(detailed_data)
+    # only this fragment re-runs on the timer; it reads the 5-minute
+    # counters, never the raw SecurityCheck table
+    @st.fragment(run_every="5s" if live_security else None)
+    def security_panel():
+        window_hours = st.slider("Window (hours)", 1, 12, 2, key="security_window")
+        window = timedelta(hours=window_hours)
+        throughput = safe_query(lambda: get_checkpoint_throughput(window), pd.DataFrame())
+        last_hour = safe_query(lambda: get_checkpoint_throughput(timedelta(hours=1)), pd.DataFrame())
+        departures = safe_query(get_uncleared_departures, pd.DataFrame())
 
-    security_status, security_details = safe_query(
-        lambda: get_security_check_data(), 
-        ([], pd.DataFrame())
-    )
+        col1, col2, col3, col4 = st.columns(4)
+        if not last_hour.empty:
+            hour_checks = int(last_hour['checks'].sum())
+            additional = int(last_hour['additional_screening'].sum())
+            col1.metric("Checks (last 5 min)", int(last_hour['checks'].iloc[-1]))
+            col2.metric("Checks (last hour)", hour_checks)
+            col3.metric("Additional Screening", f"{additional / hour_checks:.0%}" if hour_checks else "0%")
+        col4.metric("Not Cleared, Departing ≤ 1h", int(departures['not_cleared'].sum()) if not departures.empty else 0)
+
+        if not throughput.empty and throughput['checks'].sum() > 0:
+            chart_data = throughput.melt(
+                id_vars='bucket_start',
+                value_vars=['cleared', 'pending', 'additional_screening'],
+                var_name='status', value_name='count'
+            )
+            fig = cached_figure(
+                "bar", chart_data, x='bucket_start', y='count', color='status',
+                title=f"Checks per 5 Minutes (last {window_hours}h)",
+                color_discrete_map={'cleared': '#00ff00', 'pending': '#ffff00', 'additional_screening': '#ff0000'},
+                layout={'xaxis_title': "Time", 'yaxis_title': "Checks"}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info(f"No security checks in the last {window_hours}h")
+
+        airports = safe_query(lambda: get_airport_throughput(window), pd.DataFrame())
+        if not airports.empty:
+            with st.expander("🛫 Throughput by Airport"):
+                airports['additional_share'] = airports['additional_share'].map(lambda share: f"{share:.0%}")
+                st.dataframe(airports, use_container_width=True, hide_index=True)
+        if not departures.empty:
+            with st.expander("⏳ Departures Within the Hour"):
+                st.dataframe(departures, use_container_width=True, hide_index=True)
+
+    security_panel()
+
+    with st.expander("📋 Show Recent Security Checks"):
+        def get_recent_security_checks():
+            checks = SecurityCheck.objects.select_related('passenger', 'flight').order_by('-id')[:10]
+            return pd.DataFrame([
+                {
+                    'passenger': f"{check.passenger.first_name} {check.passenger.last_name}",
+                    'flight': check.flight.flight_number,
+                    'status': check.status,
+                    'checked_at': check.checked_at.strftime('%Y-%m-%d %H:%M')
+                }
+                for check in checks
+            ])
+
+        st.dataframe(safe_query(get_recent_security_checks, pd.DataFrame()), use_container_width=True)
 
-    if security_status:
-        status_df = pd.DataFrame(list(security_status))
-        if not status_df.empty:
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                fig = px.pie(
-                    status_df, 
-                    values='count', 
-                    names='status',
-                    title="Security Check Status Distribution (All Time)",
-                    color='status',
-                    color_discrete_map={
-                        'Cleared': '#00ff00',
-                        'Pending': '#ffff00', 
-                        'Additional Screening Required': '#ff0000'
-                    }
-                )
-                fig.update_traces(textposition='inside', textinfo='percent+label')
-                st.plotly_chart(fig, use_container_width=True)
-            
-            with col2:
-                st.write("**Status Summary**")
-                total_checks = sum(status['count'] for status in security_status)
-                st.metric("Total Security Checks", total_checks)
-                st.write("---")
-                for status in security_status:
-                    color = "🟢" if status['status'] == "Cleared" else "🟡" if status['status'] == "Pending" else "🔴"
-                    st.write(f"{color} {status['status']}: {status['count']}")
-        
-        if not security_details.empty:
-            with st.expander("📋 Show Recent Security Checks"):
-                st.dataframe(security_details, use_container_width=True)
-    else:
-        st.info("No security check data available")
-        
     # baggage info
     st.subheader("💼 Baggage Tracking - Current Flights")
     
+    if writes_enabled():
+        with st.expander("🧳 Move Baggage for a Flight"):
+            col1, col2 = st.columns(2)
+            with col1:
+                bag_flight_number = st.text_input("Flight number", key="baggage_flight")
+            with col2:
+                bag_status = st.selectbox("Move all eligible bags to", BAGGAGE_STATUSES[1:], key="baggage_status")
+            if st.button("Move bags") and bag_flight_number:
+                def move_flight_baggage():
+                    flight = find_flight(bag_flight_number, now)
+                    if flight is None:
+                        return None
+                    return transition_flight_baggage(flight, bag_status)
+
+                moved = safe_query(move_flight_baggage, None)
+                if moved is None:
+                    st.warning(f"Flight {bag_flight_number} not found")
+                else:
+                    st.success(f"Moved {moved} bags to {bag_status}")
+
     def get_current_baggage_data():
-        current_flights = Flight.objects.filter(
-            departure_time__lte=now,
-            arrival_time__gte=now,
-            status__in=["In Flight", "Delayed"]
+        # one query over the per-flight counters instead of loading every bag
+        rows = BaggageStatusCount.objects.filter(
+            flight__departure_time__lte=now,
+            flight__arrival_time__gte=now,
+            flight__status__in=["In Flight", "Delayed"],
+            count__gt=0,
+        ).values_list(
+            'flight__flight_number', 'flight__route__departure_airport__city',
+            'flight__route__arrival_airport__city', 'status', 'count'
         )
-        current_tickets = Ticket.objects.filter(flight__in=current_flights)
-        baggage = Baggage.objects.filter(
-            ticket__in=current_tickets
-        ).select_related('ticket__passenger', 'ticket__flight')[:20]
-        
-        data = []
-        for bag in baggage:
-            data.append({
-                'passenger': f"{bag.ticket.passenger.first_name} {bag.ticket.passenger.last_name}",
-                'flight': bag.ticket.flight.flight_number,
-                'route': f"{bag.ticket.flight.route.departure_airport.city} → {bag.ticket.flight.route.arrival_airport.city}",
-                'weight': f"{bag.weight}kg",
-                'status': bag.status
-            })   
-        return pd.DataFrame(data)
+        data = pd.DataFrame(list(rows), columns=['flight', 'from', 'to', 'status', 'count'])
+        if data.empty:
+            return data
+        data['route'] = data['from'] + " → " + data['to']
+        table = data.pivot_table(index=['flight', 'route'], columns='status', values='count', aggfunc='sum', fill_value=0)
+        table = table.reindex(columns=[status for status in BAGGAGE_STATUSES if status in table.columns])
+        table['total'] = table.sum(axis=1)
+        return table.reset_index()
     
     baggage_data = safe_query(get_current_baggage_data, pd.DataFrame())
     if not baggage_data.empty:
@@ -370,17 +586,20 @@ elif section == "Passengers":
 
 # Aircraft Section
 elif section == "Aircraft":
+    if DJANGO_AVAILABLE:
+        from availability_utils import find_available_aircraft
+        from rotation_utils import get_rotation_analytics
     st.header("✈️ Aircraft & Maintenance")
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total Aircraft", safe_query(lambda: Aircraft.objects.count(), 0))
+        st.metric("Total Aircraft", safe_query(lambda: get_count(Aircraft), 0))
     with col2:
-        st.metric("In Maintenance", safe_query(lambda: Maintenance.objects.filter(status="In Progress").count(), 0))
+        st.metric("In Maintenance", safe_query(lambda: get_count(Maintenance, "In Progress"), 0))
     with col3:
-        st.metric("Gates", safe_query(lambda: Gate.objects.count(), 0))
+        st.metric("Gates", safe_query(lambda: get_count(Gate), 0))
     with col4:
-        st.metric("Runways", safe_query(lambda: Runway.objects.count(), 0))
+        st.metric("Runways", safe_query(lambda: get_count(Runway), 0))
     
     def get_aircraft_data():
         aircrafts = Aircraft.objects.all()
@@ -398,6 +617,36 @@ elif section == "Aircraft":
     if not aircraft_data.empty:
         st.dataframe(aircraft_data, use_container_width=True)
     
+    st.subheader("🔎 Find Available Aircraft")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        airline_options = {airline['name']: airline['id'] for airline in safe_query(lambda: startup.get_reference_data()['airlines'], [])}
+        airline_choice = st.selectbox("Airline", ["All"] + list(airline_options))
+    with col2:
+        min_capacity = st.number_input("Min Capacity", min_value=0, value=0, step=10)
+    with col3:
+        window_date = st.date_input("From", current_time().date())
+        window_time = st.time_input("At", current_time().time().replace(second=0, microsecond=0))
+    with col4:
+        window_hours = st.number_input("Hours", min_value=1, value=4)
+
+    if DJANGO_AVAILABLE:
+        window_from = django_timezone.make_aware(datetime.combine(window_date, window_time))
+        available_aircraft = pd.DataFrame(safe_query(lambda: find_available_aircraft(
+            window_from,
+            window_from + timedelta(hours=window_hours),
+            airline_options.get(airline_choice),
+            min_capacity
+        ), []))
+        if not available_aircraft.empty:
+            st.dataframe(
+                available_aircraft[['registration_number', 'model', 'capacity']],
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.info("No aircraft available in this window")
+
     st.subheader("Maintenance Records")
     def get_maintenance_data():
         maintenance = Maintenance.objects.all().select_related('aircraft')[:20]
@@ -415,17 +664,45 @@ elif section == "Aircraft":
     if not maintenance_data.empty:
         st.dataframe(maintenance_data, use_container_width=True)   
 
+    st.subheader("🔄 Utilisation & Rotations")
+    window_days = st.selectbox("Window", [7, 30, 90, 365], format_func=lambda days: f"Last {days} days")
+    window_end = current_time()
+    rotation_summary, rotation_issues = safe_query(
+        lambda: get_rotation_analytics(window_end - timedelta(days=window_days), window_end),
+        (pd.DataFrame(), pd.DataFrame())
+    )
+    if not rotation_summary.empty:
+        fig = cached_figure(
+            "bar",
+            rotation_summary.head(20),
+            x='registration',
+            y='utilisation_pct',
+            color='block_hours',
+            hover_data=['flights', 'avg_turnaround_hours', 'overlaps', 'airport_mismatches'],
+            labels={'registration': 'Aircraft', 'utilisation_pct': 'Utilisation (%)', 'block_hours': 'Block Hours'},
+            title="Top 20 Aircraft by Utilisation"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        
+        if not rotation_issues.empty:
+            with st.expander(f"🚩 Impossible Sequences ({len(rotation_issues)})"):
+                st.dataframe(rotation_issues, use_container_width=True, hide_index=True)
+    else:
+        st.info("No flights with an assigned aircraft in this window")
+
 # Crew Section
 elif section == "Crew":
+    if DJANGO_AVAILABLE:
+        from crew_utils import detect_crew_conflicts, get_crew_conflicts
     st.header("👨‍✈️ Crew Management")
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total Crew", safe_query(lambda: CrewMember.objects.count(), 0))
+        st.metric("Total Crew", safe_query(lambda: get_count(CrewMember), 0))
     with col2:
-        st.metric("Pilots", safe_query(lambda: Pilot.objects.count(), 0))
+        st.metric("Pilots", safe_query(lambda: get_count(Pilot), 0))
     with col3:
-        st.metric("Active Assignments", safe_query(lambda: FlightCrew.objects.count(), 0))
+        st.metric("Active Assignments", safe_query(lambda: get_count(FlightCrew), 0))
     
     st.subheader("🏆 Top 10 Pilots by Flight Hours")
     
@@ -462,7 +739,8 @@ elif section == "Crew":
     top_pilots_data = safe_query(get_top_pilots_by_hours, pd.DataFrame())
     
     if not top_pilots_data.empty:
-        fig = px.bar(
+        fig = cached_figure(
+            "bar",
             top_pilots_data,
             x='Total Hours',
             y='Pilot',
@@ -471,9 +749,9 @@ elif section == "Crew":
             labels={'Total Hours': 'Total Flight Hours', 'Pilot': 'Pilot'},
             color='Total Hours',
             color_continuous_scale='viridis',
-            hover_data=['Airline', 'Flights', 'Avg Hours per Flight']
+            hover_data=['Airline', 'Flights', 'Avg Hours per Flight'],
+            layout={'showlegend': False, 'height': 400}
         )
-        fig.update_layout(showlegend=False, height=400)
         st.plotly_chart(fig, use_container_width=True)
         
         st.dataframe(
@@ -513,7 +791,8 @@ elif section == "Crew":
     top_cabin_crew_data = safe_query(get_top_cabin_crew, pd.DataFrame())
     
     if not top_cabin_crew_data.empty:
-        fig = px.bar(
+        fig = cached_figure(
+            "bar",
             top_cabin_crew_data,
             x='flight_count',
             y='crew_member',
@@ -521,9 +800,9 @@ elif section == "Crew":
             title="Top Cabin Crew by Number of Flights",
             labels={'flight_count': 'Number of Flights', 'crew_member': 'Crew Member'},
             color='flight_count',
-            color_continuous_scale='plasma'
+            color_continuous_scale='plasma',
+            layout={'showlegend': False, 'height': 400}
         )
-        fig.update_layout(showlegend=False, height=400)
         st.plotly_chart(fig, use_container_width=True)
         
         st.dataframe(
@@ -539,18 +818,45 @@ elif section == "Crew":
     else:
         st.info("No cabin crew flight data available")
 
+    st.subheader("⚠️ Double-Booked Crew")
+    if st.button("Rescan Assignments"):
+        safe_query(detect_crew_conflicts, 0)
+
+    crew_conflicts = pd.DataFrame(safe_query(get_crew_conflicts, []))
+    if not crew_conflicts.empty:
+        st.metric("Overlapping Assignments", safe_query(lambda: get_count(CrewConflict), 0))
+        st.dataframe(
+            crew_conflicts,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'person': 'Name',
+                'type': 'Type',
+                'flight': 'Flight',
+                'departure': 'Departure',
+                'conflicting_flight': 'Overlaps With',
+                'conflicting_departure': 'Its Departure',
+                'overlap_minutes': st.column_config.NumberColumn('Overlap', format='%d min')
+            }
+        )
+    else:
+        st.info("No overlapping crew assignments")
+
 # Financial Section
 elif section == "Financial":
+    if DJANGO_AVAILABLE:
+        from revenue_utils import DIMENSIONS, get_dimension_values, get_revenue_total, query_cube
+        from pricing_utils import get_active_codes, quote_fares
     st.header("💰 Financial Dashboard")
     
     def get_financial_data():
-        total_revenue = sum(float(payment.amount) for payment in Payment.objects.all())
-        total_bookings = Booking.objects.count()
-        active_discounts = DiscountCode.objects.filter(valid_until__gte=datetime.now().date()).count()
+        total_revenue = float(get_revenue_total())
+        total_bookings = get_count(Booking)
+        active_discounts = len(get_active_codes(current_time().date()))
         avg_booking_value = total_revenue / total_bookings if total_bookings > 0 else 0
         return total_revenue, total_bookings, active_discounts, avg_booking_value
     
-    revenue, bookings, discounts, avg_value = safe_query(get_financial_data, (0, 0, 0, 0))
+    revenue, bookings, discounts, avg_value = shared_query("financial:totals", get_financial_data, (0, 0, 0, 0))
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -559,6 +865,53 @@ elif section == "Financial":
         st.metric("Total Bookings", bookings)
     with col3:
         st.metric("Active Discounts", discounts)
+
+    st.subheader("📊 Revenue Explorer")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        revenue_from = st.date_input("From", current_time().date() - timedelta(days=30), key="revenue_from")
+        revenue_to = st.date_input("To", current_time().date(), key="revenue_to")
+    with col2:
+        revenue_airlines = {airline['name']: airline['id'] for airline in safe_query(lambda: startup.get_reference_data()['airlines'], [])}
+        airline_choice = st.multiselect("Airlines", list(revenue_airlines), key="revenue_airlines")
+    with col3:
+        method_choice = st.multiselect("Methods", safe_query(lambda: get_dimension_values("method"), []))
+        status_choice = st.multiselect("Booking Status", safe_query(lambda: get_dimension_values("booking status"), []))
+    with col4:
+        dimensions = list(DIMENSIONS) if DJANGO_AVAILABLE else []
+        group_by = st.selectbox("Group by", dimensions)
+        split_by = st.selectbox("Split by", ["None"] + [name for name in dimensions if name != group_by])
+
+    if DJANGO_AVAILABLE and group_by:
+        cube_by = (group_by,) if split_by == "None" else (group_by, split_by)
+        revenue_cube = safe_query(lambda: query_cube(
+            by=cube_by,
+            start=revenue_from,
+            end=revenue_to,
+            airline=[revenue_airlines[name] for name in airline_choice],
+            method=method_choice,
+            booking_status=status_choice,
+        ), pd.DataFrame())
+        if not revenue_cube.empty:
+            chart_data = revenue_cube.astype({name: str for name in cube_by})
+            fig = cached_figure(
+                "bar",
+                chart_data,
+                x=group_by,
+                y='revenue',
+                color=None if split_by == "None" else split_by,
+                labels={'revenue': 'Revenue ($)'},
+                title=f"Revenue by {group_by}" + ("" if split_by == "None" else f" and {split_by}")
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(
+                revenue_cube.drop(columns=['revenue_cents']),
+                use_container_width=True,
+                hide_index=True,
+                column_config={'revenue': st.column_config.NumberColumn('Revenue', format='$%.2f')}
+            )
+        else:
+            st.info("No revenue for this selection")
     
     col1, col2 = st.columns(2)
     
@@ -578,7 +931,7 @@ elif section == "Financial":
                 })
             return pd.DataFrame(data)
         
-        payments_data = safe_query(get_recent_payments, pd.DataFrame())
+        payments_data = shared_query("financial:recent_payments", get_recent_payments, pd.DataFrame())
         
         if not payments_data.empty:
             styled_payments = payments_data.style.set_properties(**{
@@ -600,20 +953,20 @@ elif section == "Financial":
         st.subheader("🎫 Active Discount Codes")
         
         def get_active_discounts():
-            discounts = DiscountCode.objects.filter(valid_until__gte=datetime.now().date())
+            today = current_time().date()
+            airline_names = {airline['id']: airline['name'] for airline in startup.get_reference_data()['airlines']}
             data = []
-            for discount in discounts:
-                days_valid = (discount.valid_until - datetime.now().date()).days
+            for discount in get_active_codes(today).itertuples():
                 data.append({
                     'Code': discount.code,
-                    'Discount': f"{discount.discount_percent}%",
+                    'Discount': f"{discount.percent}%",
                     'Valid Until': discount.valid_until.strftime("%Y-%m-%d"),
-                    'Days Left': days_valid,
-                    'Airline': discount.airline.name if discount.airline else "All"
+                    'Days Left': (discount.valid_until - today).days,
+                    'Airline': airline_names.get(discount.airline_id, "All")
                 })
             return pd.DataFrame(data)
         
-        discounts_data = safe_query(get_active_discounts, pd.DataFrame())
+        discounts_data = shared_query("financial:active_discounts", get_active_discounts, pd.DataFrame())
         
         if not discounts_data.empty:
             def color_days_left(days):
@@ -637,19 +990,61 @@ elif section == "Financial":
         else:
             st.info("No active discount codes")
 
+    st.subheader("🏷️ Fare Quotes")
+    col1, col2 = st.columns(2)
+    with col1:
+        quote_code = st.text_input("Discount code", key="quote_code")
+    with col2:
+        quote_airlines = {airline['name']: airline['id'] for airline in safe_query(lambda: startup.get_reference_data()['airlines'], [])}
+        quote_airline = st.selectbox("Airline", ["All"] + list(quote_airlines), key="quote_airline")
+
+    def get_fare_quotes():
+        departures = Flight.objects.filter(departure_time__gte=current_time()).order_by('departure_time')
+        if quote_airline != "All":
+            departures = departures.filter(airline_id=quote_airlines[quote_airline])
+        departures = list(departures.values_list('id', 'flight_number', 'departure_time')[:20])
+        quotes = quote_fares([(flight_id, quote_code) for flight_id, _, _ in departures])
+        quotes['Flight'] = [flight_number for _, flight_number, _ in departures]
+        quotes['Departure'] = [departure.strftime("%Y-%m-%d %H:%M") for _, _, departure in departures]
+        return quotes
+
+    if DJANGO_AVAILABLE:
+        fare_quotes = safe_query(get_fare_quotes, pd.DataFrame())
+        if not fare_quotes.empty:
+            if quote_code:
+                status = fare_quotes['code_status'].value_counts().idxmax()
+                (st.success if status == "valid" else st.warning)(f"{quote_code.strip().upper()}: {status}")
+            st.dataframe(
+                fare_quotes[['Flight', 'Departure', 'base_fare', 'discount_percent', 'price']],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    'base_fare': 'Base Fare',
+                    'discount_percent': st.column_config.NumberColumn('Discount', format='%d%%'),
+                    'price': 'Price'
+                }
+            )
+        else:
+            st.info("No upcoming departures to quote")
+
 # Weather Section
 elif section == "Weather":
     st.header("🌤️ Weather & Delays")
     
+    weather_counts = safe_query(lambda: {
+        'delays': get_count(Delay),
+        'avg_delay': get_average(Delay),
+        'reports': get_count(WeatherReport),
+    }, {})
+    total_delays = weather_counts.get('delays', 0)
+    
     col1, col2, col3 = st.columns(3)
     with col1:
-        total_delays = safe_query(lambda: Delay.objects.count(), 0)
         st.metric("Total Delays", total_delays)
     with col2:
-        avg_delay = safe_query(lambda: Delay.objects.aggregate(avg=models.Avg('minutes_delayed'))['avg'] or 0, 0)
-        st.metric("Avg Delay (min)", f"{avg_delay:.1f}")
+        st.metric("Avg Delay (min)", f"{weather_counts.get('avg_delay', 0):.1f}")
     with col3:
-        st.metric("Weather Reports", safe_query(lambda: WeatherReport.objects.count(), 0))
+        st.metric("Weather Reports", weather_counts.get('reports', 0))
     
     
     st.subheader("🌡️ Current Weather Conditions")
@@ -676,7 +1071,7 @@ elif section == "Weather":
                 })
         return pd.DataFrame(current_weather)
     
-    current_weather_data = safe_query(get_current_weather, pd.DataFrame())
+    current_weather_data = shared_query("weather:current", get_current_weather, pd.DataFrame())
     
     if not current_weather_data.empty:
         def color_conditions(condition):
@@ -701,6 +1096,27 @@ elif section == "Weather":
         )
     else:
         st.info("No current weather data available")
+
+    st.subheader("📈 Temperature History")
+
+    def get_temperature_history():
+        reports = WeatherReport.objects.values_list('timestamp', 'airport__city', 'temperature').order_by('timestamp')
+        return pd.DataFrame(list(reports.iterator(chunk_size=20000)), columns=['timestamp', 'city', 'temperature'])
+
+    temperature_history = shared_query("weather:temperature_history", get_temperature_history, pd.DataFrame())
+    if not temperature_history.empty:
+        # long histories are downsampled per city and drawn with WebGL
+        fig = cached_figure(
+            "line",
+            temperature_history,
+            x='timestamp',
+            y='temperature',
+            color='city',
+            labels={'timestamp': 'Time', 'temperature': 'Temperature (°C)', 'city': 'City'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No weather history available")
     
     if total_delays > 0:
         st.subheader("📊 Delay Analysis")
@@ -723,17 +1139,19 @@ elif section == "Weather":
                     })
                 return pd.DataFrame(data)
             
-            delay_reasons = safe_query(get_delay_reasons, pd.DataFrame())
+            delay_reasons = shared_query("weather:delay_reasons", get_delay_reasons, pd.DataFrame())
             
             if not delay_reasons.empty:
-                fig = px.pie(
+                from plotly.express.colors import qualitative
+                fig = cached_figure(
+                    "pie",
                     delay_reasons,
                     values='Count',
                     names='Reason',
                     title="Delay Reasons Distribution",
-                    color_discrete_sequence=px.colors.qualitative.Set3
+                    color_discrete_sequence=qualitative.Set3,
+                    layout={'height': 300}
                 )
-                fig.update_layout(height=300)
                 st.plotly_chart(fig, use_container_width=True)
         
         with col2:
@@ -750,9 +1168,88 @@ elif section == "Weather":
                     })
                 return pd.DataFrame(data)
             
-            recent_delays = safe_query(get_recent_delays, pd.DataFrame())
+            recent_delays = shared_query("weather:recent_delays", get_recent_delays, pd.DataFrame())
             if not recent_delays.empty:
                 st.dataframe(recent_delays, use_container_width=True, hide_index=True)    
+
+        st.subheader("🌧️ Weather Impact")
+        tolerance_hours = st.selectbox(
+            "Match each delay with the latest departure-airport report within",
+            [1, 3, 6, 12, 24], index=1, format_func=lambda hours: f"{hours} h"
+        )
+        if DJANGO_AVAILABLE:
+            from weather_utils import get_weather_impact
+            impact = shared_query(
+                f"weather:impact:{tolerance_hours}",
+                lambda: get_weather_impact(tolerance=pd.Timedelta(hours=tolerance_hours)),
+                pd.DataFrame()
+            )
+            if not impact.empty:
+                conditions = impact[impact['dimension'] == 'conditions']
+                unmatched = conditions.loc[conditions['band'] == "No report", 'delays'].sum()
+                st.caption(f"{100 - unmatched / conditions['delays'].sum() * 100:.0f}% of delays have a report in range")
+                for tab, dimension in zip(st.tabs(["Conditions", "Visibility", "Wind"]), ['conditions', 'visibility', 'wind']):
+                    with tab:
+                        stats = impact[impact['dimension'] == dimension].drop(columns=['dimension'])
+                        fig = cached_figure(
+                            "bar",
+                            stats,
+                            x='band',
+                            y='avg_minutes',
+                            hover_data=['delays', 'median_minutes', 'p90_minutes', 'long_delay_pct'],
+                            labels={'band': dimension.title(), 'avg_minutes': 'Avg Delay (min)'},
+                            layout={'height': 300}
+                        )
+                        st.plotly_chart(fig, use_container_width=True)
+                        st.dataframe(stats, use_container_width=True, hide_index=True)
           
+if section_profiler is not None:
+    profile_key, profile_top, profile_paths = profile_utils.finish(section_profiler)
+    with st.sidebar.expander("🔬 Section Profile", expanded=True):
+        st.caption(f"{profile_key}: {profile_paths['svg']}")
+        st.dataframe(
+            pd.DataFrame(profile_top),
+            hide_index=True,
+            column_config={
+                'self_pct': st.column_config.NumberColumn('Self %', format='%.1f'),
+                'total_pct': st.column_config.NumberColumn('Total %', format='%.1f'),
+            }
+        )
+
 st.divider()
-st.caption("Airport Operations Dashboard • Built with Streamlit & Django")
\ No newline at end of file
+st.caption("Airport Operations Dashboard • Built with Streamlit & Django")
+
+# maintenance runs after the section has rendered, off the script thread;
+# the leases keep it to one process at a time
+if DJANGO_AVAILABLE and startup.maintenance_enabled():
+    from flight_utils import update_flight_statuses, update_discount_codes
+    from lease_utils import run_exclusive
+    from revenue_utils import refresh_revenue_cube
+
+    def run_maintenance():
+        run_exclusive("update_flight_statuses", update_flight_statuses)
+        run_exclusive("update_discount_codes", update_discount_codes)
+        run_exclusive("refresh_revenue_cube", refresh_revenue_cube)
+
+    startup.run_in_background("maintenance", run_maintenance)
+
+startup.finish_run(profiler)
+
+if DJANGO_AVAILABLE:
+    # reference data and in-memory indexes for later reruns and sessions
+    startup.start_prewarm()
+
+if DJANGO_AVAILABLE:
+    from lease_utils import get_lease_metrics
+    with st.sidebar.expander("Maintenance jobs"):
+        lease_metrics = safe_query(get_lease_metrics, [])
+        if lease_metrics:
+            st.dataframe(pd.DataFrame(lease_metrics), hide_index=True)
+
+with st.sidebar.expander("Startup profile"):
+    startup_report = startup.get_startup_report()
+    for label, run in [("Cold start", startup_report['cold']), ("This run", startup_report['last'])]:
+        if run:
+            st.write(f"**{label}:** first render {run['marks']['first_render'] * 1000:.0f} ms, "
+                     f"ready {run['marks']['ready'] * 1000:.0f} ms")
+            st.dataframe(pd.DataFrame(run['stages']), hide_index=True)
@@ -0,0 +1,277 @@
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Count, Max, Q, Sum
+
+import clock_utils
+from counter_utils import ARCHIVE_PREFIX, COUNTED
+from flights.models import (
+    Aircraft, Airline, Airport, Baggage, BaggageStatusCount, Booking, CrewConflict, CrewMember, Delay, Flight,
+    FlightCrew, FlightStatusEvent, Passenger, Payment, Pilot, ProjectedDelay, Route, SeatMap, SecurityCheck,
+    SecurityThroughput, TableCount, Ticket,
+)
+from revenue_utils import refresh_revenue_cube
+from search_utils import deferred_search_index
+
+# completed flights older than this move to the archive database, which is
+# the "archive" alias in DATABASES and attached as ARCHIVE_SCHEMA while moving
+ARCHIVE_ALIAS = "archive"
+ARCHIVE_SCHEMA = "archive"
+ARCHIVE_AFTER_DAYS = 30
+BATCH_SIZE = 500
+TERMINAL_STATUSES = ["Landed", "Cancelled"]
+MAX_AGE_SECONDS = 300
+
+# rows that move with their flight, parents first, with the lookup from
+# each to the flight id
+ARCHIVED = [
+    (Flight, "id"),
+    (SeatMap, "flight_id"),
+    (FlightStatusEvent, "flight_id"),
+    (Ticket, "flight_id"),
+    (Baggage, "ticket__flight_id"),
+    (Booking, "flight_id"),
+    (Payment, "booking__flight_id"),
+    (SecurityCheck, "flight_id"),
+    (FlightCrew, "flight_id"),
+    (Delay, "flight_id"),
+    (BaggageStatusCount, "flight_id"),
+    (SecurityThroughput, "flight_id"),
+]
+# derived rows that are deleted rather than archived; detect_crew_conflicts
+# and rebuild_projected_delays rebuild them from the hot rows
+DROPPED = [
+    (CrewConflict, ["first__flight_id", "second__flight_id"]),
+    (ProjectedDelay, ["flight_id", "source_id"]),
+]
+# small tables the archived rows refer to, copied whole on every run
+REFERENCE = [Airport, Airline, Route, Aircraft, Pilot, CrewMember]
+# passengers are copied only when an archived row refers to them
+PASSENGER_LOOKUPS = ["ticket__flight_id", "booking__flight_id", "securitycheck__flight_id"]
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def archive_configured():
+    return ARCHIVE_ALIAS in settings.DATABASES and connection.vendor == "sqlite"
+
+
+def _archive_path():
+    return str(settings.DATABASES[ARCHIVE_ALIAS]["NAME"])
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _columns(cursor, schema, table):
+    cursor.execute(f"PRAGMA {schema}.table_info({_quote(table)})")
+    return {row[1]: row[2] for row in cursor.fetchall()}
+
+
+def _ensure_schema(cursor, models):
+    # archive tables are created from the hot tables' own DDL, and columns
+    # added by later migrations are added here; no migrate for the archive
+    for model in models:
+        table = model._meta.db_table
+        cursor.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = %s", [table])
+        create = cursor.fetchone()[0]
+        archive_columns = _columns(cursor, ARCHIVE_SCHEMA, table)
+        if not archive_columns:
+            cursor.execute(create.replace("CREATE TABLE ", f"CREATE TABLE {ARCHIVE_SCHEMA}.", 1))
+            cursor.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+                [table],
+            )
+            for (index,) in cursor.fetchall():
+                cursor.execute(index.replace(" INDEX ", f" INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.", 1))
+            continue
+        for column, kind in _columns(cursor, "main", table).items():
+            if column not in archive_columns:
+                cursor.execute(f"ALTER TABLE {ARCHIVE_SCHEMA}.{_quote(table)} ADD COLUMN {_quote(column)} {kind}")
+    # history lookups by date and the watermark both go by arrival time
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.flights_flight_arrival_archive ON flights_flight (arrival_time)"
+    )
+
+
+def _ids_sql(queryset):
+    sql, params = queryset.values("pk").query.sql_with_params()
+    return sql, list(params)
+
+
+def _copy(cursor, model, where_sql="1", params=()):
+    # upsert, so a batch that was copied but not yet deleted can be rerun
+    table = _quote(model._meta.db_table)
+    columns = list(_columns(cursor, "main", model._meta.db_table))
+    names = ", ".join(_quote(column) for column in columns)
+    updates = ", ".join(f"{_quote(column)} = excluded.{_quote(column)}" for column in columns if column != "id")
+    cursor.execute(
+        f"INSERT INTO {ARCHIVE_SCHEMA}.{table} ({names}) SELECT {names} FROM main.{table} WHERE {where_sql} "
+        f"ON CONFLICT (id) DO UPDATE SET {updates}",
+        list(params),
+    )
+    return cursor.rowcount
+
+
+def _in_batch(model, lookup, flight_ids):
+    return model.objects.filter(**{f"{lookup}__in": flight_ids})
+
+
+def _any_in_batch(model, lookups, flight_ids):
+    return model.objects.filter(Q(*[Q(**{f"{lookup}__in": flight_ids}) for lookup in lookups], _connector=Q.OR))
+
+
+def _counts(model, queryset):
+    # (status, rows, summed total) of the rows about to move, for TableCount
+    if model not in COUNTED:
+        return []
+    status_column, summed = COUNTED[model]
+    aggregates = {"count": Count("pk"), **({"total": Sum(summed)} if summed else {})}
+    rows = [("", queryset.aggregate(**aggregates))]
+    if status_column:
+        rows += [
+            (row[status_column], row)
+            for row in queryset.values(status_column).annotate(**aggregates).order_by()
+        ]
+    return [(status, row["count"], row.get("total") or 0) for status, row in rows if row["count"]]
+
+
+def _add_archived_counts(counts):
+    for table, status, count, total in counts:
+        row, _ = TableCount.objects.get_or_create(table_name=ARCHIVE_PREFIX + table, status=status)
+        TableCount.objects.filter(pk=row.pk).update(count=row.count + count, total=row.total + total)
+
+
+def _archive_batch(cursor, flight_ids):
+    # copy first and commit, then delete; with WAL a transaction is atomic
+    # per database file only, so a crash in between leaves rows in both
+    # places rather than in neither, and the next run finishes the batch
+    with transaction.atomic():
+        passengers = _any_in_batch(Passenger, PASSENGER_LOOKUPS, flight_ids).distinct()
+        sql, params = _ids_sql(passengers)
+        _copy(cursor, Passenger, f"id IN ({sql})", params)
+        for model, lookup in ARCHIVED:
+            sql, params = _ids_sql(_in_batch(model, lookup, flight_ids))
+            _copy(cursor, model, f"id IN ({sql})", params)
+
+    moved = {model.__name__: 0 for model, _ in ARCHIVED}
+    with transaction.atomic(), deferred_search_index() as reindex:
+        reindex.update(passengers.values_list("pk", flat=True))
+        counts = []
+        for model, lookup in ARCHIVED:
+            counts += [(model._meta.db_table, *row) for row in _counts(model, _in_batch(model, lookup, flight_ids))]
+        for model, lookups in DROPPED:
+            sql, params = _ids_sql(_any_in_batch(model, lookups, flight_ids))
+            cursor.execute(f"DELETE FROM main.{_quote(model._meta.db_table)} WHERE id IN ({sql})", params)
+        # children first, while the joins up to the flight still resolve
+        for model, lookup in reversed(ARCHIVED):
+            sql, params = _ids_sql(_in_batch(model, lookup, flight_ids))
+            cursor.execute(f"DELETE FROM main.{_quote(model._meta.db_table)} WHERE id IN ({sql})", params)
+            moved[model.__name__] = cursor.rowcount
+        _add_archived_counts(counts)
+    return moved
+
+
+def archive_flights(days=ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE, limit=None, progress=None):
+    # moves Landed/Cancelled flights that arrived more than `days` ago, and
+    # everything that hangs off them, in batches of `batch_size` flights;
+    # returns rows moved per model
+    if not archive_configured():
+        raise ArchiveError(f"add an SQLite '{ARCHIVE_ALIAS}' database to DATABASES to archive flights")
+    # archived payments stay in the revenue cube, so fold any new ones first
+    refresh_revenue_cube()
+    cutoff = clock_utils.now() - timedelta(days=days)
+    candidates = Flight.objects.filter(status__in=TERMINAL_STATUSES, arrival_time__lt=cutoff).order_by("id")
+    totals = {}
+    archived = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"ATTACH DATABASE %s AS {ARCHIVE_SCHEMA}", [_archive_path()])
+        try:
+            cursor.execute(f"PRAGMA {ARCHIVE_SCHEMA}.journal_mode = WAL")
+            with transaction.atomic():
+                _ensure_schema(cursor, REFERENCE + [Passenger] + [model for model, _ in ARCHIVED])
+                for model in REFERENCE:
+                    _copy(cursor, model)
+            while limit is None or archived < limit:
+                size = batch_size if limit is None else min(batch_size, limit - archived)
+                flight_ids = list(candidates.values_list("id", flat=True)[:size])
+                if not flight_ids:
+                    break
+                moved = _archive_batch(cursor, flight_ids)
+                for name, count in moved.items():
+                    totals[name] = totals.get(name, 0) + count
+                archived += len(flight_ids)
+                if progress:
+                    progress(archived, moved)
+        finally:
+            cursor.execute(f"DETACH DATABASE {ARCHIVE_SCHEMA}")
+    _watermark.update(built_at=0.0)
+    return totals
+
+
+def rebuild_archived_counts():
+    # the archive side of counter_utils.rebuild_table_counts; returns the
+    # number of counters written
+    if get_watermark() is None:
+        return 0
+    counts = []
+    for model, _ in ARCHIVED:
+        counts += [(model._meta.db_table, *row) for row in _counts(model, model.objects.using(ARCHIVE_ALIAS).all())]
+    with transaction.atomic():
+        TableCount.objects.filter(table_name__startswith=ARCHIVE_PREFIX).delete()
+        _add_archived_counts(counts)
+    return len(counts)
+
+
+_lock = threading.Lock()
+_watermark = {"built_at": 0.0, "value": None}
+
+
+def get_watermark():
+    # arrival time of the newest archived flight, or None while nothing has
+    # been archived; cached for MAX_AGE_SECONDS
+    with _lock:
+        if _watermark["built_at"] and time.monotonic() - _watermark["built_at"] <= MAX_AGE_SECONDS:
+            return _watermark["value"]
+    value = None
+    # connecting would create an empty archive file, so look first
+    if archive_configured() and os.path.exists(_archive_path()):
+        with connections[ARCHIVE_ALIAS].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'flights_flight'")
+            if cursor.fetchone():
+                value = Flight.objects.using(ARCHIVE_ALIAS).aggregate(newest=Max("arrival_time"))["newest"]
+    with _lock:
+        _watermark.update(built_at=time.monotonic(), value=value)
+    return value
+
+
+def _sort(rows, ordering):
+    # python-side ORDER BY for the merged hot and archive rows; plain field
+    # names only, applied last key first so the sorts are stable
+    for field in reversed(ordering):
+        name = field.lstrip("-")
+        if "__" in name or name == "?":
+            continue
+        key = (lambda row: row[name]) if rows and isinstance(rows[0], dict) else (lambda row: getattr(row, name))
+        rows.sort(key=key, reverse=field.startswith("-"))
+    return rows
+
+
+def with_history(queryset, since):
+    # the queryset's rows from the hot tables, plus the same query against
+    # the archive when `since` reaches back before the watermark; querysets
+    # that only cover recent dates never touch the archive
+    rows = list(queryset)
+    watermark = get_watermark() if since is not None else None
+    if watermark is not None and since <= watermark:
+        rows += list(queryset.using(ARCHIVE_ALIAS))
+        if queryset.query.order_by:
+            _sort(rows, list(queryset.query.order_by))
+    return rows
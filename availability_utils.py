@@ -0,0 +1,177 @@
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, time as dt_time, timedelta
+
+from django.utils import timezone
+from flights.models import Aircraft, Flight, Maintenance
+
+# other processes do not see our signals, so rebuild periodically as well
+MAX_AGE_SECONDS = 300
+
+
+class AircraftCalendar:
+    # busy intervals sorted by start with a running max of ends, so "is
+    # anything busy inside [start, end)" is one bisect and one lookup. An
+    # update inserts or deletes one entry and repairs the running max only
+    # as far as it changes
+    def __init__(self):
+        self.busy = {}
+        self.entries = []
+        self.starts = []
+        self.max_ends = []
+
+    def set(self, key, start, end):
+        self.remove(key)
+        self.busy[key] = (start, end)
+        entry = (start, end, key)
+        position = bisect_left(self.entries, entry)
+        self.entries.insert(position, entry)
+        self.starts.insert(position, start)
+        self.max_ends.insert(position, max(self.max_ends[position - 1], end) if position else end)
+        # later maxima only grow, up to the first one already past this end
+        for position in range(position + 1, len(self.max_ends)):
+            if self.max_ends[position] >= end:
+                break
+            self.max_ends[position] = end
+
+    def remove(self, key):
+        interval = self.busy.pop(key, None)
+        if interval is None:
+            return
+        position = bisect_left(self.entries, (*interval, key))
+        del self.entries[position], self.starts[position], self.max_ends[position]
+        # recompute the maxima that may have come from this entry, until they
+        # agree with the old ones again
+        latest = self.max_ends[position - 1] if position else None
+        for position in range(position, len(self.entries)):
+            end = self.entries[position][1]
+            latest = end if latest is None or end > latest else latest
+            if latest == self.max_ends[position]:
+                break
+            self.max_ends[position] = latest
+
+    def _reindex(self):
+        self.entries = sorted((start, end, key) for key, (start, end) in self.busy.items())
+        self.starts = [start for start, _, _ in self.entries]
+        self.max_ends = []
+        latest = None
+        for _, end, _ in self.entries:
+            latest = end if latest is None or end > latest else latest
+            self.max_ends.append(latest)
+
+    def is_free(self, start, end):
+        position = bisect_left(self.starts, end)
+        return position == 0 or self.max_ends[position - 1] <= start
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built_at = 0.0
+        self.calendars = {}
+        # ("flight" or "maintenance", id) -> the aircraft whose calendar has it
+        self.placed = {}
+        self.aircraft = {}
+        self.fleet = ([], [])
+        self.by_airline = {}
+
+    def build(self):
+        calendars, placed = {}, {}
+        aircraft = {
+            row["id"]: row for row in Aircraft.objects.values("id", "registration_number", "model", "capacity", "airline_id")
+        }
+        for aircraft_id in aircraft:
+            calendars[aircraft_id] = AircraftCalendar()
+
+        flights = Flight.objects.filter(aircraft__isnull=False).exclude(status="Cancelled").values_list(
+            "id", "aircraft_id", "departure_time", "arrival_time"
+        )
+        for flight_id, aircraft_id, departure, arrival in flights.iterator(chunk_size=20000):
+            calendars[aircraft_id].busy[("flight", flight_id)] = (departure, arrival)
+            placed[("flight", flight_id)] = aircraft_id
+        for maintenance_id, aircraft_id, day in Maintenance.objects.values_list("id", "aircraft_id", "date"):
+            calendars[aircraft_id].busy[("maintenance", maintenance_id)] = _day_bounds(day)
+            placed[("maintenance", maintenance_id)] = aircraft_id
+        for calendar in calendars.values():
+            calendar._reindex()
+
+        with self.lock:
+            self.calendars = calendars
+            self.placed = placed
+            self.aircraft = aircraft
+            self.fleet = _by_capacity(aircraft.values())
+            self.by_airline = _group_by_airline(aircraft)
+            self.built_at = time.monotonic()
+
+    def available(self, start, end, airline_id=None, min_capacity=0):
+        with self.lock:
+            fleet, capacities = self.fleet if airline_id is None else self.by_airline.get(airline_id, ([], []))
+            return [
+                row for row in fleet[bisect_left(capacities, min_capacity):]
+                if self.calendars[row["id"]].is_free(start, end)
+            ]
+
+    def _place(self, key, aircraft_id, interval=None):
+        # moves key to aircraft_id's calendar, or just drops it with no interval
+        previous = self.placed.pop(key, None)
+        if previous in self.calendars:
+            self.calendars[previous].remove(key)
+        if interval is not None and aircraft_id in self.calendars:
+            self.calendars[aircraft_id].set(key, *interval)
+            self.placed[key] = aircraft_id
+
+    def update_flight(self, flight):
+        with self.lock:
+            interval = None if flight.status == "Cancelled" else (flight.departure_time, flight.arrival_time)
+            self._place(("flight", flight.id), flight.aircraft_id, interval)
+
+    def remove_flight(self, flight):
+        with self.lock:
+            self._place(("flight", flight.id), None)
+
+    def update_maintenance(self, maintenance):
+        with self.lock:
+            self._place(("maintenance", maintenance.id), maintenance.aircraft_id, _day_bounds(maintenance.date))
+
+    def remove_maintenance(self, maintenance):
+        with self.lock:
+            self._place(("maintenance", maintenance.id), None)
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, dt_time.min), timezone.get_default_timezone())
+    return start, start + timedelta(days=1)
+
+
+def _by_capacity(rows):
+    rows = sorted(rows, key=lambda row: row["capacity"])
+    return rows, [row["capacity"] for row in rows]
+
+
+def _group_by_airline(aircraft):
+    by_airline = {}
+    for row in aircraft.values():
+        by_airline.setdefault(row["airline_id"], []).append(row)
+    return {airline_id: _by_capacity(rows) for airline_id, rows in by_airline.items()}
+
+
+_index = AvailabilityIndex()
+
+
+def is_built():
+    return _index.built_at != 0.0
+
+
+def invalidate():
+    _index.built_at = 0.0
+
+
+def get_availability_index():
+    if _index.built_at == 0.0 or time.monotonic() - _index.built_at > MAX_AGE_SECONDS:
+        _index.build()
+    return _index
+
+
+def find_available_aircraft(start, end, airline_id=None, min_capacity=0):
+    return get_availability_index().available(start, end, airline_id, min_capacity)
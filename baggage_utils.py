@@ -0,0 +1,105 @@
+from django.db import connection, transaction
+from django.db.models import Count
+from flights.models import Baggage, BaggageStatusCount, Flight
+
+BAGGAGE_TRANSITIONS = {
+    "Checked-in": {"Loaded", "Offloaded"},
+    "Loaded": {"In Transit", "Offloaded"},
+    "Offloaded": {"Loaded", "Checked-in"},
+    "In Transit": {"Delivered", "Mishandled"},
+    "Mishandled": {"Delivered"},
+    "Delivered": set(),
+}
+BAGGAGE_STATUSES = list(BAGGAGE_TRANSITIONS)
+
+
+def can_transition(old_status, new_status):
+    return new_status in BAGGAGE_TRANSITIONS.get(old_status, set())
+
+
+def sources_for(new_status):
+    return [status for status, targets in BAGGAGE_TRANSITIONS.items() if new_status in targets]
+
+
+def adjust_counts(deltas):
+    # deltas: {(flight_id, status): change}; one upsert for all of them
+    rows = [(flight_id, status, delta) for (flight_id, status), delta in deltas.items() if delta]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO flights_baggagestatuscount (flight_id, status, count) VALUES (%s, %s, %s) "
+            "ON CONFLICT (flight_id, status) DO UPDATE SET count = flights_baggagestatuscount.count + excluded.count",
+            rows,
+        )
+
+
+def rebuild_baggage_counts(flight_ids=None):
+    bags = Baggage.objects.all()
+    counts = BaggageStatusCount.objects.all()
+    if flight_ids is not None:
+        bags = bags.filter(ticket__flight_id__in=flight_ids)
+        counts = counts.filter(flight_id__in=flight_ids)
+    rows = bags.values("ticket__flight_id", "status").annotate(count=Count("id"))
+    with transaction.atomic():
+        counts.delete()
+        BaggageStatusCount.objects.bulk_create([
+            BaggageStatusCount(flight_id=row["ticket__flight_id"], status=row["status"], count=row["count"])
+            for row in rows
+        ], batch_size=1000)
+    return len(rows)
+
+
+def transition_flight_baggage(flight, new_status, from_statuses=None):
+    # every bag of the flight that may move to new_status does so in one
+    # UPDATE; the counters of the source statuses are exactly the bags that
+    # moved, so they are folded into the target without re-counting
+    if new_status not in BAGGAGE_TRANSITIONS:
+        raise ValueError(f"Unknown baggage status {new_status!r}")
+    sources = sources_for(new_status)
+    if from_statuses is not None:
+        invalid = set(from_statuses) - set(sources)
+        if invalid:
+            raise ValueError(f"Baggage cannot move from {', '.join(sorted(invalid))} to {new_status}")
+        sources = list(from_statuses)
+    flight_id = getattr(flight, "id", flight)
+
+    with transaction.atomic():
+        moved = Baggage.objects.filter(ticket__flight_id=flight_id, status__in=sources).update(status=new_status)
+        if not moved:
+            return 0
+        counts = dict(BaggageStatusCount.objects.filter(
+            flight_id=flight_id, status__in=sources
+        ).values_list("status", "count"))
+        if sum(counts.values()) != moved:
+            rebuild_baggage_counts([flight_id])
+        else:
+            deltas = {(flight_id, status): -count for status, count in counts.items()}
+            deltas[(flight_id, new_status)] = moved
+            adjust_counts(deltas)
+    return moved
+
+
+def find_flight(flight_number, now):
+    # the flight of that number in the air at `now`, or the next one
+    return Flight.objects.filter(
+        flight_number=flight_number.strip().upper(), arrival_time__gte=now
+    ).order_by("departure_time").first()
+
+
+def transition_bag(bag, new_status):
+    if not can_transition(bag.status, new_status):
+        raise ValueError(f"Baggage cannot move from {bag.status} to {new_status}")
+    bag.status = new_status
+    # the Baggage signals move the bag between counters
+    bag.save(update_fields=["status"])
+    return bag
+
+
+def get_flight_baggage_counts(flights):
+    # {flight_id: {status: count}} for a flight queryset, from the counters only
+    counts = {}
+    rows = BaggageStatusCount.objects.filter(flight__in=flights, count__gt=0).values_list("flight_id", "status", "count")
+    for flight_id, status, count in rows:
+        counts.setdefault(flight_id, {})[status] = count
+    return counts
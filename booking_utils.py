@@ -0,0 +1,193 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Max
+from django.utils import timezone
+from flights.models import Flight, Passenger, Ticket, Booking, Payment
+from seat_utils import claim_seats
+from search_utils import deferred_search_index
+
+REQUIRED_FIELDS = ["passport_number", "first_name", "last_name", "flight_id", "total_price", "method"]
+BOOKING_STATUSES = ["Confirmed", "Pending", "Cancelled"]
+PAYMENT_METHODS = ["Credit Card", "Debit Card", "PayPal", "Bank Transfer"]
+
+
+class IngestReport:
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = []
+        self.batches = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.accepted / self.elapsed if self.elapsed else 0.0
+
+    def reject(self, line, row, reason):
+        self.rejected.append({"line": line, "row": row, "reason": reason})
+
+    def __str__(self):
+        return (f"{self.accepted} bookings in {self.elapsed:.2f}s ({self.rows_per_second:,.0f}/s), "
+                f"{len(self.rejected)} rejected, {self.batches} batches")
+
+
+def read_sales(stream, fmt):
+    if fmt == "csv":
+        for line, row in enumerate(csv.DictReader(stream), start=2):
+            yield line, row
+        return
+    for line, text in enumerate(stream, start=1):
+        text = text.strip()
+        if not text:
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as e:
+            yield line, {"_error": f"invalid JSON: {e}"}
+            continue
+        yield line, row if isinstance(row, dict) else {"_error": "expected a JSON object"}
+
+
+def _clean(row, flight_ids):
+    if "_error" in row:
+        return None, row["_error"]
+    missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or "").strip()]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    try:
+        flight_id = int(row["flight_id"])
+        price = Decimal(str(row["total_price"])).quantize(Decimal("0.01"))
+        amount = Decimal(str(row.get("amount") or price)).quantize(Decimal("0.01"))
+    except (ValueError, InvalidOperation):
+        return None, "flight_id, total_price and amount must be numbers"
+    if flight_id not in flight_ids:
+        return None, f"unknown flight {flight_id}"
+    if price <= 0 or price >= Decimal("1000000"):
+        return None, f"total_price {price} out of range"
+    status = row.get("status") or "Pending"
+    if status not in BOOKING_STATUSES:
+        return None, f"unknown booking status {status}"
+    if row["method"] not in PAYMENT_METHODS:
+        return None, f"unknown payment method {row['method']}"
+    return {
+        "passport_number": row["passport_number"].strip().upper(),
+        "first_name": row["first_name"].strip(),
+        "last_name": row["last_name"].strip(),
+        "flight_id": flight_id,
+        "seat": (row.get("seat") or "").strip().upper() or None,
+        "total_price": price,
+        "amount": amount,
+        "status": status,
+        "method": row["method"],
+        "payment_status": row.get("payment_status") or "Completed",
+    }, None
+
+
+def _ingest_batch(batch, report):
+    flight_ids = set(Flight.objects.filter(
+        id__in={row.get("flight_id") for _, row in batch if str(row.get("flight_id") or "").isdigit()}
+    ).values_list("id", flat=True))
+
+    sales = []
+    for line, row in batch:
+        sale, error = _clean(row, flight_ids)
+        if error:
+            report.reject(line, row, error)
+        else:
+            sales.append((line, row, sale))
+    if not sales:
+        return
+
+    try:
+        accepted, unseated = _write_sales(sales)
+    except IntegrityError as e:
+        for line, row, _ in sales:
+            report.reject(line, row, f"batch rolled back: {e}")
+        return
+    for line, row, reason in unseated:
+        report.reject(line, row, reason)
+    report.accepted += len(accepted)
+
+
+def _next_booking_id(cursor):
+    # the transaction already holds the SQLite write lock, so nobody else can
+    # take ids until we commit. sqlite_sequence remembers the highest id ever
+    # handed out, so ids of bookings archive_utils has moved out of this
+    # database are never reused; Max(id) alone would hand them out again
+    last = Booking.objects.aggregate(last=Max("id"))["last"] or 0
+    if connection.vendor == "sqlite":
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [Booking._meta.db_table])
+        row = cursor.fetchone()
+        if row is not None:
+            last = max(last, row[0])
+    return last + 1
+
+
+def _write_sales(sales):
+    # rows go in through prepared executemany statements: building a model
+    # instance and compiling a multi-row INSERT per object is what caps
+    # bulk_create at a few thousand rows per second
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(), deferred_search_index() as reindex, connection.cursor() as cursor:
+        # seats first: a row rejected for its seat must leave nothing behind
+        seats = claim_seats([(sale["flight_id"], sale["seat"]) for _, _, sale in sales])
+        seated, unseated = [], []
+        for (line, row, sale), seat in zip(sales, seats):
+            if seat is None:
+                unseated.append((line, row, f"seat {sale['seat']} unavailable" if sale["seat"] else "flight is full"))
+            else:
+                seated.append((seat, sale))
+        if not seated:
+            return [], unseated
+
+        # last row wins when the same passport shows up twice in a batch
+        passengers = {sale["passport_number"]: (sale["first_name"], sale["last_name"]) for _, sale in seated}
+        cursor.executemany(
+            f"INSERT INTO {Passenger._meta.db_table} (first_name, last_name, passport_number) VALUES (%s, %s, %s) "
+            "ON CONFLICT (passport_number) DO UPDATE SET first_name = excluded.first_name, last_name = excluded.last_name",
+            [(first_name, last_name, passport) for passport, (first_name, last_name) in passengers.items()],
+        )
+        passenger_ids = dict(Passenger.objects.filter(
+            passport_number__in=passengers
+        ).values_list("passport_number", "id"))
+
+        reindex.update(passenger_ids.values())
+
+        accepted = [(passenger_ids[sale["passport_number"]], seat, sale) for seat, sale in seated]
+        first_booking_id = _next_booking_id(cursor)
+        booking_ids = range(first_booking_id, first_booking_id + len(accepted))
+
+        cursor.executemany(
+            f"INSERT INTO {Ticket._meta.db_table} (passenger_id, flight_id, seat, booked_at) VALUES (%s, %s, %s, %s)",
+            [(passenger_id, sale["flight_id"], seat, now) for passenger_id, seat, sale in accepted],
+        )
+        cursor.executemany(
+            f"INSERT INTO {Booking._meta.db_table} (id, passenger_id, flight_id, status, created_at, total_price) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            [(booking_id, passenger_id, sale["flight_id"], sale["status"], now, str(sale["total_price"]))
+             for booking_id, (passenger_id, _, sale) in zip(booking_ids, accepted)],
+        )
+        cursor.executemany(
+            f"INSERT INTO {Payment._meta.db_table} (booking_id, amount, method, payment_date, status) VALUES (%s, %s, %s, %s, %s)",
+            [(booking_id, str(sale["amount"]), sale["method"], now, sale["payment_status"])
+             for booking_id, (_, _, sale) in zip(booking_ids, accepted)],
+        )
+    return accepted, unseated
+
+
+def ingest_sales(stream, fmt="jsonl", batch_size=5000):
+    report = IngestReport()
+    rows = read_sales(stream, fmt)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        _ingest_batch(batch, report)
+        report.batches += 1
+    report.elapsed = time.perf_counter() - report.started
+    return report
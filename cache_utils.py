@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# shared by every dashboard process on the host: an index in SQLite and
+# one Arrow IPC file per DataFrame, memory-mapped on read
+CACHE_DIR = Path(os.environ.get("DASHBOARD_CACHE_DIR", Path(__file__).resolve().parent / "dashboard_cache"))
+MAX_BYTES = int(os.environ.get("DASHBOARD_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+DEFAULT_TTL = 60
+# how long a process may hold a key while recomputing it before others
+# assume it died and recompute themselves
+COMPUTE_TIMEOUT = 120
+POLL_INTERVAL = 0.05
+# last_access is only written back this often, to keep reads read-only
+ACCESS_RESOLUTION = 30
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        value TEXT,
+        size INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        last_access REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)",
+    """CREATE TABLE IF NOT EXISTS computing (
+        key TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )""",
+]
+
+_local = threading.local()
+_stats = {"hits": 0, "stale_hits": 0, "computed": 0, "waited": 0, "timeouts": 0, "evicted": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _connect():
+    # one connection per thread; autocommit, with explicit BEGIN IMMEDIATE
+    # where a read-modify-write has to be atomic across processes
+    db = getattr(_local, "db", None)
+    if db is None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(CACHE_DIR / "index.sqlite3", timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            db.execute(statement)
+        _local.db = db
+    return db
+
+
+def _path(key):
+    return CACHE_DIR / (hashlib.sha1(key.encode()).hexdigest() + ".arrow")
+
+
+def _write(key, value):
+    # returns (kind, inline value, size); frames go to a file written next
+    # to the target and renamed over it, so readers never see half a file
+    import pandas as pd
+
+    if isinstance(value, pd.DataFrame):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(value, preserve_index=False)
+        path = _path(key)
+        partial = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with pa.OSFile(str(partial), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(partial, path)
+        return "arrow", None, path.stat().st_size
+    encoded = json.dumps(value, default=str)
+    return "json", encoded, len(encoded)
+
+
+def _read(key, kind, value):
+    if kind == "json":
+        return json.loads(value)
+    import pyarrow as pa
+
+    # the memory map is shared with the page cache; columns that pandas can
+    # wrap (numbers without nulls) are not copied
+    with pa.memory_map(str(_path(key)), "r") as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def _lookup(key, now):
+    db = _connect()
+    row = db.execute("SELECT kind, value, expires_at, last_access FROM entries WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None, False
+    kind, value, expires_at, last_access = row
+    try:
+        result = _read(key, kind, value)
+    except (OSError, ValueError):
+        # file evicted or replaced under us; treat as a miss
+        return None, False
+    if now - last_access > ACCESS_RESOLUTION:
+        db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+    return (result,), expires_at > now
+
+
+def _claim(key, now):
+    db = _connect()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        row = db.execute("SELECT owner, expires_at FROM computing WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[1] > now and row[0] != _owner():
+            return False
+        db.execute(
+            "INSERT OR REPLACE INTO computing (key, owner, expires_at) VALUES (?, ?, ?)",
+            (key, _owner(), now + COMPUTE_TIMEOUT),
+        )
+        return True
+    finally:
+        db.execute("COMMIT")
+
+
+def _release(key):
+    _connect().execute("DELETE FROM computing WHERE key = ? AND owner = ?", (key, _owner()))
+
+
+def _store(key, value, ttl):
+    kind, inline, size = _write(key, value)
+    now = time.time()
+    db = _connect()
+    db.execute(
+        "INSERT OR REPLACE INTO entries (key, kind, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+        (key, kind, inline, size, now + ttl, now),
+    )
+    _evict(db)
+    # hand back what later hits will see, e.g. lists rather than tuples
+    return json.loads(inline) if kind == "json" else value
+
+
+def _evict(db):
+    # least recently used first until the cache fits in MAX_BYTES again
+    total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total <= MAX_BYTES:
+        return
+    for key, kind, size in db.execute("SELECT key, kind, size FROM entries ORDER BY last_access").fetchall():
+        if total <= MAX_BYTES:
+            break
+        db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        if kind == "arrow":
+            try:
+                os.remove(_path(key))
+            except OSError:
+                pass
+        total -= size
+        _count("evicted")
+
+
+def get_or_compute(key, func, ttl=DEFAULT_TTL):
+    # single flight across processes: one caller recomputes a missing or
+    # stale key while the others keep serving the stale value, or wait for
+    # the fresh one when there is none yet
+    now = time.time()
+    cached, fresh = _lookup(key, now)
+    if fresh:
+        _count("hits")
+        return cached[0]
+
+    deadline = now + COMPUTE_TIMEOUT
+    while True:
+        if _claim(key, time.time()):
+            try:
+                value = _store(key, func(), ttl)
+                _count("computed")
+                return value
+            finally:
+                _release(key)
+        if cached is not None:
+            _count("stale_hits")
+            return cached[0]
+        time.sleep(POLL_INTERVAL)
+        cached, fresh = _lookup(key, time.time())
+        if cached is not None:
+            _count("waited")
+            return cached[0]
+        if time.time() > deadline:
+            _count("timeouts")
+            return func()
+
+
+def invalidate(prefix=""):
+    db = _connect()
+    rows = db.execute("SELECT key, kind FROM entries WHERE key LIKE ? || '%'", (prefix,)).fetchall()
+    for key, kind in rows:
+        db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        if kind == "arrow":
+            try:
+                os.remove(_path(key))
+            except OSError:
+                pass
+    return len(rows)
+
+
+def get_cache_stats():
+    db = _connect()
+    entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    with _stats_lock:
+        stats = dict(_stats)
+    return {"entries": entries, "bytes": size, "max_bytes": MAX_BYTES, **stats}
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# roughly two points per horizontal pixel of a full-width chart
+MAX_POINTS = 2000
+# plotly's own cut-over from SVG to WebGL for scatter traces
+WEBGL_THRESHOLD = 1000
+# series kinds that can be downsampled and drawn with WebGL
+SERIES_KINDS = {"line", "scatter"}
+CACHE_SIZE = 64
+
+
+def lttb(x, y, threshold):
+    # largest-triangle-three-buckets: keeps the first and last point and,
+    # from each bucket in between, the point spanning the largest triangle
+    # with the previously kept point and the mean of the next bucket.
+    # x must be sorted; returns the indices of the kept points
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, length - 1, threshold - 1).astype(np.int64)
+    # mean of every bucket up front, so the loop only does the argmax
+    sums_x = np.add.reduceat(x[1:length - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:length - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    mean_x = np.append(sums_x / sizes, x[-1])
+    mean_y = np.append(sums_y / sizes, y[-1])
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        area = np.abs(
+            (x[previous] - mean_x[bucket + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    kept[-1] = length - 1
+    return kept
+
+
+def _as_numbers(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    return pd.to_numeric(values, errors="coerce").fillna(0).to_numpy()
+
+
+def downsample(data, x, y, max_points=MAX_POINTS, group=None):
+    # LTTB per series (one per value of the colour column), keeping the
+    # total near max_points
+    if len(data) <= max_points:
+        return data
+    groups = [data] if group is None else [frame for _, frame in data.groupby(group, sort=False)]
+    per_group = max(max_points // len(groups), 3)
+    parts = []
+    for frame in groups:
+        frame = frame.sort_values(x, kind="stable")
+        parts.append(frame.iloc[lttb(_as_numbers(frame[x]), _as_numbers(frame[y]), per_group)])
+    return pd.concat(parts)
+
+
+def figure_key(kind, data, params):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(kind.encode())
+    digest.update(json.dumps(params, sort_keys=True, default=repr).encode())
+    digest.update(",".join(map(str, data.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class FigureCache:
+    # most recently used figures by key; callers must treat a returned
+    # figure as read-only since other reruns and sessions share it
+    def __init__(self, size=CACHE_SIZE):
+        self.lock = threading.Lock()
+        self.size = size
+        self.figures = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            figure = self.figures.get(key)
+            if figure is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.figures.move_to_end(key)
+            return figure
+
+    def put(self, key, figure):
+        with self.lock:
+            self.figures[key] = figure
+            self.figures.move_to_end(key)
+            while len(self.figures) > self.size:
+                self.figures.popitem(last=False)
+
+
+_cache = FigureCache()
+
+
+def build_figure(kind, data, layout=None, traces=None, max_points=MAX_POINTS, **params):
+    # px.<kind>(data, **params) with layout/trace updates applied; long
+    # line/scatter series are downsampled and drawn with WebGL
+    import plotly.express as px
+
+    if kind in SERIES_KINDS and "x" in params and "y" in params:
+        data = downsample(data, params["x"], params["y"], max_points, params.get("color"))
+        if len(data) > WEBGL_THRESHOLD:
+            params["render_mode"] = "webgl"
+    figure = getattr(px, kind)(data, **params)
+    if layout:
+        figure.update_layout(**layout)
+    if traces:
+        figure.update_traces(**traces)
+    return figure
+
+
+def cached_figure(kind, data, layout=None, traces=None, max_points=MAX_POINTS, **params):
+    # a cache hit skips plotly express, downsampling and validation of the
+    # traces. The Figure itself is cached rather than its JSON: st.plotly_chart
+    # has no way to take a serialised spec, and it re-validates a dict by
+    # building a Figure from it, which costs several times the to_json it
+    # runs on a Figure
+    data = pd.DataFrame(data)
+    key = figure_key(kind, data, {"layout": layout, "traces": traces, "max_points": max_points, **params})
+    figure = _cache.get(key)
+    if figure is None:
+        figure = build_figure(kind, data, layout, traces, max_points, **params)
+        _cache.put(key, figure)
+    return figure
+
+
+def get_cache_stats():
+    return {"figures": len(_cache.figures), "hits": _cache.hits, "misses": _cache.misses}
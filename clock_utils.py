@@ -0,0 +1,91 @@
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# DASHBOARD_CLOCK="2026-10-19T06:00@100" starts the process's clock at that
+# time running 100x faster than the wall clock; the speed defaults to 1
+ENV_VAR = "DASHBOARD_CLOCK"
+
+
+class SimulatedClock:
+    # starts at `start` and runs `speed` times faster than the wall clock;
+    # set_time jumps, for drivers that step instead of letting it run
+    def __init__(self, start, speed=1.0):
+        self.speed = speed
+        self.set_time(start)
+
+    def set_time(self, at):
+        self.start = at
+        self.started = time.monotonic()
+
+    def now(self):
+        return self.start + timedelta(seconds=(time.monotonic() - self.started) * self.speed)
+
+    def real_seconds(self, simulated):
+        # wall-clock seconds until `simulated` timedelta has passed
+        return simulated.total_seconds() / self.speed
+
+
+def _aware(at):
+    from django.utils import timezone
+
+    return timezone.make_aware(at) if timezone.is_naive(at) else at
+
+
+def clock_from_env(value=None):
+    value = os.environ.get(ENV_VAR, "") if value is None else value
+    if not value:
+        return None
+    start, _, speed = value.partition("@")
+    return SimulatedClock(_aware(datetime.fromisoformat(start)), float(speed or 1))
+
+
+_clock = None
+_configured = False
+
+
+def get_clock():
+    # the environment is read on first use, after Django's settings are in
+    # place, rather than at import
+    global _clock, _configured
+    if not _configured:
+        _clock = clock_from_env()
+        _configured = True
+    return _clock
+
+
+def set_clock(clock):
+    # None goes back to the wall clock
+    global _clock, _configured
+    _clock, _configured = clock, True
+
+
+@contextmanager
+def use_clock(clock):
+    previous = get_clock()
+    set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
+
+
+def now():
+    # timezone.now(), or the simulated time when a clock has been set
+    clock = get_clock()
+    if clock is None:
+        from django.utils import timezone
+
+        return timezone.now()
+    return clock.now()
+
+
+def localnow():
+    from django.utils import timezone
+
+    return timezone.localtime(now())
+
+
+def today():
+    return localnow().date()
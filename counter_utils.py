@@ -0,0 +1,122 @@
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from flights.models import (
+    Aircraft, Airline, Airport, Booking, CrewConflict, CrewMember, Delay, Flight, FlightCrew,
+    Gate, Maintenance, Passenger, Pilot, Runway, TableCount, Ticket, WeatherReport,
+)
+
+# model -> (status column, summed column) for the headline metrics. The
+# SQLite triggers that keep flights_tablecount current are created by
+# migration 0011; a model added here needs a migration adding its triggers
+COUNTED = {
+    Airport: (None, None),
+    Airline: (None, None),
+    Flight: ("status", None),
+    Passenger: (None, None),
+    Ticket: (None, None),
+    Booking: ("status", None),
+    Aircraft: (None, None),
+    Maintenance: ("status", None),
+    Gate: (None, None),
+    Runway: (None, None),
+    CrewMember: (None, None),
+    Pilot: (None, None),
+    FlightCrew: (None, None),
+    CrewConflict: (None, None),
+    Delay: (None, "minutes_delayed"),
+    WeatherReport: (None, None),
+}
+
+
+# counters of rows moved to the archive database (see archive_utils) are
+# kept under "archive.<table>" and added to the hot table's, so headline
+# metrics still cover the history
+ARCHIVE_PREFIX = "archive."
+
+
+def _triggers_available():
+    return connection.vendor == "sqlite"
+
+
+def _actual(model):
+    # (status, count, total) rows straight from the table
+    status_column, summed = COUNTED[model]
+    total = Sum(summed) if summed else None
+    rows = [("", *_aggregate(model.objects.all(), total))]
+    if status_column:
+        grouped = model.objects.values_list(status_column).annotate(count=Count("pk"))
+        if total is not None:
+            grouped = grouped.annotate(total=total)
+        rows += [(row[0], row[1], (row[2] or 0) if total is not None else 0) for row in grouped.order_by()]
+    return rows
+
+
+def _aggregate(queryset, total):
+    values = queryset.aggregate(count=Count("pk"), **({"total": total} if total is not None else {}))
+    return values["count"], values.get("total") or 0
+
+
+def get_counter(model, status=""):
+    # (rows, sum of the summed column) for the whole table or one status;
+    # a single lookup on the counters table however large the table is
+    if not _triggers_available():
+        status_column, summed = COUNTED[model]
+        queryset = model.objects.filter(**{status_column: status}) if status else model.objects.all()
+        return _aggregate(queryset, Sum(summed) if summed else None)
+    table = model._meta.db_table
+    row = TableCount.objects.filter(table_name__in=[table, ARCHIVE_PREFIX + table], status=status).aggregate(
+        count=Sum("count"), total=Sum("total")
+    )
+    return row["count"] or 0, row["total"] or 0
+
+
+def get_count(model, status=""):
+    return get_counter(model, status)[0]
+
+
+def get_status_counts(model):
+    # {status: rows} for a model counted per status, without empty statuses
+    if not _triggers_available():
+        status_column = COUNTED[model][0]
+        rows = model.objects.values_list(status_column).annotate(count=Count("pk")).order_by()
+    else:
+        table = model._meta.db_table
+        rows = (
+            TableCount.objects.filter(table_name__in=[table, ARCHIVE_PREFIX + table]).exclude(status="")
+            .values_list("status").annotate(count=Sum("count")).order_by()
+        )
+    return {status: count for status, count in rows if count}
+
+
+def get_average(model, status=""):
+    count, total = get_counter(model, status)
+    return total / count if count else 0
+
+
+def rebuild_table_counts(models=None):
+    # reconciliation: recounts the given tables (all by default) and
+    # replaces their counters; returns the counters that had drifted as
+    # (table, status, stored (count, total), actual (count, total))
+    if not _triggers_available():
+        return []
+    drift = []
+    with transaction.atomic():
+        for model in models or COUNTED:
+            table = model._meta.db_table
+            stored = {
+                status: (count, total)
+                for status, count, total in TableCount.objects.filter(table_name=table).values_list("status", "count", "total")
+            }
+            actual = _actual(model)
+            for status, count, total in actual:
+                previous = stored.pop(status, (0, 0))
+                if previous != (count, total):
+                    drift.append((table, status, previous, (count, total)))
+            drift += [(table, status, previous, (0, 0)) for status, previous in stored.items() if previous != (0, 0)]
+            TableCount.objects.filter(table_name=table).delete()
+            TableCount.objects.bulk_create([
+                TableCount(table_name=table, status=status, count=count, total=total)
+                for status, count, total in actual
+            ])
+    return drift
@@ -0,0 +1,117 @@
+import heapq
+
+from django.db import transaction
+from django.db.models import Q
+from flights.models import FlightCrew, CrewConflict
+
+# a cancelled flight keeps its crew assignments but takes no one's time
+CANCELLED = "Cancelled"
+
+
+def _person(pilot_id, crew_member_id):
+    return ("pilot", pilot_id) if pilot_id else ("crew", crew_member_id)
+
+
+def _overlap_minutes(start_a, end_a, start_b, end_b):
+    return max(0, int((min(end_a, end_b) - max(start_a, start_b)).total_seconds() // 60))
+
+
+def _load_schedules():
+    schedules = {}
+    assignments = FlightCrew.objects.exclude(flight__status=CANCELLED).values_list(
+        "id", "pilot_id", "crew_member_id", "flight__departure_time", "flight__arrival_time"
+    )
+    for assignment_id, pilot_id, crew_member_id, departure, arrival in assignments.iterator(chunk_size=10000):
+        if not pilot_id and not crew_member_id:
+            continue
+        schedules.setdefault(_person(pilot_id, crew_member_id), []).append((departure, arrival, assignment_id))
+    return schedules
+
+
+def find_overlaps(intervals):
+    # sweep over intervals sorted by start; the heap holds the ones still in
+    # the air, so every pop is final and each overlap is reported once:
+    # O(n log n + number of overlaps)
+    intervals = sorted(intervals)
+    active = []
+    overlaps = []
+    for start, end, assignment_id in intervals:
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for other_end, other_start, other_id in active:
+            overlaps.append((other_id, assignment_id, _overlap_minutes(other_start, other_end, start, end)))
+        heapq.heappush(active, (end, start, assignment_id))
+    return overlaps
+
+
+def detect_crew_conflicts():
+    conflicts = []
+    for intervals in _load_schedules().values():
+        for first_id, second_id, minutes in find_overlaps(intervals):
+            conflicts.append(CrewConflict(
+                first_id=min(first_id, second_id), second_id=max(first_id, second_id), overlap_minutes=minutes
+            ))
+    with transaction.atomic():
+        CrewConflict.objects.all().delete()
+        CrewConflict.objects.bulk_create(conflicts, batch_size=1000)
+    return len(conflicts)
+
+
+def find_assignment_conflicts(flight, pilot=None, crew_member=None, exclude_id=None):
+    if (pilot is None and crew_member is None) or flight.status == CANCELLED:
+        return FlightCrew.objects.none()
+    assignments = FlightCrew.objects.filter(
+        flight__departure_time__lt=flight.arrival_time,
+        flight__arrival_time__gt=flight.departure_time,
+    ).exclude(flight__status=CANCELLED).select_related("flight")
+    assignments = assignments.filter(pilot=pilot) if pilot else assignments.filter(crew_member=crew_member)
+    if exclude_id:
+        assignments = assignments.exclude(id=exclude_id)
+    return assignments
+
+
+def record_assignment_conflicts(assignment):
+    flight = assignment.flight
+    CrewConflict.objects.filter(Q(first=assignment) | Q(second=assignment)).delete()
+    conflicts = [
+        CrewConflict(
+            first_id=min(other.id, assignment.id),
+            second_id=max(other.id, assignment.id),
+            overlap_minutes=_overlap_minutes(
+                other.flight.departure_time, other.flight.arrival_time, flight.departure_time, flight.arrival_time
+            ),
+        )
+        for other in find_assignment_conflicts(flight, assignment.pilot, assignment.crew_member, assignment.id)
+    ]
+    CrewConflict.objects.bulk_create(conflicts, ignore_conflicts=True)
+    return len(conflicts)
+
+
+def record_flight_conflicts(flight):
+    # a flight whose times moved, or that was cancelled or reinstated, may
+    # now clash, or no longer clash, with its crew's other flights
+    recorded = 0
+    for assignment in FlightCrew.objects.filter(flight=flight):
+        assignment.flight = flight
+        recorded += record_assignment_conflicts(assignment)
+    return recorded
+
+
+def get_crew_conflicts(limit=100):
+    conflicts = CrewConflict.objects.select_related(
+        "first__flight", "second__flight", "first__pilot", "first__crew_member"
+    ).order_by("-overlap_minutes")[:limit]
+    data = []
+    for conflict in conflicts:
+        first, second = conflict.first, conflict.second
+        person = first.pilot or first.crew_member
+        data.append({
+            "person": f"{person.name} {person.surname}",
+            "type": "Pilot" if first.pilot_id else "Cabin Crew",
+            "flight": first.flight.flight_number,
+            "departure": first.flight.departure_time.strftime("%Y-%m-%d %H:%M"),
+            "conflicting_flight": second.flight.flight_number,
+            "conflicting_departure": second.flight.departure_time.strftime("%Y-%m-%d %H:%M"),
+            "overlap_minutes": conflict.overlap_minutes,
+        })
+    return data
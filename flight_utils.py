@@ -1,57 +1,18 @@
-from django.utils import timezone
+from django.db.models import OuterRef, Subquery, F
+from django.db.models.functions import Coalesce
 from datetime import timedelta
-from flights.models import Flight, DiscountCode, Delay
+from flights.models import Flight, DiscountCode, FlightStatusEvent
+import clock_utils
+from archive_utils import with_history
+from status_utils import apply_status_rules
 
 def update_flight_statuses():
-    now = timezone.now()
-    updated_count = 0
-    
-    flights = Flight.objects.exclude(status__in=["Cancelled", "Landed"])
-    
-    for flight in flights:
-        old_status = flight.status
-        new_status = old_status 
-        
-        if old_status in ["Cancelled", "Landed"]:
-            continue
-            
-        latest_delay = Delay.objects.filter(flight=flight).order_by('-updated_at').first()
-        if latest_delay and latest_delay.minutes_delayed > 600:
-            new_status = "Cancelled"
-        
-        elif flight.arrival_time < now:
-            new_status = "Landed"
-        
-        elif flight.departure_time < now:
-            if old_status != "Delayed":
-                new_status = "In Flight"
-        
-        else:
-            is_delayed = Delay.objects.filter(flight=flight, updated_at__date=now.date()).exists()
-            time_until_departure = flight.departure_time - now
-            
-            if is_delayed:
-                new_status = "Delayed"
-            elif time_until_departure <= timedelta(minutes=45) and old_status != "Scheduled":
-                new_status = "Boarding"
-            else:
-                new_status = "Scheduled"
-        
-        if new_status != old_status:
-            if old_status == "Boarding" and new_status == "Scheduled":
-                continue
-            if old_status == "Delayed" and new_status in ["Scheduled", "Boarding"]:
-                continue
-                
-            flight.status = new_status
-            flight.save()
-            updated_count += 1
-            print(f"Updated flight {flight.flight_number} from {old_status} to {new_status}")
-    
-    return updated_count
+    # the rules, thresholds and allowed transitions are data in status_utils,
+    # applied to all flights in one set-based pass
+    return apply_status_rules(clock_utils.now())
 
 def update_discount_codes():
-    now = timezone.now().date()
+    now = clock_utils.now().date()
     expired_count = 0
     
     discount_codes = DiscountCode.objects.all()
@@ -61,4 +22,30 @@ def update_discount_codes():
             discount_code.delete()
             expired_count += 1
     
-    return expired_count
\ No newline at end of file
+    return expired_count
+
+def tail_status_events(after_id=0, limit=1000):
+    return list(
+        FlightStatusEvent.objects.filter(id__gt=after_id)
+        .order_by('id')
+        .values('id', 'flight_id', 'flight__flight_number', 'old_status', 'new_status', 'occurred_at', 'cause')[:limit]
+    )
+
+def board_state_at(at, before=timedelta(hours=2), after=timedelta(hours=6)):
+    # status of each flight departing around `at`: the last transition at or
+    # before `at`, else the status the first later transition moved away from,
+    # else the current status (nothing has changed since)
+    last_before = FlightStatusEvent.objects.filter(
+        flight=OuterRef('pk'), occurred_at__lte=at
+    ).order_by('-occurred_at', '-id').values('new_status')[:1]
+    first_after = FlightStatusEvent.objects.filter(
+        flight=OuterRef('pk'), occurred_at__gt=at
+    ).order_by('occurred_at', 'id').values('old_status')[:1]
+    
+    return with_history(
+        Flight.objects.filter(departure_time__range=(at - before, at + after))
+        .annotate(status_at=Coalesce(Subquery(last_before), Subquery(first_after), F('status')))
+        .order_by('departure_time')
+        .values('id', 'flight_number', 'departure_time', 'arrival_time', 'status_at'),
+        at - before
+    )
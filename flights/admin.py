@@ -1,24 +1,147 @@
+from django import forms
 from django.contrib import admin
-from .models import Airport, Airline, Flight, Passenger,Ticket, Route, Pilot, Aircraft, CrewMember, FlightCrew, Gate, Runway, Baggage, Booking, Payment, DiscountCode, Maintenance, Delay, WeatherReport, SecurityCheck
+from .models import Airport, Airline, Flight, Passenger,Ticket, Route, Pilot, Aircraft, CrewMember, FlightCrew, Gate, Runway, Baggage, Booking, Payment, DiscountCode, Maintenance, Delay, WeatherReport, SecurityCheck, SeatMap, JobLease, FlightStatusEvent, CrewConflict, BaggageStatusCount, SecurityThroughput, TableCount, RevenueFact, Watermark, ProjectedDelay, StatusThreshold
 # Register your models here.
 
+class FlightCrewForm(forms.ModelForm):
+    class Meta:
+        model = FlightCrew
+        fields = "__all__"
+
+    def clean(self):
+        from crew_utils import find_assignment_conflicts
+
+        cleaned_data = super().clean()
+        flight = cleaned_data.get("flight")
+        pilot = cleaned_data.get("pilot")
+        crew_member = cleaned_data.get("crew_member")
+        if not pilot and not crew_member:
+            raise forms.ValidationError("Assign either a pilot or a crew member.")
+        if flight:
+            clashes = find_assignment_conflicts(flight, pilot, crew_member, exclude_id=self.instance.pk)
+            if clashes.exists():
+                flights = ", ".join(clash.flight.flight_number for clash in clashes[:5])
+                raise forms.ValidationError(f"{pilot or crew_member} is already assigned to overlapping flights: {flights}")
+        return cleaned_data
+
+
+class FlightCrewAdmin(admin.ModelAdmin):
+    form = FlightCrewForm
+    list_display = ("flight", "pilot", "crew_member", "role_on_flight")
+
+
+class FlightForm(forms.ModelForm):
+    class Meta:
+        model = Flight
+        fields = "__all__"
+
+    def clean(self):
+        from crew_utils import find_assignment_conflicts
+
+        cleaned_data = super().clean()
+        departure = cleaned_data.get("departure_time")
+        arrival = cleaned_data.get("arrival_time")
+        if self.instance.pk and departure and arrival:
+            moved = Flight(
+                departure_time=departure, arrival_time=arrival, status=cleaned_data.get("status", self.instance.status),
+            )
+            for assignment in FlightCrew.objects.filter(flight=self.instance).select_related("pilot", "crew_member"):
+                clashes = find_assignment_conflicts(moved, assignment.pilot, assignment.crew_member, exclude_id=assignment.pk)
+                if clashes.exists():
+                    flights = ", ".join(clash.flight.flight_number for clash in clashes[:5])
+                    raise forms.ValidationError(
+                        f"{assignment.pilot or assignment.crew_member} would overlap flights: {flights}"
+                    )
+        return cleaned_data
+
+
+class FlightAdmin(admin.ModelAdmin):
+    form = FlightForm
+
+
+class DiscountCodeForm(forms.ModelForm):
+    class Meta:
+        model = DiscountCode
+        fields = "__all__"
+
+    def clean_code(self):
+        from pricing_utils import normalise_code
+
+        # codes are matched case-insensitively when quoting
+        code = normalise_code(self.cleaned_data["code"])
+        if DiscountCode.objects.filter(code__iexact=code).exclude(pk=self.instance.pk).exists():
+            raise forms.ValidationError(f"Discount code {code} already exists.")
+        return code
+
+
+class DiscountCodeAdmin(admin.ModelAdmin):
+    form = DiscountCodeForm
+    list_display = ("code", "discount_percent", "valid_until", "airline")
+
+
+class BaggageForm(forms.ModelForm):
+    class Meta:
+        model = Baggage
+        fields = "__all__"
+
+    def clean_status(self):
+        from baggage_utils import can_transition
+
+        status = self.cleaned_data["status"]
+        old_status = self.instance.status if self.instance.pk else None
+        if old_status is not None and status != old_status and not can_transition(old_status, status):
+            raise forms.ValidationError(f"Baggage cannot move from {old_status} to {status}.")
+        return status
+
+
+class BaggageAdmin(admin.ModelAdmin):
+    form = BaggageForm
+    list_display = ("ticket", "weight", "status")
+    list_filter = ("status",)
+
+
+class DerivedAdmin(admin.ModelAdmin):
+    # tables the helpers keep in step with their source rows, and the
+    # append-only status log; a hand edit would silently throw them off, so
+    # they are view-only here
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(Airport)
 admin.site.register(Route)
 admin.site.register(Airline)
 admin.site.register(Pilot)
-admin.site.register(Flight)
+admin.site.register(Flight, FlightAdmin)
 admin.site.register(Passenger)
 admin.site.register(Ticket)
 admin.site.register(Aircraft)
 admin.site.register(CrewMember)
-admin.site.register(FlightCrew)
+admin.site.register(FlightCrew, FlightCrewAdmin)
 admin.site.register(Gate)
 admin.site.register(Runway)
-admin.site.register(Baggage)
+admin.site.register(Baggage, BaggageAdmin)
 admin.site.register(Booking)
 admin.site.register(Payment)
-admin.site.register(DiscountCode)
+admin.site.register(DiscountCode, DiscountCodeAdmin)
 admin.site.register(Maintenance)
 admin.site.register(Delay)
 admin.site.register(WeatherReport)
 admin.site.register(SecurityCheck)
+admin.site.register(SeatMap, DerivedAdmin)
+admin.site.register(JobLease, DerivedAdmin)
+admin.site.register(FlightStatusEvent, DerivedAdmin)
+admin.site.register(CrewConflict, DerivedAdmin)
+admin.site.register(BaggageStatusCount, DerivedAdmin)
+admin.site.register(SecurityThroughput, DerivedAdmin)
+admin.site.register(TableCount, DerivedAdmin)
+admin.site.register(RevenueFact, DerivedAdmin)
+admin.site.register(Watermark, DerivedAdmin)
+admin.site.register(ProjectedDelay, DerivedAdmin)
+admin.site.register(StatusThreshold)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from archive_utils import ARCHIVE_AFTER_DAYS, BATCH_SIZE, ArchiveError, archive_flights
+
+
+class Command(BaseCommand):
+    help = "Move Landed/Cancelled flights older than --days, with their tickets, bags, checks and crew, to the archive database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="flights per transaction")
+        parser.add_argument("--limit", type=int, help="stop after this many flights")
+
+    def handle(self, *args, **options):
+        def progress(archived, moved):
+            self.stdout.write(f"{archived} flights archived ({moved.get('Ticket', 0)} tickets in the last batch)")
+
+        try:
+            totals = archive_flights(options["days"], options["batch_size"], options["limit"], progress)
+        except ArchiveError as error:
+            raise CommandError(str(error))
+        summary = ", ".join(f"{count} {name}" for name, count in totals.items() if count) or "nothing"
+        self.stdout.write(self.style.SUCCESS(f"Archived {summary}"))
@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+from django.core.management.base import BaseCommand
+
+from chart_utils import MAX_POINTS, cached_figure, downsample, get_cache_stats
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "Time building and serialising a line chart over a large random-walk series"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--points", type=int, default=1_000_000)
+        parser.add_argument("--series", type=int, default=1, help="split the points over this many colours")
+        parser.add_argument("--max-points", type=int, default=MAX_POINTS)
+        parser.add_argument("--skip-raw", action="store_true", help="do not build the full-resolution figure")
+
+    def handle(self, *args, **options):
+        points, series = options["points"], options["series"]
+        rng = np.random.default_rng(0)
+        data = pd.DataFrame({
+            "time": pd.date_range("2026-01-01", periods=points, freq="s", tz="UTC"),
+            "value": rng.standard_normal(points).cumsum(),
+            "series": np.arange(points) % series,
+        })
+        params = {"x": "time", "y": "value", "color": "series" if series > 1 else None}
+        self.stdout.write(f"{points:,} points in {series} series, max {options['max_points']:,} drawn")
+
+        if not options["skip_raw"]:
+            figure, build = _timed(lambda: px.line(data, render_mode="svg", **params))
+            payload, serialise = _timed(lambda: pio.to_json(figure, validate=False))
+            self._report("raw SVG", build, serialise, payload)
+
+        sample, elapsed = _timed(lambda: downsample(data, "time", "value", options["max_points"], params["color"]))
+        self.stdout.write(f"{'LTTB only':<12} {elapsed * 1000:>9.1f} ms  {len(sample):,} points kept")
+
+        figure, build = _timed(lambda: cached_figure("line", data, max_points=options["max_points"], **params))
+        payload, serialise = _timed(lambda: pio.to_json(figure, validate=False))
+        self._report("cache miss", build, serialise, payload)
+
+        _, hit = _timed(lambda: cached_figure("line", data, max_points=options["max_points"], **params))
+        self._report("cache hit", hit, serialise, payload)
+        self.stdout.write(f"trace type: {figure.data[0].type}, cache: {get_cache_stats()}")
+
+    def _report(self, label, build, serialise, payload):
+        self.stdout.write(
+            f"{label:<12} {build * 1000:>9.1f} ms build  {serialise * 1000:>9.1f} ms serialise  "
+            f"{len(payload) / 1e6:>7.2f} MB"
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from cache_utils import get_cache_stats, invalidate
+
+
+class Command(BaseCommand):
+    help = "Show or clear the dashboard's shared aggregate cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clear", nargs="?", const="", metavar="PREFIX", help="drop all keys, or those starting with PREFIX")
+
+    def handle(self, *args, **options):
+        if options["clear"] is not None:
+            removed = invalidate(options["clear"])
+            self.stdout.write(self.style.SUCCESS(f"Removed {removed} cache entries"))
+        stats = get_cache_stats()
+        self.stdout.write(f"{stats['entries']} entries, {stats['bytes'] / 1e6:.1f} of {stats['max_bytes'] / 1e6:.0f} MB")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from crew_utils import detect_crew_conflicts
+
+
+class Command(BaseCommand):
+    help = "Rescan all crew and pilot assignments for overlapping flights"
+
+    def handle(self, *args, **options):
+        count = detect_crew_conflicts()
+        self.stdout.write(self.style.SUCCESS(f"Found {count} crew conflicts"))
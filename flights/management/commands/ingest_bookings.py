@@ -0,0 +1,35 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking_utils import ingest_sales
+
+
+class Command(BaseCommand):
+    help = "Bulk ingest sales (passenger, ticket, booking, payment) from a JSONL or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL/CSV file, or - for stdin")
+        parser.add_argument("--format", choices=["jsonl", "csv"], help="defaults to the file extension")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--rejects", help="write rejected rows to this JSONL file")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path.endswith(".csv") else "jsonl")
+        try:
+            stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        except OSError as e:
+            raise CommandError(e)
+
+        with stream:
+            report = ingest_sales(stream, fmt=fmt, batch_size=options["batch_size"])
+
+        if options["rejects"]:
+            with open(options["rejects"], "w", encoding="utf-8") as out:
+                for rejected in report.rejected:
+                    out.write(json.dumps(rejected, default=str) + "\n")
+        for rejected in report.rejected[:10]:
+            self.stderr.write(f"line {rejected['line']}: {rejected['reason']}")
+        self.stdout.write(self.style.SUCCESS(str(report)))
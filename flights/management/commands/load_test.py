@@ -0,0 +1,77 @@
+import io
+import json
+from contextlib import redirect_stdout
+
+from django.core.management.base import BaseCommand, CommandError
+
+from load_utils import PERCENTILES, percentiles, run_load
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent dashboard readers and writers against the database and report throughput, "
+        "latency percentiles and lock timeouts per operation. Writes rows, so run it on a copy"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--duration", type=float, default=30, help="seconds")
+        parser.add_argument("--no-status-engine", action="store_true", help="do not run update_flight_statuses alongside")
+        parser.add_argument("--status-interval", type=float, default=1.0, help="seconds between status engine runs")
+        parser.add_argument("--think-ms", type=float, default=0, help="pause after every operation")
+        parser.add_argument("--busy-timeout", type=float, help="SQLite busy_timeout in seconds (default: the connection's)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", help="also write the results to this file, for comparing runs")
+
+    def handle(self, *args, **options):
+        if options["readers"] < 0 or options["writers"] < 0 or options["duration"] <= 0:
+            raise CommandError("--readers/--writers must be >= 0 and --duration positive")
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers"
+            f"{'' if options['no_status_engine'] else ', status engine'} for {options['duration']:g} s"
+        )
+        try:
+            # the status engine prints every transition
+            with redirect_stdout(io.StringIO()):
+                totals, elapsed = run_load(
+                    readers=options["readers"],
+                    writers=options["writers"],
+                    duration=options["duration"],
+                    status_engine=not options["no_status_engine"],
+                    status_interval=options["status_interval"],
+                    think=options["think_ms"] / 1000,
+                    busy_timeout=options["busy_timeout"],
+                    seed=options["seed"],
+                )
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        labels = [f"p{point}" for point in PERCENTILES] + ["max"]
+        self.stdout.write(
+            f"{'operation':<30} {'ops':>7} {'ops/s':>8} " + " ".join(f"{label + ' ms':>9}" for label in labels)
+            + f" {'locked':>7} {'errors':>7}"
+        )
+        report = {"options": {key: options[key] for key in ("readers", "writers", "duration", "busy_timeout", "seed")},
+                  "elapsed": elapsed, "operations": {}}
+        for name in sorted(totals):
+            stats = totals[name]
+            values = percentiles(stats.seconds)
+            self.stdout.write(
+                f"{name:<30} {len(stats.seconds):>7} {len(stats.seconds) / elapsed:>8.1f} "
+                + " ".join(f"{value:>9.1f}" for value in values)
+                + f" {stats.lock_timeouts:>7} {stats.errors:>7}"
+            )
+            if stats.last_error:
+                self.stderr.write(f"  {name}: {stats.last_error}")
+            report["operations"][name] = {
+                "ops": len(stats.seconds),
+                "ops_per_second": len(stats.seconds) / elapsed,
+                **{f"{label}_ms": value for label, value in zip(labels, values)},
+                "lock_timeouts": stats.lock_timeouts,
+                "errors": stats.errors,
+            }
+        if options["json"]:
+            with open(options["json"], "w") as output:
+                json.dump(report, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Load test finished in {elapsed:.1f} s"))
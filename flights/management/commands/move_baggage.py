@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+import clock_utils
+from baggage_utils import BAGGAGE_STATUSES, find_flight, transition_flight_baggage
+
+
+class Command(BaseCommand):
+    help = "Move every bag of a flight that may go to STATUS there, e.g. Loaded when the hold closes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("flight_number", help="the flight of that number in the air now, or the next one")
+        parser.add_argument("status", choices=BAGGAGE_STATUSES[1:])
+        parser.add_argument("--from", dest="from_statuses", nargs="+", choices=BAGGAGE_STATUSES,
+                            help="move only bags in these statuses")
+
+    def handle(self, *args, **options):
+        flight = find_flight(options["flight_number"], clock_utils.now())
+        if flight is None:
+            raise CommandError(f"Flight {options['flight_number']} not found")
+        try:
+            moved = transition_flight_baggage(flight, options["status"], options["from_statuses"])
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} bags of {flight.flight_number} to {options['status']}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from baggage_utils import rebuild_baggage_counts
+
+
+class Command(BaseCommand):
+    help = "Recount bags per flight and status from the baggage table"
+
+    def handle(self, *args, **options):
+        count = rebuild_baggage_counts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} baggage counters"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from propagation_utils import rebuild_projected_delays
+
+
+class Command(BaseCommand):
+    help = "Recompute knock-on delays along aircraft and crew rotations and rewrite the projected delays"
+
+    def handle(self, *args, **options):
+        projected = rebuild_projected_delays()
+        self.stdout.write(self.style.SUCCESS(f"Projected knock-on delays for {projected} flights"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from search_utils import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the passenger full-text search index"
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} passengers"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from flights.models import Flight
+from seat_utils import rebuild_seat_maps
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-flight seat bitmaps and load factors from tickets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--flight", action="append", dest="flight_numbers", help="only rebuild these flight numbers")
+
+    def handle(self, *args, **options):
+        flights = Flight.objects.all()
+        if options["flight_numbers"]:
+            flights = flights.filter(flight_number__in=options["flight_numbers"])
+        count = rebuild_seat_maps(flights)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} seat maps"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from security_utils import rebuild_security_throughput
+
+
+class Command(BaseCommand):
+    help = "Recount the 5-minute security checkpoint buckets from SecurityCheck"
+
+    def handle(self, *args, **options):
+        count = rebuild_security_throughput()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} security throughput buckets"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from archive_utils import rebuild_archived_counts
+from counter_utils import rebuild_table_counts
+
+
+class Command(BaseCommand):
+    help = "Recount the headline metric counters from their tables and repair any drift"
+
+    def handle(self, *args, **options):
+        drift = rebuild_table_counts()
+        for table, status, stored, actual in drift:
+            self.stdout.write(f"{table} {status or 'all'}: {stored[0]} -> {actual[0]} rows, total {stored[1]} -> {actual[1]}")
+        archived = rebuild_archived_counts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt table counters, {len(drift)} had drifted; {archived} archive counters"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from revenue_utils import get_watermark, rebuild_revenue_cube, refresh_revenue_cube
+
+
+class Command(BaseCommand):
+    help = "Fold payments added since the last run into the revenue cube"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="empty the cube and fold every payment again")
+
+    def handle(self, *args, **options):
+        folded = rebuild_revenue_cube() if options["rebuild"] else refresh_revenue_cube()
+        self.stdout.write(self.style.SUCCESS(f"Folded {folded} payments into the revenue cube, up to id {get_watermark()}"))
@@ -0,0 +1,162 @@
+import io
+import os
+import random
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from clock_utils import SimulatedClock, use_clock
+from flight_utils import update_flight_statuses
+from flights.models import Delay, Flight, FlightStatusEvent
+from load_utils import percentiles
+
+APP = Path(__file__).resolve().parents[3] / "app.py"
+# injected delays are tagged so --reset can remove them again
+DELAY_PREFIX = "Replay: "
+DELAY_REASONS = ["Weather Conditions", "Air Traffic Control", "Technical Issues", "Late Arriving Aircraft"]
+
+
+def _summary(values):
+    if not values:
+        return "n/a"
+    p50, p95, p99, slowest = percentiles(values)
+    return f"p50 {p50:.0f} ms  p95 {p95:.0f} ms  p99 {p99:.0f} ms  max {slowest:.0f} ms  (n={len(values)})"
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a day of operations on a simulated clock: run the status engine every tick, "
+        "inject seeded delays and time dashboard sections. Writes to the database, so run it on a copy"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=datetime.fromisoformat, help="day to replay (default: today)")
+        parser.add_argument("--speed", type=float, default=100, help="simulated seconds per real second, e.g. 10-1000")
+        parser.add_argument("--hours", type=float, default=24)
+        parser.add_argument("--tick", type=int, default=60, help="simulated seconds between status engine runs")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--delay-rate", type=float, default=0.05,
+                            help="chance per simulated hour that a flight departing within 2 hours is delayed")
+        parser.add_argument("--sections", default="Overview,Flights,Passengers",
+                            help="dashboard sections to render, comma-separated; empty to skip")
+        parser.add_argument("--dashboard-every", type=int, default=30, help="simulated minutes between renders")
+        parser.add_argument("--reset", action="store_true",
+                            help="put the day's flights back to Scheduled and drop earlier replay delays and events")
+
+    def handle(self, *args, **options):
+        if options["speed"] <= 0 or options["tick"] <= 0:
+            raise CommandError("--speed and --tick must be positive")
+        day = timezone.make_aware(datetime.combine((options["date"] or timezone.localtime()).date(), datetime.min.time()))
+        end = day + timedelta(hours=options["hours"])
+        flights = Flight.objects.filter(departure_time__lt=end, arrival_time__gte=day)
+        if options["reset"]:
+            self._reset(flights, day)
+
+        rng = random.Random(options["seed"])
+        tick = timedelta(seconds=options["tick"])
+        sections = [section for section in options["sections"].split(",") if section]
+        dashboard = self._dashboard(sections) if sections else None
+        engine_times, render_times = [], {section: [] for section in sections}
+        transitions = delays = behind = 0
+        max_lag = 0.0
+        hourly = {}
+
+        clock = SimulatedClock(day, options["speed"])
+        self.stdout.write(f"Replaying {day:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M} at {options['speed']:g}x, "
+                          f"{flights.count()} flights")
+        started = time.perf_counter()
+        with use_clock(clock):
+            at, next_render = day, day
+            while at < end:
+                # each tick starts on its own simulated time, so a slow tick
+                # delays the replay instead of making it skip ahead
+                lag = time.perf_counter() - started - clock.real_seconds(at - day)
+                if lag < 0:
+                    time.sleep(-lag)
+                elif lag > clock.real_seconds(tick):
+                    behind += 1
+                    max_lag = max(max_lag, lag)
+                clock.set_time(at)
+
+                delays += self._inject_delays(rng, flights, clock.now(), tick, options["delay_rate"])
+                tick_start = time.perf_counter()
+                with redirect_stdout(io.StringIO() if options["verbosity"] < 2 else self.stdout):
+                    changed = update_flight_statuses()
+                engine_times.append(time.perf_counter() - tick_start)
+                transitions += changed
+                hour = at.replace(minute=0, second=0, microsecond=0)
+                hourly[hour] = hourly.get(hour, 0) + changed
+
+                if dashboard and at >= next_render:
+                    for section in sections:
+                        render_times[section].append(dashboard(section))
+                    next_render += timedelta(minutes=options["dashboard_every"])
+
+                at += tick
+                if at.minute == 0 and at.second == 0 and at > day:
+                    self.stdout.write(f"{at:%H:%M}  {hourly.get(at - timedelta(hours=1), 0):>5} transitions  "
+                                      f"engine {_summary(engine_times[-int(3600 / tick.total_seconds()):])}")
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write("")
+        self.stdout.write(f"{transitions} transitions, {delays} delays injected in {elapsed:.1f} s real time "
+                          f"({transitions / elapsed:.1f} transitions/s)")
+        busiest = max(hourly.items(), key=lambda item: item[1], default=(day, 0))
+        self.stdout.write(f"busiest hour {busiest[0]:%H:%M} with {busiest[1]} transitions")
+        self.stdout.write(f"status engine: {_summary(engine_times)}")
+        self.stdout.write(f"fell behind on {behind} ticks, by up to {max_lag:.1f} s; "
+                          f"effective speed {(end - day).total_seconds() / elapsed:.0f}x")
+        for section, times in render_times.items():
+            self.stdout.write(f"dashboard {section:<11} {_summary(times)}")
+        self.stdout.write(self.style.SUCCESS("Replay finished"))
+
+    def _reset(self, flights, day):
+        ids = list(flights.values_list("id", flat=True))
+        Delay.objects.filter(flight_id__in=ids, reason__startswith=DELAY_PREFIX).delete()
+        FlightStatusEvent.objects.filter(flight_id__in=ids, occurred_at__gte=day).delete()
+        reset = Flight.objects.filter(id__in=ids).exclude(status="Scheduled").update(status="Scheduled")
+        self.stdout.write(f"Reset {reset} flights to Scheduled")
+
+    def _inject_delays(self, rng, flights, now, tick, rate):
+        # same seed, same flights, same delays; about one in twenty is long
+        # enough for the engine to cancel the flight
+        chance = rate * tick.total_seconds() / 3600
+        candidates = flights.filter(
+            departure_time__gt=now, departure_time__lte=now + timedelta(hours=2)
+        ).exclude(Q(status="Cancelled") | Q(status="Landed")).order_by("id").values_list("id", flat=True)
+        created = [
+            Delay.objects.create(
+                flight_id=flight_id,
+                reason=DELAY_PREFIX + rng.choice(DELAY_REASONS),
+                minutes_delayed=rng.randint(601, 720) if rng.random() < 0.05 else rng.randint(15, 180),
+            ).id
+            for flight_id in candidates if rng.random() < chance
+        ]
+        # updated_at is auto_now on the wall clock; the engine compares it
+        # with the simulated day
+        Delay.objects.filter(id__in=created).update(updated_at=now)
+        return len(created)
+
+    def _dashboard(self, sections):
+        # renders run in this process, so the app sees the simulated clock;
+        # the app's own maintenance would race the replay, so it is off
+        from streamlit.testing.v1 import AppTest
+
+        os.environ["DASHBOARD_MAINTENANCE"] = "off"
+
+        def render(section):
+            app = AppTest.from_file(str(APP), default_timeout=120)
+            app.run()
+            start = time.perf_counter()
+            app.sidebar.selectbox[0].set_value(section).run()
+            elapsed = time.perf_counter() - start
+            if app.exception:
+                self.stderr.write(f"{section}: {app.exception[0].value}")
+            return elapsed
+
+        return render
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0002_rename_firtsname_passenger_first_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightcrew',
+            name='pilot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='flights.pilot'),
+        ),
+        migrations.AlterField(
+            model_name='flightcrew',
+            name='crew_member',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='flights.crewmember'),
+        ),
+    ]
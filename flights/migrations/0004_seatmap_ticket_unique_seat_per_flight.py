@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def reseat_duplicate_tickets(apps, schema_editor):
+    # older data picked seats at random, from 32 rows whatever the aircraft,
+    # so move clashing tickets and tickets outside the cabin to a free seat
+    # before the unique constraint goes on. Only an over-full flight keeps
+    # tickets past its capacity
+    Flight = apps.get_model('flights', 'Flight')
+    Ticket = apps.get_model('flights', 'Ticket')
+    seats = [f"{row}{letter}" for row in range(1, 100) for letter in "ABCDEF"]
+    capacities = dict(Flight.objects.values_list('id', 'aircraft__capacity'))
+    tickets = {}
+    for ticket in Ticket.objects.order_by('flight_id', 'id'):
+        tickets.setdefault(ticket.flight_id, []).append(ticket)
+    for flight_id, flight_tickets in tickets.items():
+        capacity = capacities.get(flight_id)
+        cabin = set(seats[:32 * 6 if capacity is None else capacity])
+        held = {ticket.seat for ticket in flight_tickets}
+        flight_seats = set()
+        movers = []
+        for ticket in flight_tickets:
+            if ticket.seat in cabin and ticket.seat not in flight_seats:
+                flight_seats.add(ticket.seat)
+            else:
+                movers.append(ticket)
+        for ticket in movers:
+            seat = next((seat for seat in seats if seat in cabin and seat not in flight_seats), None)
+            if seat is None and ticket.seat in flight_seats:
+                seat = next(seat for seat in seats if seat not in flight_seats and seat not in held)
+            if seat is not None:
+                ticket.seat = seat
+                ticket.save(update_fields=['seat'])
+            flight_seats.add(ticket.seat)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0003_flightcrew_pilot_alter_flightcrew_crew_member'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatMap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('capacity', models.PositiveIntegerField()),
+                ('bitmap', models.BinaryField()),
+                ('seats_taken', models.PositiveIntegerField(default=0)),
+                ('load_factor', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(reseat_duplicate_tickets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ticket',
+            constraint=models.UniqueConstraint(fields=('flight', 'seat'), name='unique_seat_per_flight'),
+        ),
+        migrations.AddField(
+            model_name='seatmap',
+            name='flight',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='seat_map', to='flights.flight'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0004_seatmap_ticket_unique_seat_per_flight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('owner', models.CharField(blank=True, max_length=100)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_wait_ms', models.FloatField(default=0)),
+                ('last_hold_ms', models.FloatField(default=0)),
+                ('runs', models.PositiveIntegerField(default=0)),
+                ('skips', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0005_joblease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_status', models.CharField(max_length=50)),
+                ('new_status', models.CharField(max_length=50)),
+                ('occurred_at', models.DateTimeField(db_index=True)),
+                ('cause', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_time'], name='flights_fli_departu_5bc2af_idx'),
+        ),
+        migrations.AddField(
+            model_name='flightstatusevent',
+            name='flight',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='flights.flight'),
+        ),
+        migrations.AddIndex(
+            model_name='flightstatusevent',
+            index=models.Index(fields=['flight', 'occurred_at'], name='flights_fli_flight__789ab4_idx'),
+        ),
+    ]
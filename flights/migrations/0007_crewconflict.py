@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0006_flightstatusevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrewConflict',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('overlap_minutes', models.PositiveIntegerField()),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('first', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conflicts_as_first', to='flights.flightcrew')),
+                ('second', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conflicts_as_second', to='flights.flightcrew')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('first', 'second'), name='unique_crew_conflict')],
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:20
+
+from django.db import migrations
+
+# trigram tokens let a MATCH find any 3+ character fragment of a name,
+# passport number or ticket/booking reference
+REFS = """
+    coalesce((SELECT group_concat('T' || t.id || ' ' || f.flight_number, ' ')
+              FROM flights_ticket t JOIN flights_flight f ON f.id = t.flight_id
+              WHERE t.passenger_id = {id}), '')
+    || ' ' ||
+    coalesce((SELECT group_concat('B' || b.id, ' ') FROM flights_booking b WHERE b.passenger_id = {id}), '')
+"""
+
+# bulk loaders set paused inside their transaction and refresh the passengers
+# they touched in one statement instead of once per row
+ACTIVE = "WHEN (SELECT paused FROM flights_passenger_search_state) = 0"
+
+CREATE = [
+    "CREATE TABLE flights_passenger_search_state (paused integer NOT NULL)",
+    "INSERT INTO flights_passenger_search_state (paused) VALUES (0)",
+    """CREATE VIRTUAL TABLE flights_passenger_search USING fts5(
+        first_name, last_name, passport_number, refs, tokenize='trigram'
+    )""",
+    f"""INSERT INTO flights_passenger_search (rowid, first_name, last_name, passport_number, refs)
+        SELECT p.id, p.first_name, p.last_name, p.passport_number, {REFS.format(id='p.id')}
+        FROM flights_passenger p""",
+    f"""CREATE TRIGGER flights_passenger_search_ai AFTER INSERT ON flights_passenger {ACTIVE} BEGIN
+        INSERT INTO flights_passenger_search (rowid, first_name, last_name, passport_number, refs)
+        VALUES (new.id, new.first_name, new.last_name, new.passport_number, '');
+    END""",
+    f"""CREATE TRIGGER flights_passenger_search_au AFTER UPDATE ON flights_passenger {ACTIVE} BEGIN
+        UPDATE flights_passenger_search
+        SET first_name = new.first_name, last_name = new.last_name, passport_number = new.passport_number
+        WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER flights_passenger_search_ad AFTER DELETE ON flights_passenger {ACTIVE} BEGIN
+        DELETE FROM flights_passenger_search WHERE rowid = old.id;
+    END""",
+]
+# inserts append to refs, deletes rebuild it for that passenger
+CREATE += [
+    f"""CREATE TRIGGER flights_passenger_search_ticket_insert AFTER INSERT ON flights_ticket {ACTIVE} BEGIN
+        UPDATE flights_passenger_search
+        SET refs = refs || ' T' || new.id || ' ' || (SELECT flight_number FROM flights_flight WHERE id = new.flight_id)
+        WHERE rowid = new.passenger_id;
+    END""",
+    f"""CREATE TRIGGER flights_passenger_search_booking_insert AFTER INSERT ON flights_booking {ACTIVE} BEGIN
+        UPDATE flights_passenger_search SET refs = refs || ' B' || new.id WHERE rowid = new.passenger_id;
+    END""",
+]
+for table in ["ticket", "booking"]:
+    CREATE.append(f"""CREATE TRIGGER flights_passenger_search_{table}_delete AFTER DELETE ON flights_{table} {ACTIVE} BEGIN
+        UPDATE flights_passenger_search SET refs = {REFS.format(id='old.passenger_id')}
+        WHERE rowid = old.passenger_id;
+    END""")
+
+DROP = [
+    "DROP TRIGGER IF EXISTS flights_passenger_search_ai",
+    "DROP TRIGGER IF EXISTS flights_passenger_search_au",
+    "DROP TRIGGER IF EXISTS flights_passenger_search_ad",
+    "DROP TRIGGER IF EXISTS flights_passenger_search_ticket_insert",
+    "DROP TRIGGER IF EXISTS flights_passenger_search_ticket_delete",
+    "DROP TRIGGER IF EXISTS flights_passenger_search_booking_insert",
+    "DROP TRIGGER IF EXISTS flights_passenger_search_booking_delete",
+    "DROP TABLE IF EXISTS flights_passenger_search",
+    "DROP TABLE IF EXISTS flights_passenger_search_state",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; other backends fall back to LIKE lookups
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0007_crewconflict'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
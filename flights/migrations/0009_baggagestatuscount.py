@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_baggage(apps, schema_editor):
+    Baggage = apps.get_model('flights', 'Baggage')
+    BaggageStatusCount = apps.get_model('flights', 'BaggageStatusCount')
+    rows = Baggage.objects.values('ticket__flight_id', 'status').annotate(count=Count('id'))
+    BaggageStatusCount.objects.bulk_create([
+        BaggageStatusCount(flight_id=row['ticket__flight_id'], status=row['status'], count=row['count'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0008_passenger_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='baggage',
+            name='status',
+            field=models.CharField(choices=[('Checked-in', 'Checked-in'), ('Loaded', 'Loaded'), ('Offloaded', 'Offloaded'), ('In Transit', 'In Transit'), ('Delivered', 'Delivered'), ('Mishandled', 'Mishandled')], default='Checked-in', max_length=50),
+        ),
+        migrations.CreateModel(
+            name='BaggageStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='baggage_counts', to='flights.flight')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('flight', 'status'), name='unique_baggage_count_per_status')],
+            },
+        ),
+        migrations.RunPython(count_baggage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:15
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+
+STATUS_COLUMNS = {
+    'Cleared': 'cleared',
+    'Pending': 'pending',
+    'Additional Screening Required': 'additional_screening',
+}
+
+
+def count_security_checks(apps, schema_editor):
+    SecurityCheck = apps.get_model('flights', 'SecurityCheck')
+    SecurityThroughput = apps.get_model('flights', 'SecurityThroughput')
+    buckets = {}
+    checks = SecurityCheck.objects.values_list('flight_id', 'flight__route__departure_airport_id', 'status', 'checked_at')
+    for flight_id, airport_id, status, checked_at in checks.iterator(chunk_size=20000):
+        start = checked_at.replace(second=0, microsecond=0) - timedelta(minutes=checked_at.minute % 5)
+        bucket = buckets.get((flight_id, start))
+        if bucket is None:
+            bucket = buckets[(flight_id, start)] = SecurityThroughput(
+                flight_id=flight_id, airport_id=airport_id, bucket_start=start
+            )
+        bucket.checks += 1
+        if status in STATUS_COLUMNS:
+            setattr(bucket, STATUS_COLUMNS[status], getattr(bucket, STATUS_COLUMNS[status]) + 1)
+    SecurityThroughput.objects.bulk_create(buckets.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0009_baggagestatuscount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecurityThroughput',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('checks', models.IntegerField(default=0)),
+                ('cleared', models.IntegerField(default=0)),
+                ('pending', models.IntegerField(default=0)),
+                ('additional_screening', models.IntegerField(default=0)),
+                ('airport', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='security_buckets', to='flights.airport')),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='security_buckets', to='flights.flight')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_start'], name='flights_sec_bucket__681bb4_idx'), models.Index(fields=['airport', 'bucket_start'], name='flights_sec_airport_af26c6_idx')],
+                'constraints': [models.UniqueConstraint(fields=('flight', 'bucket_start'), name='unique_security_bucket_per_flight')],
+            },
+        ),
+        migrations.RunPython(count_security_checks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:28
+
+from django.db import migrations, models
+
+COUNTS = "flights_tablecount"
+# table -> (status column, summed column); copied from counter_utils.COUNTED
+# as it stood when the triggers were written
+COUNTED = {
+    "flights_airport": (None, None),
+    "flights_airline": (None, None),
+    "flights_flight": ("status", None),
+    "flights_passenger": (None, None),
+    "flights_ticket": (None, None),
+    "flights_booking": ("status", None),
+    "flights_aircraft": (None, None),
+    "flights_maintenance": ("status", None),
+    "flights_gate": (None, None),
+    "flights_runway": (None, None),
+    "flights_crewmember": (None, None),
+    "flights_pilot": (None, None),
+    "flights_flightcrew": (None, None),
+    "flights_crewconflict": (None, None),
+    "flights_delay": (None, "minutes_delayed"),
+    "flights_weatherreport": (None, None),
+}
+
+
+def _bump(table, sign, row, status, summed):
+    # the counter row may not exist yet for a new status, hence the insert
+    amount = f"{sign} * coalesce({row}.{summed}, 0)" if summed else "0"
+    return f"""
+        INSERT OR IGNORE INTO {COUNTS} (table_name, status, count, total) VALUES ('{table}', {status}, 0, 0);
+        UPDATE {COUNTS} SET count = count + {sign}, total = total + {amount}
+        WHERE table_name = '{table}' AND status = {status};"""
+
+
+def _changes(table, sign, row, status_column, summed):
+    statements = _bump(table, sign, row, "''", summed)
+    if status_column:
+        statements += _bump(table, sign, row, f"{row}.{status_column}", summed)
+    return statements
+
+
+def _statements(table, status_column, summed):
+    yield f"""CREATE TRIGGER {table}_count_insert AFTER INSERT ON {table} BEGIN
+        {_changes(table, 1, 'new', status_column, summed)}
+    END"""
+    yield f"""CREATE TRIGGER {table}_count_delete AFTER DELETE ON {table} BEGIN
+        {_changes(table, -1, 'old', status_column, summed)}
+    END"""
+    columns = [column for column in (status_column, summed) if column]
+    if columns:
+        changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in columns)
+        yield f"""CREATE TRIGGER {table}_count_update AFTER UPDATE OF {', '.join(columns)} ON {table}
+        WHEN {changed} BEGIN
+        {_changes(table, -1, 'old', status_column, summed)}
+        {_changes(table, 1, 'new', status_column, summed)}
+    END"""
+    total = f"coalesce(sum({summed}), 0)" if summed else "0"
+    yield f"INSERT INTO {COUNTS} (table_name, status, count, total) SELECT '{table}', '', count(*), {total} FROM {table}"
+    if status_column:
+        yield (
+            f"INSERT INTO {COUNTS} (table_name, status, count, total) "
+            f"SELECT '{table}', {status_column}, count(*), {total} FROM {table} GROUP BY {status_column}"
+        )
+
+
+def create_count_triggers(apps, schema_editor):
+    # triggers are SQLite only; elsewhere counter_utils falls back to COUNT(*)
+    if schema_editor.connection.vendor == 'sqlite':
+        for table, (status_column, summed) in COUNTED.items():
+            for statement in _statements(table, status_column, summed):
+                schema_editor.execute(statement)
+
+
+def drop_count_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for table in COUNTED:
+            for action in ["insert", "delete", "update"]:
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_count_{action}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0010_securitythroughput'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table_name', models.CharField(max_length=100)),
+                ('status', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('table_name', 'status'), name='unique_table_count_per_status')],
+            },
+        ),
+        migrations.RunPython(create_count_triggers, drop_count_triggers),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0011_tablecount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RevenueFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('method', models.CharField(max_length=50)),
+                ('booking_status', models.CharField(max_length=50)),
+                ('payments', models.IntegerField(default=0)),
+                ('revenue_cents', models.BigIntegerField(default=0)),
+                ('airline', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_facts', to='flights.airline')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_facts', to='flights.route')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['airline', 'day'], name='flights_rev_airline_b2f680_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'airline', 'route', 'method', 'booking_status'), name='unique_revenue_fact_cell')],
+            },
+        ),
+    ]
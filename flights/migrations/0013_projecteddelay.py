@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0012_revenuefact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectedDelay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minutes', models.PositiveIntegerField()),
+                ('via', models.CharField(max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('flight', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='projected_delay', to='flights.flight')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='knock_on_delays', to='flights.flight')),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0013_projecteddelay'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusThreshold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cancel_after_minutes', models.PositiveIntegerField(blank=True, null=True)),
+                ('boarding_minutes', models.PositiveIntegerField(blank=True, null=True)),
+                ('airline', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='status_thresholds', to='flights.airline')),
+                ('airport', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='status_thresholds', to='flights.airport')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('airline', 'airport'), name='unique_status_threshold_scope')],
+            },
+        ),
+    ]
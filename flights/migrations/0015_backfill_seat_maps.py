@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:40
+
+from django.db import migrations
+
+# copied from seat_utils as it stood when the seat maps were backfilled
+SEAT_LETTERS = "ABCDEF"
+DEFAULT_CAPACITY = 32 * len(SEAT_LETTERS)
+
+
+def _seat_label(index):
+    row, col = divmod(index, len(SEAT_LETTERS))
+    return f"{row + 1}{SEAT_LETTERS[col]}"
+
+
+def _seat_index(label):
+    label = label.strip().upper()
+    if len(label) < 2 or not label[:-1].isdigit() or label[-1] not in SEAT_LETTERS:
+        return None
+    return (int(label[:-1]) - 1) * len(SEAT_LETTERS) + SEAT_LETTERS.index(label[-1])
+
+
+def reseat_out_of_cabin_tickets(apps, schema_editor):
+    # 0004 used to keep the random seats of older data even past the
+    # aircraft's capacity; move those tickets to a free seat in the cabin.
+    # Only an over-full flight keeps tickets past its capacity
+    Flight = apps.get_model('flights', 'Flight')
+    Ticket = apps.get_model('flights', 'Ticket')
+    capacities = dict(Flight.objects.values_list('id', 'aircraft__capacity'))
+    tickets = {}
+    for ticket in Ticket.objects.order_by('flight_id', 'id'):
+        tickets.setdefault(ticket.flight_id, []).append(ticket)
+    for flight_id, flight_tickets in tickets.items():
+        capacity = capacities.get(flight_id)
+        capacity = DEFAULT_CAPACITY if capacity is None else capacity
+        taken = set()
+        movers = []
+        for ticket in flight_tickets:
+            index = _seat_index(ticket.seat)
+            if index is not None and index < capacity:
+                taken.add(index)
+            else:
+                movers.append(ticket)
+        free = (index for index in range(capacity) if index not in taken)
+        for ticket, index in zip(movers, free):
+            ticket.seat = _seat_label(index)
+            ticket.save(update_fields=['seat'])
+
+
+def build_seat_maps(apps, schema_editor):
+    # 0004 only created the table; flights that already had tickets need a
+    # map or the dashboard counts them as empty. Every ticket counts towards
+    # seats_taken, a seat outside the cabin just has no bit
+    Flight = apps.get_model('flights', 'Flight')
+    SeatMap = apps.get_model('flights', 'SeatMap')
+    Ticket = apps.get_model('flights', 'Ticket')
+
+    seats_by_flight = {}
+    for flight_id, seat in Ticket.objects.values_list('flight_id', 'seat').iterator(chunk_size=20000):
+        seats_by_flight.setdefault(flight_id, []).append(seat)
+
+    existing = {seat_map.flight_id: seat_map for seat_map in SeatMap.objects.all()}
+    to_create, to_update = [], []
+    for flight_id, capacity in Flight.objects.values_list('id', 'aircraft__capacity').iterator(chunk_size=20000):
+        capacity = DEFAULT_CAPACITY if capacity is None else capacity
+        bitmap = bytearray((capacity + 7) // 8)
+        seats = seats_by_flight.get(flight_id, [])
+        for seat in seats:
+            index = _seat_index(seat)
+            if index is not None and index < capacity:
+                bitmap[index >> 3] |= 1 << (index & 7)
+        seat_map = existing.get(flight_id) or SeatMap(flight_id=flight_id)
+        seat_map.capacity = capacity
+        seat_map.bitmap = bytes(bitmap)
+        seat_map.seats_taken = len(seats)
+        seat_map.load_factor = len(seats) / capacity if capacity else 0
+        (to_update if seat_map.pk else to_create).append(seat_map)
+    SeatMap.objects.bulk_create(to_create, batch_size=1000)
+    SeatMap.objects.bulk_update(to_update, ['capacity', 'bitmap', 'seats_taken', 'load_factor'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0014_statusthreshold'),
+    ]
+
+    operations = [
+        migrations.RunPython(reseat_out_of_cabin_tickets, migrations.RunPython.noop),
+        migrations.RunPython(build_seat_maps, migrations.RunPython.noop),
+    ]
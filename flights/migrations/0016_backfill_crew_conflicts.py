@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 21:10
+
+import heapq
+
+from django.db import migrations
+
+
+# copied from crew_utils as it stood when the conflicts were backfilled
+def _overlap_minutes(start_a, end_a, start_b, end_b):
+    return max(0, int((min(end_a, end_b) - max(start_a, start_b)).total_seconds() // 60))
+
+
+def _find_overlaps(intervals):
+    intervals = sorted(intervals)
+    active = []
+    overlaps = []
+    for start, end, assignment_id in intervals:
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for other_end, other_start, other_id in active:
+            overlaps.append((other_id, assignment_id, _overlap_minutes(other_start, other_end, start, end)))
+        heapq.heappush(active, (end, start, assignment_id))
+    return overlaps
+
+
+def detect_crew_conflicts(apps, schema_editor):
+    # 0007 only created the table; assignments made before it were never
+    # checked, so run the full sweep once
+    FlightCrew = apps.get_model('flights', 'FlightCrew')
+    CrewConflict = apps.get_model('flights', 'CrewConflict')
+
+    schedules = {}
+    assignments = FlightCrew.objects.exclude(flight__status='Cancelled').values_list(
+        'id', 'pilot_id', 'crew_member_id', 'flight__departure_time', 'flight__arrival_time'
+    )
+    for assignment_id, pilot_id, crew_member_id, departure, arrival in assignments.iterator(chunk_size=10000):
+        if not pilot_id and not crew_member_id:
+            continue
+        person = ('pilot', pilot_id) if pilot_id else ('crew', crew_member_id)
+        schedules.setdefault(person, []).append((departure, arrival, assignment_id))
+
+    conflicts = [
+        CrewConflict(first_id=min(first_id, second_id), second_id=max(first_id, second_id), overlap_minutes=minutes)
+        for intervals in schedules.values()
+        for first_id, second_id, minutes in _find_overlaps(intervals)
+    ]
+    CrewConflict.objects.all().delete()
+    CrewConflict.objects.bulk_create(conflicts, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0015_backfill_seat_maps'),
+    ]
+
+    operations = [
+        migrations.RunPython(detect_crew_conflicts, migrations.RunPython.noop),
+    ]
@@ -46,10 +46,32 @@ class Flight(models.Model):
     arrival_time = models.DateTimeField()
     status = models.CharField(max_length=50, default="Scheduled")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["departure_time"]),
+        ]
+
     def __str__(self):
         return f"{self.flight_number} ({self.route})"
 
 
+class FlightStatusEvent(models.Model):
+    # append-only; ids are monotonic so consumers can tail by last seen id
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name="status_events")
+    old_status = models.CharField(max_length=50)
+    new_status = models.CharField(max_length=50)
+    occurred_at = models.DateTimeField(db_index=True)
+    cause = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["flight", "occurred_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.flight.flight_number}: {self.old_status} → {self.new_status} ({self.cause})"
+
+
 class Passenger(models.Model):
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
@@ -66,10 +88,28 @@ class Ticket(models.Model):
     seat = models.CharField(max_length=5)
     booked_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["flight", "seat"], name="unique_seat_per_flight"),
+        ]
+
     def __str__(self):
         return f"Ticket {self.seat} for {self.passenger} on {self.flight}"
 
 
+class SeatMap(models.Model):
+    # one bit per seat in seat_utils order (1A, 1B, ... 1F, 2A, ...)
+    flight = models.OneToOneField(Flight, on_delete=models.CASCADE, related_name="seat_map")
+    capacity = models.PositiveIntegerField()
+    bitmap = models.BinaryField()
+    seats_taken = models.PositiveIntegerField(default=0)
+    load_factor = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Seat map for {self.flight} ({self.seats_taken}/{self.capacity})"
+
+
 class Aircraft(models.Model):
     model = models.CharField(max_length=100)
     registration_number = models.CharField(max_length=20, unique=True)
@@ -104,6 +144,22 @@ class FlightCrew(models.Model):
             return f"{self.crew_member} on {self.flight} as {self.role_on_flight}"
 
 
+class CrewConflict(models.Model):
+    # two assignments of the same pilot or crew member to overlapping flights
+    first = models.ForeignKey(FlightCrew, on_delete=models.CASCADE, related_name="conflicts_as_first")
+    second = models.ForeignKey(FlightCrew, on_delete=models.CASCADE, related_name="conflicts_as_second")
+    overlap_minutes = models.PositiveIntegerField()
+    detected_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["first", "second"], name="unique_crew_conflict"),
+        ]
+
+    def __str__(self):
+        return f"Conflict: {self.first} / {self.second}"
+
+
 class Gate(models.Model):
     gate_number = models.CharField(max_length=10)
     terminal = models.CharField(max_length=10)
@@ -123,14 +179,39 @@ class Runway(models.Model):
 
 
 class Baggage(models.Model):
+    # allowed moves between these are in baggage_utils.BAGGAGE_TRANSITIONS
+    STATUS_CHOICES = [
+        ("Checked-in", "Checked-in"),
+        ("Loaded", "Loaded"),
+        ("Offloaded", "Offloaded"),
+        ("In Transit", "In Transit"),
+        ("Delivered", "Delivered"),
+        ("Mishandled", "Mishandled"),
+    ]
+
     ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE)
     weight = models.FloatField()
-    status = models.CharField(max_length=50, default="Checked-in")
+    status = models.CharField(max_length=50, default="Checked-in", choices=STATUS_CHOICES)
 
     def __str__(self):
         return f"Baggage for {self.ticket}"
 
 
+class BaggageStatusCount(models.Model):
+    # bags per flight and status, kept up to date by baggage_utils and signals
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name="baggage_counts")
+    status = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["flight", "status"], name="unique_baggage_count_per_status"),
+        ]
+
+    def __str__(self):
+        return f"{self.flight.flight_number} {self.status}: {self.count}"
+
+
 class Booking(models.Model):
     passenger = models.ForeignKey(Passenger, on_delete=models.CASCADE)
     flight = models.ForeignKey(Flight, on_delete=models.CASCADE)
@@ -203,3 +284,129 @@ class SecurityCheck(models.Model):
 
     def __str__(self):
         return f"SecurityCheck for {self.passenger} ({self.status})"
+
+
+class SecurityThroughput(models.Model):
+    # checks per flight in 5-minute buckets of checked_at, kept up to date by
+    # security_utils and signals so the dashboard never scans SecurityCheck
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name="security_buckets")
+    airport = models.ForeignKey(Airport, on_delete=models.CASCADE, null=True, related_name="security_buckets")
+    bucket_start = models.DateTimeField()
+    checks = models.IntegerField(default=0)
+    cleared = models.IntegerField(default=0)
+    pending = models.IntegerField(default=0)
+    additional_screening = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["flight", "bucket_start"], name="unique_security_bucket_per_flight"),
+        ]
+        indexes = [
+            models.Index(fields=["bucket_start"]),
+            models.Index(fields=["airport", "bucket_start"]),
+        ]
+
+    def __str__(self):
+        return f"{self.flight.flight_number} {self.bucket_start:%H:%M}: {self.checks} checks"
+
+
+class JobLease(models.Model):
+    # one row per maintenance job; whoever holds an unexpired lease runs it
+    name = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_wait_ms = models.FloatField(default=0)
+    last_hold_ms = models.FloatField(default=0)
+    runs = models.PositiveIntegerField(default=0)
+    skips = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} (last run {self.last_run_at})"
+
+
+class TableCount(models.Model):
+    # rows per table, and per status for tables that have one (status "" is
+    # the whole table); kept up to date by SQLite triggers, see counter_utils
+    table_name = models.CharField(max_length=100)
+    status = models.CharField(max_length=50, blank=True, default="")
+    count = models.BigIntegerField(default=0)
+    # sum of the table's summed column, e.g. Delay.minutes_delayed
+    total = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["table_name", "status"], name="unique_table_count_per_status"),
+        ]
+
+    def __str__(self):
+        return f"{self.table_name} {self.status or 'all'}: {self.count}"
+
+
+class RevenueFact(models.Model):
+    # payments pre-aggregated by day, airline, route, method and booking
+    # status; folded in by revenue_utils from Payment rows past the watermark
+    day = models.DateField()
+    airline = models.ForeignKey(Airline, on_delete=models.CASCADE, related_name="revenue_facts")
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name="revenue_facts")
+    method = models.CharField(max_length=50)
+    booking_status = models.CharField(max_length=50)
+    payments = models.IntegerField(default=0)
+    # whole cents, so sums over any slice stay exact
+    revenue_cents = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "airline", "route", "method", "booking_status"], name="unique_revenue_fact_cell"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["airline", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.airline} {self.method} {self.booking_status}: {self.revenue_cents / 100:.2f}"
+
+
+class Watermark(models.Model):
+    # highest source row id an incremental job has folded in
+    name = models.CharField(max_length=100, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at {self.last_id}"
+
+
+class ProjectedDelay(models.Model):
+    # knock-on delay a flight inherits from earlier flights of the same
+    # aircraft or crew; written by propagation_utils, one row per affected flight
+    flight = models.OneToOneField(Flight, on_delete=models.CASCADE, related_name="projected_delay")
+    minutes = models.PositiveIntegerField()
+    # the flight whose own delay started the chain, and whether the last hop
+    # into this flight was via the aircraft or crew
+    source = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name="knock_on_delays")
+    via = models.CharField(max_length=20)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.flight.flight_number}: +{self.minutes} min via {self.via}"
+
+
+class StatusThreshold(models.Model):
+    # overrides status_utils' default thresholds for an airline, a departure
+    # airport, or both; a blank threshold falls through to the next most
+    # specific row, then to the default
+    airline = models.ForeignKey(Airline, null=True, blank=True, on_delete=models.CASCADE, related_name="status_thresholds")
+    airport = models.ForeignKey(Airport, null=True, blank=True, on_delete=models.CASCADE, related_name="status_thresholds")
+    cancel_after_minutes = models.PositiveIntegerField(null=True, blank=True)
+    boarding_minutes = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["airline", "airport"], name="unique_status_threshold_scope"),
+        ]
+
+    def __str__(self):
+        return f"Thresholds for {self.airline or 'all airlines'} at {self.airport or 'all airports'}"
@@ -0,0 +1,247 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.db.models import F
+from django.dispatch import receiver
+
+from .models import Aircraft, Baggage, BaggageStatusCount, Booking, Delay, DiscountCode, Flight, FlightCrew, Maintenance, Payment, SecurityCheck, SecurityThroughput, Ticket
+
+
+@receiver(post_save, sender=FlightCrew)
+def check_crew_conflicts(sender, instance, **kwargs):
+    from crew_utils import record_assignment_conflicts
+    record_assignment_conflicts(instance)
+
+
+@receiver(pre_save, sender=Flight)
+def flight_saving(sender, instance, **kwargs):
+    instance._scheduled_as = None
+    if instance.pk:
+        instance._scheduled_as = Flight.objects.filter(pk=instance.pk).values_list(
+            "departure_time", "arrival_time", "aircraft_id", "status"
+        ).first()
+
+
+@receiver(post_save, sender=Flight)
+def flight_saved(sender, instance, **kwargs):
+    import availability_utils
+    import itinerary_utils
+    import pricing_utils
+    import propagation_utils
+    if availability_utils.is_built():
+        availability_utils.get_availability_index().update_flight(instance)
+    if itinerary_utils.is_built():
+        itinerary_utils.get_timetable().update_flight(instance)
+    if pricing_utils.is_built():
+        pricing_utils.get_pricing_index().update_flight(instance)
+    previous = getattr(instance, "_scheduled_as", None)
+    if previous != (instance.departure_time, instance.arrival_time, instance.aircraft_id, instance.status):
+        propagation_utils.flights_changed([instance.pk])
+    if not kwargs.get("created"):
+        from seat_utils import resize_seat_maps
+        resize_seat_maps(Flight.objects.filter(pk=instance.pk))
+    if previous is not None and (
+        previous[:2] != (instance.departure_time, instance.arrival_time)
+        or (previous[3] == "Cancelled") != (instance.status == "Cancelled")
+    ):
+        from crew_utils import record_flight_conflicts
+        record_flight_conflicts(instance)
+
+
+@receiver(post_delete, sender=Flight)
+def flight_deleted(sender, instance, **kwargs):
+    import availability_utils
+    import itinerary_utils
+    import propagation_utils
+    if availability_utils.is_built():
+        availability_utils.get_availability_index().remove_flight(instance)
+    if itinerary_utils.is_built():
+        itinerary_utils.get_timetable().remove_flight(instance)
+    propagation_utils.flights_changed([instance.pk])
+
+
+@receiver(post_save, sender=Maintenance)
+def maintenance_saved(sender, instance, **kwargs):
+    import availability_utils
+    if availability_utils.is_built():
+        availability_utils.get_availability_index().update_maintenance(instance)
+
+
+@receiver(post_delete, sender=Maintenance)
+def maintenance_deleted(sender, instance, **kwargs):
+    import availability_utils
+    if availability_utils.is_built():
+        availability_utils.get_availability_index().remove_maintenance(instance)
+
+
+@receiver([post_save, post_delete], sender=Aircraft)
+def aircraft_changed(sender, instance, signal, **kwargs):
+    import availability_utils
+    from seat_utils import resize_seat_maps
+    availability_utils.invalidate()
+    # a deleted aircraft has already been unset on its flights
+    flights = Flight.objects.filter(aircraft=instance) if signal is post_save else Flight.objects.filter(aircraft__isnull=True)
+    resize_seat_maps(flights)
+
+
+@receiver(pre_save, sender=Ticket)
+def ticket_saving(sender, instance, **kwargs):
+    instance._seated_as = None
+    if instance.pk:
+        instance._seated_as = Ticket.objects.filter(pk=instance.pk).values_list("flight_id", "seat").first()
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_saved(sender, instance, **kwargs):
+    # seat maps follow tickets here rather than in each caller, so admin
+    # edits and scripts keep them right too
+    from seat_utils import mark_seat
+    previous = getattr(instance, "_seated_as", None)
+    if previous != (instance.flight_id, instance.seat):
+        if previous is not None:
+            mark_seat(*previous, taken=False)
+        mark_seat(instance.flight_id, instance.seat, taken=True)
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_deleted(sender, instance, **kwargs):
+    # also runs for tickets cascading from a passenger or flight
+    from seat_utils import mark_seat
+    mark_seat(instance.flight_id, instance.seat, taken=False)
+
+
+@receiver([post_save, post_delete], sender=Delay)
+def delay_changed(sender, instance, **kwargs):
+    # knock-on delays for the flights after this one in its rotations,
+    # worked out once the transaction commits
+    import propagation_utils
+    propagation_utils.flights_changed([instance.flight_id])
+
+
+@receiver(pre_save, sender=FlightCrew)
+def flight_crew_saving(sender, instance, **kwargs):
+    instance._crewed_on = None
+    if instance.pk:
+        instance._crewed_on = FlightCrew.objects.filter(pk=instance.pk).values_list("flight_id", flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=FlightCrew)
+def flight_crew_changed(sender, instance, **kwargs):
+    # the crew's rotations change on the flight it left and the one it joined
+    import propagation_utils
+    propagation_utils.flights_changed([instance.flight_id, getattr(instance, "_crewed_on", None)])
+
+
+@receiver([post_save, post_delete], sender=DiscountCode)
+def discount_code_changed(sender, instance, **kwargs):
+    import pricing_utils
+    pricing_utils.invalidate()
+
+
+@receiver(pre_save, sender=Baggage)
+def baggage_saving(sender, instance, **kwargs):
+    # remember where the bag was counted before this save
+    instance._counted_as = None
+    if instance.pk:
+        instance._counted_as = Baggage.objects.filter(pk=instance.pk).values_list(
+            "ticket__flight_id", "status"
+        ).first()
+
+
+@receiver(post_save, sender=Baggage)
+def baggage_saved(sender, instance, **kwargs):
+    from baggage_utils import adjust_counts
+    flight_id = Ticket.objects.filter(pk=instance.ticket_id).values_list("flight_id", flat=True).first()
+    current = (flight_id, instance.status)
+    previous = getattr(instance, "_counted_as", None)
+    if previous != current:
+        deltas = {current: 1}
+        if previous is not None:
+            deltas[previous] = -1
+        adjust_counts(deltas)
+
+
+@receiver(post_delete, sender=Baggage)
+def baggage_deleted(sender, instance, **kwargs):
+    # update only: when the flight itself is being deleted its counters may
+    # already be gone and must not be recreated
+    flight_id = Ticket.objects.filter(pk=instance.ticket_id).values_list("flight_id", flat=True).first()
+    BaggageStatusCount.objects.filter(flight_id=flight_id, status=instance.status).update(count=F("count") - 1)
+
+
+@receiver(pre_save, sender=SecurityCheck)
+def security_check_saving(sender, instance, **kwargs):
+    instance._counted_as = None
+    if instance.pk:
+        instance._counted_as = SecurityCheck.objects.filter(pk=instance.pk).values_list(
+            "flight_id", "status", "checked_at"
+        ).first()
+
+
+@receiver(post_save, sender=SecurityCheck)
+def security_check_saved(sender, instance, **kwargs):
+    from security_utils import record_check
+    previous = getattr(instance, "_counted_as", None)
+    if previous != (instance.flight_id, instance.status, instance.checked_at):
+        record_check(instance, previous)
+
+
+@receiver(post_delete, sender=SecurityCheck)
+def security_check_deleted(sender, instance, **kwargs):
+    from security_utils import STATUS_COLUMNS, bucket_start
+    # update only, for the same reason as baggage_deleted
+    changes = {"checks": F("checks") - 1}
+    if instance.status in STATUS_COLUMNS:
+        column = STATUS_COLUMNS[instance.status]
+        changes[column] = F(column) - 1
+    SecurityThroughput.objects.filter(
+        flight_id=instance.flight_id, bucket_start=bucket_start(instance.checked_at)
+    ).update(**changes)
+
+
+@receiver(pre_save, sender=Payment)
+def payment_saving(sender, instance, **kwargs):
+    # payments already folded into the revenue cube are moved between cells
+    # when they change; new ones wait for refresh_revenue_cube
+    from revenue_utils import payment_facts
+    instance._revenue_facts = payment_facts([instance.pk]) if instance.pk else []
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, created, **kwargs):
+    from revenue_utils import move_facts, payment_facts
+    before = getattr(instance, "_revenue_facts", [])
+    if before:
+        move_facts(before, payment_facts([instance.pk]))
+
+
+@receiver(pre_delete, sender=Payment)
+def payment_deleting(sender, instance, **kwargs):
+    from revenue_utils import payment_facts
+    instance._revenue_facts = payment_facts([instance.pk])
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    from revenue_utils import move_facts
+    move_facts(getattr(instance, "_revenue_facts", []), [])
+
+
+@receiver(pre_save, sender=Booking)
+def booking_saving(sender, instance, **kwargs):
+    # a status or flight change moves the booking's folded payments to
+    # another cell of the cube
+    from revenue_utils import payment_facts
+    instance._revenue_facts = []
+    if instance.pk:
+        previous = Booking.objects.filter(pk=instance.pk).values_list("status", "flight_id").first()
+        if previous is not None and previous != (instance.status, instance.flight_id):
+            instance._revenue_facts = payment_facts(
+                Payment.objects.filter(booking_id=instance.pk).values_list("id", flat=True)
+            )
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, **kwargs):
+    from revenue_utils import move_facts, payment_facts
+    before = getattr(instance, "_revenue_facts", [])
+    if before:
+        move_facts(before, payment_facts(Payment.objects.filter(booking_id=instance.pk).values_list("id", flat=True)))
@@ -1,3 +1,1350 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from pathlib import Path
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.apps import apps as django_apps
+from django.contrib.auth.models import Permission, User
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+import archive_utils
+import availability_utils
+import baggage_utils
+import booking_utils
+import cache_utils
+import chart_utils
+import clock_utils
+import counter_utils
+import crew_utils
+import flight_utils
+import itinerary_utils
+import lease_utils
+import panel_utils
+import pricing_utils
+import profile_utils
+import propagation_utils
+import revenue_utils
+import rotation_utils
+import search_utils
+import seat_utils
+import security_utils
+import startup
+import status_utils
+import weather_utils
+from flights import views
+from flights.models import (
+    Aircraft, Airline, Airport, Baggage, Booking, CrewConflict, Delay, DiscountCode, Flight, FlightCrew, FlightStatusEvent,
+    JobLease, Passenger, Payment, Pilot, ProjectedDelay, RevenueFact, Route, SeatMap, SecurityCheck, StatusThreshold,
+    TableCount, Ticket,
+)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# one cold run of app.py in a fresh interpreter against a throwaway
+# database; Django is set up beforehand to migrate it, everything else
+# (pandas, plotly, the helpers) is left for the dashboard to import
+COLD_START_SCRIPT = """
+import json, os, sys, tempfile
+import django
+from django.conf import settings
+from django.core.management import call_command
+
+settings.DATABASES["default"]["NAME"] = os.path.join(tempfile.mkdtemp(), "db.sqlite3")
+django.setup()
+call_command("migrate", verbosity=0)
+
+from streamlit.testing.v1 import AppTest
+import startup
+
+app = AppTest.from_file("app.py", default_timeout=120)
+app.run()
+print(json.dumps({
+    "report": startup.get_startup_report()["cold"],
+    "exceptions": [str(exception.value) for exception in app.exception],
+}))
+"""
+
+
+class DashboardStartupTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE="mysite.settings",
+            DASHBOARD_MAINTENANCE="off",
+            DASHBOARD_CACHE_DIR=tempfile.mkdtemp(),
+        )
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BASE_DIR), env.get("PYTHONPATH")]))
+        result = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True, timeout=300,
+        )
+        if result.returncode != 0:
+            raise AssertionError(result.stderr)
+        output = json.loads(result.stdout.strip().splitlines()[-1])
+        cls.report = output["report"]
+        cls.exceptions = output["exceptions"]
+
+    def test_runs_without_exceptions(self):
+        self.assertEqual(self.exceptions, [])
+
+    def test_heavy_libraries_load_after_first_render(self):
+        self.assertEqual(self.report["heavy_at_first_render"], [])
+
+    def test_first_render_within_budget(self):
+        self.assertLessEqual(self.report["marks"]["first_render"], startup.FIRST_RENDER_BUDGET)
+
+    def test_ready_within_budget(self):
+        self.assertLessEqual(self.report["marks"]["ready"], startup.READY_BUDGET)
+
+    def test_import_stages_are_profiled(self):
+        stages = [stage["stage"] for stage in self.report["stages"]]
+        self.assertIn("import pandas", stages)
+        self.assertIn("django.setup", stages)
+
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+STATUSES = ["Scheduled", "Boarding", "Delayed", "In Flight", "On Time", "Landed", "Cancelled"]
+# (departure, arrival) relative to NOW
+TIMINGS = [
+    (timedelta(hours=-3), timedelta(hours=-1)),
+    (timedelta(hours=-1), timedelta(hours=1)),
+    (timedelta(minutes=30), timedelta(hours=3)),
+    (timedelta(minutes=45), timedelta(hours=3)),
+    (timedelta(hours=3), timedelta(hours=6)),
+]
+# delays as (minutes, updated_at relative to NOW), oldest first
+DELAYS = [
+    [],
+    [(30, timedelta(hours=-1))],
+    [(30, timedelta(days=-1))],
+    [(600, timedelta(hours=-1))],
+    [(601, timedelta(days=-1))],
+    [(700, timedelta(hours=-3)), (30, timedelta(hours=-1))],
+]
+
+
+def legacy_statuses(now):
+    # the imperative rules update_flight_statuses applied before
+    # status_utils, as {flight id: (old, new, cause)}
+    changes = {}
+    for flight in Flight.objects.exclude(status__in=["Cancelled", "Landed"]):
+        old_status = flight.status
+        new_status = old_status
+        latest_delay = Delay.objects.filter(flight=flight).order_by("-updated_at").first()
+        if latest_delay and latest_delay.minutes_delayed > 600:
+            new_status, cause = "Cancelled", "delay over 600 min"
+        elif flight.arrival_time < now:
+            new_status, cause = "Landed", "arrival time passed"
+        elif flight.departure_time < now:
+            if old_status != "Delayed":
+                new_status = "In Flight"
+            cause = "departure time passed"
+        else:
+            is_delayed = Delay.objects.filter(flight=flight, updated_at__date=now.date()).exists()
+            if is_delayed:
+                new_status, cause = "Delayed", "delay reported today"
+            elif flight.departure_time - now <= timedelta(minutes=45) and old_status != "Scheduled":
+                new_status, cause = "Boarding", "boarding window"
+            else:
+                new_status, cause = "Scheduled", "schedule"
+        if new_status != old_status:
+            if old_status == "Boarding" and new_status == "Scheduled":
+                continue
+            if old_status == "Delayed" and new_status in ["Scheduled", "Boarding"]:
+                continue
+            changes[flight.id] = (old_status, new_status, cause)
+    return changes
+
+
+class StatusRuleParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.airlines = [
+            Airline.objects.create(name="Alpha", iata_code="AA", country="LV"),
+            Airline.objects.create(name="Beta", iata_code="BB", country="LT"),
+        ]
+        riga = Airport.objects.create(code="RIX", name="Riga", city="Riga", country="LV")
+        vilnius = Airport.objects.create(code="VNO", name="Vilnius", city="Vilnius", country="LT")
+        cls.route = Route.objects.create(departure_airport=riga, arrival_airport=vilnius)
+        number = 0
+        for airline in cls.airlines:
+            for status in STATUSES:
+                for departure, arrival in TIMINGS:
+                    for delays in DELAYS:
+                        number += 1
+                        flight = Flight.objects.create(
+                            flight_number=f"{airline.iata_code}{number}", airline=airline, route=cls.route,
+                            departure_time=NOW + departure, arrival_time=NOW + arrival, status=status,
+                        )
+                        for minutes, updated in delays:
+                            delay = Delay.objects.create(flight=flight, reason="Test", minutes_delayed=minutes)
+                            Delay.objects.filter(pk=delay.pk).update(updated_at=NOW + updated)
+
+    def applied(self):
+        count = status_utils.apply_status_rules(NOW)
+        events = {
+            event.flight_id: (event.old_status, event.new_status, event.cause)
+            for event in FlightStatusEvent.objects.filter(occurred_at=NOW)
+        }
+        self.assertEqual(count, len(events))
+        for flight_id, status in Flight.objects.filter(id__in=events).values_list("id", "status"):
+            self.assertEqual(status, events[flight_id][1])
+        return events
+
+    def test_evaluation_matches_legacy_rules(self):
+        expected = legacy_statuses(NOW)
+        self.assertTrue(expected)
+        self.assertEqual(status_utils.evaluate_statuses(NOW), expected)
+
+    def test_update_matches_legacy_rules(self):
+        expected = legacy_statuses(NOW)
+        unchanged = dict(Flight.objects.exclude(id__in=expected).values_list("id", "status"))
+        self.assertEqual(self.applied(), expected)
+        self.assertEqual(dict(Flight.objects.exclude(id__in=expected).values_list("id", "status")), unchanged)
+
+    def test_second_pass_changes_nothing(self):
+        status_utils.apply_status_rules(NOW)
+        self.assertEqual(status_utils.apply_status_rules(NOW), 0)
+        self.assertEqual(legacy_statuses(NOW), {})
+
+    def test_airline_threshold_overrides_default(self):
+        StatusThreshold.objects.create(airline=self.airlines[0], cancel_after_minutes=20)
+        changes = self.applied()
+        for flight in Flight.objects.filter(id__in=changes).select_related("airline"):
+            old, new, cause = changes[flight.id]
+            if new == "Cancelled" and flight.airline == self.airlines[0]:
+                self.assertEqual(cause, "delay over 20 min")
+            elif new == "Cancelled":
+                self.assertEqual(cause, "delay over 600 min")
+        self.assertTrue(any(cause == "delay over 20 min" for _, _, cause in changes.values()))
+
+    def test_airport_threshold_applies_to_its_departures(self):
+        StatusThreshold.objects.create(airport=self.route.departure_airport, boarding_minutes=240)
+        changes = status_utils.evaluate_statuses(NOW)
+        boarding = {flight_id for flight_id, (_, new, _) in changes.items() if new == "Boarding"}
+        late = set(Flight.objects.filter(departure_time=NOW + timedelta(hours=3)).values_list("id", flat=True))
+        self.assertTrue(boarding & late)
+
+    @override_settings(FLIGHT_STATUS_TRANSITIONS={**status_utils.TRANSITIONS, "Delayed": ["Landed"]})
+    def test_transition_matrix_is_configurable(self):
+        changes = status_utils.evaluate_statuses(NOW)
+        self.assertFalse([change for change in changes.values() if change[:2] == ("Delayed", "Cancelled")])
+        self.assertTrue([change for change in changes.values() if change[:2] == ("Scheduled", "Cancelled")])
+
+
+def make_flight(number="AA1", capacity=12, **fields):
+    airline = Airline.objects.get_or_create(iata_code="AA", defaults={"name": "Alpha", "country": "LV"})[0]
+    riga = Airport.objects.get_or_create(code="RIX", defaults={"name": "Riga", "city": "Riga", "country": "LV"})[0]
+    vilnius = Airport.objects.get_or_create(code="VNO", defaults={"name": "Vilnius", "city": "Vilnius", "country": "LT"})[0]
+    route = Route.objects.get_or_create(departure_airport=riga, arrival_airport=vilnius)[0]
+    if "aircraft" not in fields:
+        fields["aircraft"] = Aircraft.objects.create(
+            model="ATR 72", registration_number=f"YL-{number}", capacity=capacity, manufacturer="ATR", airline=airline,
+        )
+    fields.setdefault("departure_time", NOW)
+    fields.setdefault("arrival_time", NOW + timedelta(hours=1))
+    return Flight.objects.create(flight_number=number, airline=airline, route=route, **fields)
+
+
+class SeatMapTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        self.passenger = Passenger.objects.create(first_name="Anna", last_name="Berzina", passport_number="LV1")
+
+    def seat_map(self):
+        return SeatMap.objects.get(flight=self.flight)
+
+    def test_seat_is_unique_per_flight(self):
+        Ticket.objects.create(passenger=self.passenger, flight=self.flight, seat="1A")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Ticket.objects.create(passenger=self.passenger, flight=self.flight, seat="1A")
+
+    def test_assign_seat_refuses_a_taken_seat(self):
+        seat_utils.assign_seat(self.flight, self.passenger, "1A")
+        with self.assertRaises(ValueError):
+            seat_utils.assign_seat(self.flight, self.passenger, "1A")
+        self.assertEqual(seat_utils.assign_seat(self.flight, self.passenger).seat, "1B")
+        self.assertEqual(self.seat_map().seats_taken, 2)
+
+    def test_tickets_saved_directly_update_the_map(self):
+        ticket = Ticket.objects.create(passenger=self.passenger, flight=self.flight, seat="2C")
+        self.assertNotIn("2C", seat_utils.free_seats(self.flight))
+        ticket.seat = "2D"
+        ticket.save()
+        free = seat_utils.free_seats(self.flight)
+        self.assertIn("2C", free)
+        self.assertNotIn("2D", free)
+        ticket.delete()
+        self.assertEqual(self.seat_map().seats_taken, 0)
+
+    def test_cascade_delete_frees_seats(self):
+        seat_utils.assign_seat(self.flight, self.passenger, "1A")
+        self.passenger.delete()
+        self.assertEqual(self.seat_map().seats_taken, 0)
+        self.assertEqual(self.seat_map().load_factor, 0)
+
+    def test_capacity_change_resizes_the_map(self):
+        seat_utils.assign_seat(self.flight, self.passenger, "1A")
+        self.flight.aircraft.capacity = 6
+        self.flight.aircraft.save()
+        seat_map = self.seat_map()
+        self.assertEqual((seat_map.capacity, seat_map.seats_taken), (6, 1))
+        self.assertAlmostEqual(seat_map.load_factor, 1 / 6)
+
+
+    def test_tickets_past_the_cabin_count_and_fill_the_flight(self):
+        # an aircraft swapped for a smaller one leaves tickets past its capacity
+        for seat in ("1A", "1B", "1C", "1D"):
+            seat_utils.assign_seat(self.flight, self.passenger, seat)
+        self.flight.aircraft.capacity = 2
+        self.flight.aircraft.save()
+        self.assertEqual(self.seat_map().seats_taken, 4)
+        self.assertEqual(seat_utils.free_seats(self.flight), [])
+        with self.assertRaises(ValueError):
+            seat_utils.assign_seat(self.flight, self.passenger)
+        self.assertEqual(seat_utils.claim_seats([(self.flight.id, None)]), [None])
+        Ticket.objects.get(seat="1D").delete()
+        Ticket.objects.get(seat="1C").delete()
+        self.assertEqual(self.seat_map().seats_taken, 2)
+        self.assertEqual(seat_utils.free_seats(self.flight), [])
+
+
+class SeatMapBackfillTests(TestCase):
+    # tickets as older data had them: random seats from 32 rows of six,
+    # whatever the aircraft, on flights with maps that predate the backfill
+    def setUp(self):
+        rng = random.Random(7)
+        seats = [f"{row}{letter}" for row in range(1, 33) for letter in "ABCDEF"]
+        passenger = Passenger.objects.create(first_name="Anna", last_name="Berzina", passport_number="LV1")
+        flights = [make_flight(f"AA{capacity}", capacity=capacity) for capacity in (10, 18, 78, 192)]
+        flights.append(make_flight("AA0", aircraft=None))
+        tickets = [
+            Ticket(passenger=passenger, flight=flight, seat=seat)
+            for flight in flights for seat in rng.sample(seats, 14)
+        ]
+        Ticket.objects.bulk_create(tickets)
+        SeatMap.objects.all().delete()
+        self.over_full = flights[0]
+
+    def backfill(self):
+        migration = importlib.import_module("flights.migrations.0015_backfill_seat_maps")
+        migration.reseat_out_of_cabin_tickets(django_apps, None)
+        migration.build_seat_maps(django_apps, None)
+
+    def test_every_ticket_is_counted(self):
+        self.backfill()
+        self.assertEqual(SeatMap.objects.aggregate(total=Sum("seats_taken"))["total"], Ticket.objects.count())
+
+    def test_tickets_are_moved_into_the_cabin(self):
+        self.backfill()
+        outside = [
+            (flight_id, seat) for flight_id, seat, capacity in Ticket.objects.values_list(
+                "flight_id", "seat", "flight__seat_map__capacity"
+            ) if seat_utils.seat_index(seat) >= capacity
+        ]
+        # only the 14 tickets on the 10-seat aircraft cannot all fit
+        self.assertEqual(len(outside), 4)
+        self.assertEqual({flight_id for flight_id, _ in outside}, {self.over_full.id})
+        self.assertEqual(seat_utils.free_seats(self.over_full), [])
+
+    def test_backfill_matches_rebuild(self):
+        self.backfill()
+        backfilled = self.seat_maps()
+        seat_utils.rebuild_seat_maps()
+        self.assertEqual(self.seat_maps(), backfilled)
+
+    def seat_maps(self):
+        return {
+            (seat_map.flight_id, seat_map.capacity, bytes(seat_map.bitmap), seat_map.seats_taken)
+            for seat_map in SeatMap.objects.all()
+        }
+
+
+class ConcurrentSeatClaimTests(TransactionTestCase):
+    def test_concurrent_claims_never_share_a_seat(self):
+        flight = make_flight(capacity=30)
+        passenger = Passenger.objects.create(first_name="Anna", last_name="Berzina", passport_number="LV1")
+        seat_utils.rebuild_seat_maps(Flight.objects.filter(pk=flight.pk))
+        claimed, errors = [], []
+
+        def claim():
+            # SQLite answers a lock conflict with an error rather than a
+            # wait, so a worker that loses simply retries
+            try:
+                for _ in range(200):
+                    try:
+                        with transaction.atomic():
+                            seats = seat_utils.claim_seats([(flight.id, "1A"), (flight.id, None)])
+                            Ticket.objects.bulk_create([
+                                Ticket(passenger=passenger, flight=flight, seat=seat) for seat in seats if seat
+                            ])
+                        claimed.extend(seat for seat in seats if seat)
+                        return
+                    except OperationalError:
+                        time.sleep(0.005)
+                errors.append("gave up")
+            except IntegrityError as e:
+                errors.append(str(e))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=claim) for _ in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(claimed.count("1A"), 1)
+        self.assertEqual(len(claimed), len(set(claimed)))
+        self.assertEqual(len(claimed), 9)
+        seat_map = SeatMap.objects.get(flight=flight)
+        self.assertEqual(seat_map.seats_taken, Ticket.objects.filter(flight=flight).count())
+
+
+class BookingIngestTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight(capacity=6)
+
+    def sale(self, passport, **fields):
+        return {
+            "passport_number": passport, "first_name": "Janis", "last_name": "Ozolins",
+            "flight_id": self.flight.id, "total_price": "120.50", "method": "PayPal", **fields,
+        }
+
+    def ingest(self, *sales):
+        return booking_utils.ingest_sales(io.StringIO("".join(json.dumps(sale) + "\n" for sale in sales)))
+
+    def test_accepted_sales_are_written(self):
+        report = self.ingest(self.sale("LV1", seat="1c"), self.sale("LV2", status="Confirmed"))
+        self.assertEqual((report.accepted, report.rejected), (2, []))
+        self.assertEqual(sorted(Ticket.objects.values_list("seat", flat=True)), ["1A", "1C"])
+        self.assertEqual(Booking.objects.filter(flight=self.flight).count(), 2)
+        self.assertEqual(sum(Payment.objects.values_list("amount", flat=True)), 241)
+        self.assertEqual(SeatMap.objects.get(flight=self.flight).seats_taken, 2)
+
+    def test_invalid_rows_are_rejected_without_writes(self):
+        report = self.ingest(
+            self.sale("LV1", method="Cash"), self.sale("LV2", flight_id=999999), self.sale("LV3", total_price="-1"),
+        )
+        self.assertEqual(report.accepted, 0)
+        self.assertEqual([row["line"] for row in report.rejected], [1, 2, 3])
+        self.assertFalse(Passenger.objects.exists())
+
+    def test_unseated_rows_leave_no_passenger(self):
+        report = self.ingest(self.sale("LV1", seat="1A"), self.sale("LV2", seat="1A"), self.sale("LV3", seat="9Z"))
+        self.assertEqual(report.accepted, 1)
+        self.assertEqual([row["reason"] for row in report.rejected], ["seat 1A unavailable", "seat 9Z unavailable"])
+        self.assertEqual(list(Passenger.objects.values_list("passport_number", flat=True)), ["LV1"])
+
+    def test_full_flight_rejects_the_rest(self):
+        report = self.ingest(*[self.sale(f"LV{number}") for number in range(8)])
+        self.assertEqual(report.accepted, 6)
+        self.assertEqual({row["reason"] for row in report.rejected}, {"flight is full"})
+
+    def test_booking_ids_are_not_reused_after_rows_move_out(self):
+        self.ingest(self.sale("LV1"), self.sale("LV2"))
+        last = Booking.objects.latest("id").id
+        # what archiving does to the newest bookings
+        Booking.objects.filter(id=last).delete()
+        self.ingest(self.sale("LV3"))
+        self.assertGreater(Booking.objects.latest("id").id, last)
+
+    def test_search_index_is_refreshed_after_the_batch(self):
+        self.ingest(self.sale("LV123456"))
+        # the flight number is only in the index once the ticket is
+        found = search_utils.search_passengers(f"Ozolins {self.flight.flight_number}")
+        self.assertEqual([row["passport_number"] for row in found], ["LV123456"])
+        self.assertEqual(found[0]["bookings"], 1)
+
+
+class JobLeaseTests(TestCase):
+    def test_failed_run_leaves_no_watermark(self):
+        def fail():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            lease_utils.run_exclusive("job", fail)
+        lease = JobLease.objects.get(name="job")
+        self.assertEqual((lease.owner, lease.expires_at, lease.last_run_at, lease.runs), ("", None, None, 0))
+        self.assertEqual(lease_utils.run_exclusive("job", lambda: 42), (True, 42))
+
+    def test_successful_run_is_skipped_within_interval(self):
+        self.assertEqual(lease_utils.run_exclusive("job", lambda: 1), (True, 1))
+        self.assertEqual(lease_utils.run_exclusive("job", lambda: 2), (False, None))
+        lease = JobLease.objects.get(name="job")
+        self.assertEqual((lease.runs, lease.skips), (1, 1))
+        self.assertIsNotNone(lease.last_run_at)
+
+
+class StatusEventTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight("AA1", departure_time=NOW + timedelta(hours=1), status="Cancelled")
+        self.quiet = make_flight("AA2", departure_time=NOW + timedelta(hours=2), status="Scheduled")
+        make_flight("AA3", departure_time=NOW + timedelta(days=1))
+        self.events = [
+            FlightStatusEvent.objects.create(
+                flight=self.flight, old_status=old, new_status=new, occurred_at=NOW + timedelta(hours=hours), cause="rule",
+            )
+            for old, new, hours in [("Scheduled", "Delayed", -1), ("Delayed", "Cancelled", 1)]
+        ]
+
+    def test_tail_returns_events_after_the_last_seen_id(self):
+        events = flight_utils.tail_status_events()
+        self.assertEqual([event["id"] for event in events], [event.id for event in self.events])
+        self.assertEqual(events[0]["flight__flight_number"], "AA1")
+        after = flight_utils.tail_status_events(after_id=self.events[0].id)
+        self.assertEqual([event["new_status"] for event in after], ["Cancelled"])
+        self.assertEqual(len(flight_utils.tail_status_events(limit=1)), 1)
+        self.assertEqual(flight_utils.tail_status_events(after_id=self.events[-1].id), [])
+
+    def board(self, at):
+        return {row["flight_number"]: row["status_at"] for row in flight_utils.board_state_at(at)}
+
+    def test_board_replays_statuses_at_a_moment(self):
+        # before any event, between the two, and after both
+        self.assertEqual(self.board(NOW - timedelta(hours=2)), {"AA1": "Scheduled", "AA2": "Scheduled"})
+        self.assertEqual(self.board(NOW), {"AA1": "Delayed", "AA2": "Scheduled"})
+        self.assertEqual(self.board(NOW + timedelta(hours=2)), {"AA1": "Cancelled", "AA2": "Scheduled"})
+
+
+class CrewConflictTests(TestCase):
+    def setUp(self):
+        self.pilot = Pilot.objects.create(name="Ilze", surname="Kalnina", airline=make_flight("AA0").airline)
+
+    def assign(self, number, start_hours, end_hours):
+        flight = make_flight(
+            number, departure_time=NOW + timedelta(hours=start_hours), arrival_time=NOW + timedelta(hours=end_hours),
+        )
+        return FlightCrew.objects.create(flight=flight, pilot=self.pilot, role_on_flight="Captain")
+
+    def recorded(self):
+        return set(CrewConflict.objects.values_list("first_id", "second_id", "overlap_minutes"))
+
+    def test_sweep_reports_each_overlap_once(self):
+        hours = [NOW + timedelta(hours=hour) for hour in range(6)]
+        intervals = [(hours[0], hours[3], 1), (hours[1], hours[2], 2), (hours[2], hours[4], 3), (hours[4], hours[5], 4)]
+        self.assertEqual(
+            sorted(crew_utils.find_overlaps(intervals)),
+            [(1, 2, 60), (1, 3, 60)],
+        )
+
+    def test_assignment_records_its_overlaps(self):
+        first = self.assign("AA1", 0, 2)
+        second = self.assign("AA2", 1, 3)
+        self.assign("AA3", 3, 4)
+        self.assertEqual(self.recorded(), {(first.id, second.id, 60)})
+
+    def test_moving_a_flight_rechecks_its_crew(self):
+        first = self.assign("AA1", 0, 2)
+        second = self.assign("AA2", 3, 4)
+        self.assertEqual(self.recorded(), set())
+        flight = second.flight
+        flight.departure_time = NOW + timedelta(minutes=90)
+        flight.save()
+        self.assertEqual(self.recorded(), {(first.id, second.id, 30)})
+        flight.departure_time = NOW + timedelta(hours=3)
+        flight.save()
+        self.assertEqual(self.recorded(), set())
+
+    def test_full_detection_matches_incremental(self):
+        for number, (start, end) in enumerate([(0, 2), (1, 3), (2.5, 5), (6, 7), (6.5, 6.75)]):
+            self.assign(f"AA{number + 1}", start, end)
+        incremental = self.recorded()
+        self.assertEqual(crew_utils.detect_crew_conflicts(), len(incremental))
+        self.assertEqual(self.recorded(), incremental)
+
+    def test_cancelled_flights_take_no_ones_time(self):
+        first = self.assign("AA1", 0, 2)
+        second = self.assign("AA2", 1, 3)
+        flight = second.flight
+        flight.status = "Cancelled"
+        flight.save()
+        self.assertEqual(self.recorded(), set())
+        self.assertEqual(crew_utils.detect_crew_conflicts(), 0)
+        self.assertFalse(crew_utils.find_assignment_conflicts(first.flight, pilot=self.pilot, exclude_id=first.id).exists())
+        flight.status = "Scheduled"
+        flight.save()
+        self.assertEqual(self.recorded(), {(first.id, second.id, 60)})
+
+    def test_backfill_matches_full_detection(self):
+        for number, (start, end) in enumerate([(0, 2), (1, 3), (2.5, 5), (6, 7)]):
+            self.assign(f"AA{number + 1}", start, end)
+        Flight.objects.filter(pk=self.assign("AA9", 1, 2).flight_id).update(status="Cancelled")
+        CrewConflict.objects.all().delete()
+        migration = importlib.import_module("flights.migrations.0016_backfill_crew_conflicts")
+        migration.detect_crew_conflicts(django_apps, None)
+        backfilled = self.recorded()
+        crew_utils.detect_crew_conflicts()
+        self.assertEqual(self.recorded(), backfilled)
+        self.assertEqual(len(backfilled), 2)
+
+
+class KnockOnDelayTests(TestCase):
+    def setUp(self):
+        propagation_utils.invalidate()
+        self.start = clock_utils.now().replace(microsecond=0) + timedelta(hours=1)
+        self.first = make_flight("AA1", departure_time=self.start, arrival_time=self.start + timedelta(hours=1))
+        self.aircraft = self.first.aircraft
+        # 45 min turnaround, no slack; then 20 and 60 min of slack
+        self.second = self.leg("AA2", self.first, 45)
+        self.third = self.leg("AA3", self.second, 65)
+        self.fourth = self.leg("AA4", self.third, 105)
+
+    def leg(self, number, after, gap_minutes, aircraft=None):
+        departure = after.arrival_time + timedelta(minutes=gap_minutes)
+        return make_flight(
+            number, aircraft=aircraft or self.aircraft, departure_time=departure, arrival_time=departure + timedelta(hours=1),
+        )
+
+    def delay(self, flight, minutes):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Delay.objects.create(flight=flight, reason="Weather", minutes_delayed=minutes)
+
+    def projected(self):
+        return {
+            flight_id: (minutes, source_id, via)
+            for flight_id, minutes, source_id, via in ProjectedDelay.objects.values_list("flight_id", "minutes", "source_id", "via")
+        }
+
+    def test_chain_keeps_its_root_source(self):
+        self.delay(self.first, 60)
+        self.assertEqual(self.projected(), {
+            self.second.id: (60, self.first.id, "aircraft"),
+            self.third.id: (40, self.first.id, "aircraft"),
+        })
+
+    def test_slack_absorbs_the_delay(self):
+        self.delay(self.first, 15)
+        self.assertEqual(self.projected(), {
+            self.second.id: (15, self.first.id, "aircraft"),
+        })
+        delay = self.delay(self.first, 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            Delay.objects.filter(pk__lt=delay.pk).delete()
+        self.assertEqual(self.projected(), {self.second.id: (10, self.first.id, "aircraft")})
+
+    def test_crew_and_aircraft_edges(self):
+        pilot = Pilot.objects.create(name="Ilze", surname="Kalnina", airline=self.first.airline)
+        # another aircraft, but the same pilot 40 min after AA1 lands
+        elsewhere = self.leg("AA5", self.first, 40, aircraft=make_flight("AA0").aircraft)
+        with self.captureOnCommitCallbacks(execute=True):
+            FlightCrew.objects.create(flight=self.first, pilot=pilot, role_on_flight="Captain")
+            crew = FlightCrew.objects.create(flight=elsewhere, pilot=pilot, role_on_flight="Captain")
+        self.delay(self.first, 60)
+        self.assertEqual(self.projected()[elsewhere.id], (50, self.first.id, "crew"))
+        # the pilot moves to AA2, where the aircraft link is the tighter one
+        crew.flight = self.second
+        with self.captureOnCommitCallbacks(execute=True):
+            crew.save()
+        projected = self.projected()
+        self.assertNotIn(elsewhere.id, projected)
+        self.assertEqual(projected[self.second.id], (60, self.first.id, "aircraft"))
+
+    def test_incremental_matches_rebuild(self):
+        self.delay(self.first, 30)
+        self.delay(self.third, 80)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.third.departure_time += timedelta(minutes=10)
+            self.third.arrival_time += timedelta(minutes=10)
+            self.third.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.status = "Cancelled"
+            self.second.save()
+        self.delay(self.first, 90)
+        incremental = self.projected()
+        self.assertTrue(incremental)
+        self.assertEqual(propagation_utils.rebuild_projected_delays(), len(incremental))
+        self.assertEqual(self.projected(), incremental)
+
+    def test_rule_driven_cancellations_notify_like_saves(self):
+        StatusThreshold.objects.create(cancel_after_minutes=30)
+        pilot = Pilot.objects.create(name="Ilze", surname="Kalnina", airline=self.first.airline)
+        overlapping = make_flight("AA5", departure_time=self.second.departure_time, arrival_time=self.second.arrival_time)
+        FlightCrew.objects.create(flight=self.second, pilot=pilot, role_on_flight="Captain")
+        FlightCrew.objects.create(flight=overlapping, pilot=pilot, role_on_flight="Captain")
+        self.delay(self.second, 60)
+        self.assertEqual(self.projected(), {
+            self.third.id: (40, self.second.id, "aircraft"),
+            overlapping.id: (60, self.second.id, "crew"),
+        })
+        self.assertEqual(CrewConflict.objects.count(), 1)
+        availability_utils.get_availability_index()
+        itinerary_utils.get_timetable()
+        pricing_utils.get_pricing_index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(status_utils.apply_status_rules(), 1)
+        self.assertEqual(Flight.objects.get(pk=self.second.pk).status, "Cancelled")
+        self.assertEqual(self.projected(), {})
+        self.assertEqual(CrewConflict.objects.count(), 0)
+        self.assertFalse(any(index.is_built() for index in (availability_utils, itinerary_utils, pricing_utils)))
+
+
+class RotationAnalyticsTests(SimpleTestCase):
+    def frame(self):
+        rows = [
+            # tail 1: a clean turn, then a leg that leaves before AA2 lands, from the wrong airport
+            (1, "AA1", 1, "YL-A", 8, 9, "RIX", "VNO"),
+            (2, "AA2", 1, "YL-A", 9.5, 10.5, "VNO", "RIX"),
+            (3, "AA3", 1, "YL-A", 10, 11, "TLL", "RIX"),
+            # tail 2 starts before tail 1 ends; rows of different tails are never compared
+            (4, "BB1", 2, "YL-B", 8, 9, "RIX", "VNO"),
+            (5, "BB2", 2, "YL-B", 10, 11, "RIX", "TLL"),
+        ]
+        return pd.DataFrame([
+            {
+                "id": flight_id, "flight_number": number, "aircraft_id": aircraft_id, "registration": registration,
+                "departure_time": NOW.replace(hour=0) + timedelta(hours=departs),
+                "arrival_time": NOW.replace(hour=0) + timedelta(hours=arrives),
+                "origin": origin, "destination": destination,
+            }
+            for flight_id, number, aircraft_id, registration, departs, arrives, origin, destination in rows
+        ])
+
+    def test_overlaps_and_mismatches_stay_within_a_tail(self):
+        day = NOW.replace(hour=0)
+        summary, issues = rotation_utils.analyse_rotations(self.frame(), day + timedelta(hours=8), day + timedelta(hours=12))
+        self.assertEqual(
+            list(zip(issues["flight"], issues["next_flight"], issues["problem"])),
+            [("AA2", "AA3", "overlap, airport mismatch"), ("BB1", "BB2", "airport mismatch")],
+        )
+        by_tail = summary.set_index("registration")
+        self.assertEqual((by_tail.loc["YL-A", "overlaps"], by_tail.loc["YL-A", "airport_mismatches"]), (1, 1))
+        self.assertEqual((by_tail.loc["YL-B", "overlaps"], by_tail.loc["YL-B", "airport_mismatches"]), (0, 1))
+        self.assertAlmostEqual(by_tail.loc["YL-A", "utilisation_pct"], 75)
+        self.assertAlmostEqual(by_tail.loc["YL-A", "min_turnaround_hours"], -0.5)
+
+    def test_empty_frame(self):
+        summary, issues = rotation_utils.analyse_rotations(pd.DataFrame())
+        self.assertTrue(summary.empty and issues.empty)
+
+
+class ItinerarySearchTests(SimpleTestCase):
+    # airports 1 to 4; a slow direct flight, a faster three-leg chain, and a
+    # quicker two-leg route whose 30 min connection is too tight
+    def setUp(self):
+        day = NOW.replace(hour=0)
+        self.timetable = itinerary_utils.Timetable()
+        for departs, arrives, source, target, flight_id in [
+            (8, 14, 1, 4, 1),
+            (8, 9, 1, 2, 2), (10, 11, 2, 3, 3), (12, 13, 3, 4, 4),
+            (9.5, 10.5, 2, 4, 5),
+        ]:
+            flight = Flight(
+                id=flight_id, flight_number=f"AA{flight_id}", status="Scheduled",
+                departure_time=day + timedelta(hours=departs), arrival_time=day + timedelta(hours=arrives),
+            )
+            flight.route = Route(id=flight_id, departure_airport_id=source, arrival_airport_id=target)
+            self.timetable.update_flight(flight)
+        self.start = day + timedelta(hours=7)
+
+    def flights(self, legs):
+        return [leg["flight_id"] for leg in legs] if legs is not None else None
+
+    def test_earliest_arrival_takes_more_legs(self):
+        self.assertEqual(self.flights(self.timetable.earliest_arrival(1, 4, self.start)), [2, 3, 4])
+
+    def test_fewest_legs_takes_the_direct_flight(self):
+        self.assertEqual(self.flights(self.timetable.fewest_legs(1, 4, self.start)), [1])
+
+    def test_minimum_connection_is_respected(self):
+        no_minimum = timedelta(0)
+        self.assertEqual(self.flights(self.timetable.earliest_arrival(1, 4, self.start, no_minimum)), [2, 5])
+        self.assertEqual(self.flights(self.timetable.fewest_legs(1, 3, self.start, no_minimum)), [2, 3])
+
+    def test_no_journey(self):
+        self.assertIsNone(self.timetable.earliest_arrival(4, 1, self.start))
+        self.assertIsNone(self.timetable.fewest_legs(1, 4, self.start + timedelta(hours=2)))
+
+
+class SecurityThroughputTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        self.passenger = Passenger.objects.create(first_name="Anna", last_name="Berzina", passport_number="LV1")
+
+    def check(self, at, status="Cleared"):
+        check = SecurityCheck.objects.create(passenger=self.passenger, flight=self.flight, status=status)
+        # checked_at is auto_now_add; moving it is an update the counters follow
+        check.checked_at = at
+        check.save()
+        return check
+
+    def series(self, column, now):
+        frame = security_utils.get_checkpoint_throughput(window=timedelta(minutes=15), now=now)
+        return list(frame[column])
+
+    def test_bucket_start_boundaries(self):
+        self.assertEqual(security_utils.bucket_start(NOW + timedelta(minutes=4, seconds=59, microseconds=999999)), NOW)
+        self.assertEqual(security_utils.bucket_start(NOW + timedelta(minutes=5)), NOW + timedelta(minutes=5))
+        self.assertEqual(security_utils.bucket_start(NOW - timedelta(microseconds=1)), NOW - timedelta(minutes=5))
+
+    def test_checks_land_in_their_bucket_and_follow_moves(self):
+        self.check(NOW + timedelta(minutes=4, seconds=59))
+        moved = self.check(NOW + timedelta(minutes=5), status="Pending")
+        now = NOW + timedelta(minutes=12)
+        # buckets 11:55, 12:00, 12:05 and 12:10, the empty ones filled in
+        self.assertEqual(self.series("checks", now), [0, 1, 1, 0])
+        self.assertEqual(self.series("pending", now), [0, 0, 1, 0])
+        moved.checked_at = NOW + timedelta(minutes=10)
+        moved.status = "Cleared"
+        moved.save()
+        self.assertEqual(self.series("checks", now), [0, 1, 0, 1])
+        self.assertEqual(self.series("cleared", now), [0, 1, 0, 1])
+        self.assertEqual(self.series("pending", now), [0, 0, 0, 0])
+        moved.delete()
+        self.assertEqual(self.series("checks", now), [0, 1, 0, 0])
+
+
+class SharedCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.saved = cache_utils.CACHE_DIR, cache_utils.MAX_BYTES
+        cache_utils.CACHE_DIR = Path(self.directory.name)
+        cache_utils._local.db = None
+
+    def tearDown(self):
+        cache_utils._local.db.close()
+        cache_utils._local.db = None
+        cache_utils.CACHE_DIR, cache_utils.MAX_BYTES = self.saved
+        self.directory.cleanup()
+
+    def in_other_process(self, func):
+        # a different thread has a different owner and its own connection
+        result = []
+        worker = threading.Thread(target=lambda: result.append(func()))
+        worker.start()
+        worker.join()
+        return result[0]
+
+    def test_one_caller_claims_a_key(self):
+        now = time.time()
+        self.assertTrue(cache_utils._claim("k", now))
+        self.assertTrue(cache_utils._claim("k", now))
+        self.assertFalse(self.in_other_process(lambda: cache_utils._claim("k", now)))
+        # a holder that died is taken over once its claim runs out
+        self.assertTrue(self.in_other_process(lambda: cache_utils._claim("k", now + cache_utils.COMPUTE_TIMEOUT + 1)))
+
+    def test_stale_value_is_served_while_another_caller_recomputes(self):
+        cache_utils.get_or_compute("k", lambda: 1, ttl=-1)
+        cache_utils._claim("k", time.time())
+        calls = []
+        stale = self.in_other_process(lambda: cache_utils.get_or_compute("k", lambda: calls.append(1) or 2))
+        self.assertEqual((stale, calls), (1, []))
+        cache_utils._release("k")
+        self.assertEqual(cache_utils.get_or_compute("k", lambda: 2), 2)
+
+    def test_evicts_least_recently_used(self):
+        for key in ("a", "b", "c"):
+            cache_utils.get_or_compute(key, lambda: "x" * 100)
+        db = cache_utils._connect()
+        for key, last_access in (("a", 3), ("b", 1), ("c", 2)):
+            db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (last_access, key))
+        cache_utils.MAX_BYTES = 250
+        cache_utils._evict(db)
+        self.assertEqual([row[0] for row in db.execute("SELECT key FROM entries ORDER BY key")], ["a", "c"])
+        cache_utils.MAX_BYTES = 150
+        cache_utils._evict(db)
+        self.assertEqual([row[0] for row in db.execute("SELECT key FROM entries")], ["a"])
+
+
+class PanelQueryTests(SimpleTestCase):
+    def test_each_panel_times_out_or_fails_on_its_own(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def broken():
+            raise ValueError("bad panel")
+
+        started = time.monotonic()
+        panels = panel_utils.PanelQueries({
+            "slow": lambda: release.wait(5) and "late",
+            "broken": broken,
+            "quick": lambda: "ok",
+        }, timeout=0.2)
+        with self.assertRaises(TimeoutError):
+            panels.result("slow")
+        # the slow panel holds the section up only until the deadline
+        self.assertLess(time.monotonic() - started, 1)
+        with self.assertRaisesMessage(ValueError, "bad panel"):
+            panels.result("broken")
+        self.assertEqual(panels.result("quick"), "ok")
+
+
+class SimulatedClockTests(TestCase):
+    def test_clock_from_env(self):
+        clock = clock_utils.clock_from_env("2026-10-19T06:00@100")
+        self.assertEqual(clock.start, datetime(2026, 10, 19, 6, 0, tzinfo=timezone.utc))
+        self.assertEqual(clock.speed, 100)
+        self.assertEqual(clock.real_seconds(timedelta(minutes=100)), 60)
+        self.assertEqual(clock_utils.clock_from_env("2026-10-19T06:00").speed, 1)
+        self.assertIsNone(clock_utils.clock_from_env(""))
+
+    def test_use_clock_overrides_now_and_restores(self):
+        before = clock_utils.get_clock()
+        with clock_utils.use_clock(clock_utils.SimulatedClock(NOW, speed=0)):
+            self.assertEqual(clock_utils.now(), NOW)
+            self.assertEqual(clock_utils.today(), NOW.date())
+            # leases are stamped on the same clock
+            lease_utils.run_exclusive("job", lambda: None)
+            self.assertEqual(JobLease.objects.get(name="job").last_run_at, NOW)
+            self.assertEqual(lease_utils.run_exclusive("job", lambda: None), (False, None))
+        self.assertIs(clock_utils.get_clock(), before)
+
+    def test_replay_day_runs_the_engine_on_simulated_time(self):
+        day = datetime(2026, 10, 10, tzinfo=timezone.utc)
+        flight = make_flight(
+            departure_time=day + timedelta(minutes=35), arrival_time=day + timedelta(minutes=85), status="Scheduled",
+        )
+        output = io.StringIO()
+        call_command(
+            "replay_day", "--date", "2026-10-10", "--hours", "1.6", "--tick", "600", "--speed", "7200",
+            "--delay-rate", "0", "--sections", "", stdout=output,
+        )
+        self.assertIn("Replay finished", output.getvalue())
+        events = list(FlightStatusEvent.objects.filter(flight=flight).order_by("id").values_list(
+            "old_status", "new_status", "occurred_at"
+        ))
+        self.assertEqual([event[:2] for event in events], [("Scheduled", "In Flight"), ("In Flight", "Landed")])
+        # the first tick after departure and after arrival, not the wall clock
+        for (_, _, occurred_at), expected in zip(events, [day + timedelta(minutes=40), day + timedelta(minutes=90)]):
+            self.assertLess(abs(occurred_at - expected), timedelta(minutes=5))
+        flight.refresh_from_db()
+        self.assertEqual(flight.status, "Landed")
+
+
+class DownsampleTests(SimpleTestCase):
+    def test_lttb_keeps_the_endpoints_and_exactly_threshold_points(self):
+        rng = np.random.default_rng(5)
+        for length, threshold in [(10, 3), (1000, 100), (1001, 250), (5000, 2000)]:
+            x = np.sort(rng.uniform(0, 1000, length))
+            y = rng.normal(size=length)
+            kept = chart_utils.lttb(x, y, threshold)
+            self.assertEqual(len(kept), threshold)
+            self.assertEqual((kept[0], kept[-1]), (0, length - 1))
+            self.assertTrue((np.diff(kept) > 0).all())
+
+    def test_lttb_keeps_a_spike(self):
+        y = np.zeros(1000)
+        y[437] = 50
+        self.assertIn(437, chart_utils.lttb(np.arange(1000), y, 20))
+
+    def test_short_series_are_kept_whole(self):
+        self.assertEqual(list(chart_utils.lttb(np.arange(5), np.arange(5), 10)), [0, 1, 2, 3, 4])
+        self.assertEqual(len(chart_utils.lttb(np.arange(50), np.arange(50), 2)), 50)
+
+
+class TableCountTests(TestCase):
+    def setUp(self):
+        self.flights = [make_flight(f"AA{number}", status="Scheduled") for number in range(3)]
+
+    def test_inserts_and_deletes_are_counted(self):
+        self.assertEqual(counter_utils.get_count(Flight), 3)
+        self.flights[0].delete()
+        self.assertEqual(counter_utils.get_count(Flight), 2)
+        # raw deletes too: the triggers are in the database, not in Django
+        Flight.objects.filter(pk=self.flights[1].pk)._raw_delete("default")
+        self.assertEqual(counter_utils.get_count(Flight), 1)
+
+    def test_status_changes_move_between_counters(self):
+        Flight.objects.filter(pk=self.flights[0].pk).update(status="Delayed")
+        self.assertEqual(counter_utils.get_status_counts(Flight), {"Scheduled": 2, "Delayed": 1})
+        self.assertEqual(counter_utils.get_count(Flight, "Delayed"), 1)
+        Flight.objects.update(status="Landed")
+        self.assertEqual(counter_utils.get_status_counts(Flight), {"Landed": 3})
+        self.assertEqual(counter_utils.get_count(Flight), 3)
+
+    def test_summed_column_follows_updates(self):
+        first = Delay.objects.create(flight=self.flights[0], reason="Weather", minutes_delayed=30)
+        Delay.objects.create(flight=self.flights[1], reason="Weather", minutes_delayed=90)
+        self.assertEqual(counter_utils.get_average(Delay), 60)
+        Delay.objects.filter(pk=first.pk).update(minutes_delayed=10)
+        self.assertEqual(counter_utils.get_counter(Delay), (2, 100))
+
+    def test_archived_rows_are_added_to_the_hot_table(self):
+        table = Flight._meta.db_table
+        TableCount.objects.create(table_name=counter_utils.ARCHIVE_PREFIX + table, status="", count=5, total=0)
+        TableCount.objects.create(table_name=counter_utils.ARCHIVE_PREFIX + table, status="Landed", count=5, total=0)
+        self.assertEqual(counter_utils.get_count(Flight), 8)
+        self.assertEqual(counter_utils.get_status_counts(Flight), {"Scheduled": 3, "Landed": 5})
+
+    def test_rebuild_repairs_drift(self):
+        table = Flight._meta.db_table
+        TableCount.objects.filter(table_name=table, status="").update(count=999)
+        TableCount.objects.filter(table_name=table, status="Scheduled").delete()
+        drift = counter_utils.rebuild_table_counts([Flight])
+        self.assertEqual(sorted(drift), [(table, "", (999, 0), (3, 0)), (table, "Scheduled", (0, 0), (3, 0))])
+        self.assertEqual(counter_utils.get_count(Flight), 3)
+        self.assertEqual(counter_utils.rebuild_table_counts([Flight]), [])
+
+
+class ArchiveTests(TransactionTestCase):
+    databases = {"default", archive_utils.ARCHIVE_ALIAS}
+
+    def setUp(self):
+        # a file of our own for the archive, which archive_utils attaches by path
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive = connections[archive_utils.ARCHIVE_ALIAS]
+        self.test_name = self.archive.settings_dict["NAME"]
+        self.archive.settings_dict["NAME"] = os.path.join(self.directory.name, "archive.sqlite3")
+        # an in-memory database ignores close(), so swap the name in first
+        self.archive.close()
+        archive_utils._watermark.update(built_at=0.0)
+
+        old = clock_utils.now() - timedelta(days=40)
+        self.old = make_flight("AA1", departure_time=old, arrival_time=old + timedelta(hours=1), status="Landed")
+        self.recent = make_flight("AA2", departure_time=clock_utils.now() - timedelta(days=1), status="Landed")
+        passenger = Passenger.objects.create(first_name="Anna", last_name="Berzina", passport_number="LV1")
+        for flight, amount in [(self.old, "120.50"), (self.recent, "80.25")]:
+            Ticket.objects.create(passenger=passenger, flight=flight, seat="1A")
+            booking = Booking.objects.create(passenger=passenger, flight=flight, status="Confirmed", total_price=amount)
+            Payment.objects.create(booking=booking, amount=amount, method="Card")
+            Delay.objects.create(flight=flight, reason="Weather", minutes_delayed=20)
+
+    def tearDown(self):
+        self.archive.close()
+        self.archive.settings_dict["NAME"] = self.test_name
+        archive_utils._watermark.update(built_at=0.0)
+        self.directory.cleanup()
+
+    def counts(self):
+        return {model.__name__: counter_utils.get_count(model) for model in (Flight, Ticket, Booking, Delay)}
+
+    def test_old_flights_move_with_their_rows(self):
+        counts = self.counts()
+        revenue_utils.refresh_revenue_cube()
+        revenue = revenue_utils.get_revenue_total()
+        moved = archive_utils.archive_flights(days=30)
+        self.assertEqual({name: moved[name] for name in ("Flight", "Ticket", "Booking", "Payment", "Delay")}, {
+            "Flight": 1, "Ticket": 1, "Booking": 1, "Payment": 1, "Delay": 1,
+        })
+        self.assertEqual(list(Flight.objects.values_list("id", flat=True)), [self.recent.id])
+        archived = Flight.objects.using(archive_utils.ARCHIVE_ALIAS)
+        self.assertEqual(list(archived.values_list("id", flat=True)), [self.old.id])
+        self.assertEqual(Ticket.objects.using(archive_utils.ARCHIVE_ALIAS).get().flight_id, self.old.id)
+        self.assertTrue(Passenger.objects.using(archive_utils.ARCHIVE_ALIAS).filter(passport_number="LV1").exists())
+        # headline counters and revenue still cover the archived flight
+        self.assertEqual(self.counts(), counts)
+        self.assertEqual(counter_utils.get_status_counts(Flight), {"Landed": 2})
+        self.assertEqual(revenue_utils.get_revenue_total(), revenue)
+        self.assertEqual(revenue, Decimal("200.75"))
+
+    def test_rows_are_copied_before_they_are_deleted(self):
+        counts = self.counts()
+        add_archived_counts = archive_utils._add_archived_counts
+
+        def crash(counts):
+            raise RuntimeError("crashed between copy and delete")
+
+        archive_utils._add_archived_counts = crash
+        try:
+            with self.assertRaises(RuntimeError):
+                archive_utils.archive_flights(days=30)
+        finally:
+            archive_utils._add_archived_counts = add_archived_counts
+        # the copy committed, the delete rolled back: the rows are in both places
+        self.assertTrue(Flight.objects.filter(pk=self.old.pk).exists())
+        self.assertTrue(Flight.objects.using(archive_utils.ARCHIVE_ALIAS).filter(pk=self.old.pk).exists())
+        self.assertEqual(self.counts(), counts)
+        # and the next run finishes the batch without counting it twice
+        archive_utils.archive_flights(days=30)
+        self.assertFalse(Flight.objects.filter(pk=self.old.pk).exists())
+        self.assertEqual(Flight.objects.using(archive_utils.ARCHIVE_ALIAS).count(), 1)
+        self.assertEqual(self.counts(), counts)
+
+    def test_with_history_merges_hot_and_archived_rows(self):
+        self.assertIsNone(archive_utils.get_watermark())
+        archive_utils.archive_flights(days=30)
+        self.assertEqual(archive_utils.get_watermark(), self.old.arrival_time)
+        flights = Flight.objects.order_by("departure_time").values("flight_number", "departure_time")
+
+        def numbers(queryset, since):
+            return [row["flight_number"] for row in archive_utils.with_history(queryset, since)]
+
+        self.assertEqual(numbers(flights, self.old.departure_time), ["AA1", "AA2"])
+        self.assertEqual(numbers(flights.order_by("-departure_time"), self.old.departure_time), ["AA2", "AA1"])
+        # a window that starts after the watermark reads only the hot rows
+        self.assertEqual(numbers(flights, self.recent.departure_time - timedelta(days=2)), ["AA2"])
+
+
+class RevenueCubeTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        self.passenger = Passenger.objects.create(first_name="Anna", last_name="Berzina", passport_number="LV1")
+
+    def pay(self, amount, status="Confirmed", method="Card"):
+        booking = Booking.objects.create(passenger=self.passenger, flight=self.flight, status=status, total_price=amount)
+        return Payment.objects.create(booking=booking, amount=amount, method=method)
+
+    def cells(self):
+        return sorted(RevenueFact.objects.values_list("method", "booking_status", "payments", "revenue_cents"))
+
+    def test_refresh_folds_only_payments_past_the_watermark(self):
+        payments = [self.pay(amount) for amount in ["10.00", "20.50", "5.25"]]
+        self.assertEqual(revenue_utils.refresh_revenue_cube(batch_size=2), 3)
+        self.assertEqual(revenue_utils.get_watermark(), payments[-1].id)
+        self.assertEqual(revenue_utils.get_revenue_total(), Decimal("35.75"))
+        self.assertEqual(revenue_utils.refresh_revenue_cube(), 0)
+
+        self.pay("4.25")
+        self.assertEqual(revenue_utils.get_revenue_total(), Decimal("35.75"))
+        self.assertEqual(revenue_utils.refresh_revenue_cube(), 1)
+        self.assertEqual(revenue_utils.get_revenue_total(), Decimal("40.00"))
+        cells = self.cells()
+        revenue_utils.rebuild_revenue_cube()
+        self.assertEqual(self.cells(), cells)
+
+    def test_move_facts_follows_changes_to_folded_payments(self):
+        payment = self.pay("10.00")
+        revenue_utils.refresh_revenue_cube()
+        before = revenue_utils.payment_facts([payment.id])
+        after = [(*row[:3], "Cash", *row[4:]) for row in before]
+        revenue_utils.move_facts(before, after)
+        self.assertEqual(self.cells(), [("Card", "Confirmed", 0, 0), ("Cash", "Confirmed", 1, 1000)])
+
+        # the signals do the same for saves and deletes
+        Payment.objects.filter(pk=payment.pk).update(method="Cash")
+        payment.refresh_from_db()
+        payment.amount = Decimal("12.50")
+        payment.save()
+        booking = payment.booking
+        booking.status = "Cancelled"
+        booking.save()
+        self.assertEqual(revenue_utils.query_cube(by=("booking status",))[["booking status", "revenue_cents"]].values.tolist(),
+                         [["Cancelled", 1250], ["Confirmed", 0]])
+        payment.delete()
+        self.assertEqual(revenue_utils.get_revenue_total(), 0)
+
+    def test_payments_past_the_watermark_are_left_to_refresh(self):
+        revenue_utils.refresh_revenue_cube()
+        payment = self.pay("10.00")
+        payment.amount = Decimal("15.00")
+        payment.save()
+        self.assertEqual(self.cells(), [])
+        revenue_utils.refresh_revenue_cube()
+        self.assertEqual(revenue_utils.get_revenue_total(), Decimal("15.00"))
+
+
+class MoveBaggageTests(TestCase):
+    def setUp(self):
+        now = clock_utils.now()
+        self.flight = make_flight(departure_time=now - timedelta(hours=1), arrival_time=now + timedelta(hours=1))
+        # yesterday's AA1 has landed and is not the one meant
+        make_flight(aircraft=self.flight.aircraft, departure_time=now - timedelta(days=1, hours=1), arrival_time=now - timedelta(days=1))
+        passenger = Passenger.objects.create(first_name="Anna", last_name="Berzina", passport_number="LV1")
+        ticket = Ticket.objects.create(passenger=passenger, flight=self.flight, seat="1A")
+        for status in ["Checked-in", "Checked-in", "Offloaded", "Delivered"]:
+            Baggage.objects.create(ticket=ticket, weight=20, status=status)
+
+    def move(self, *args):
+        output = io.StringIO()
+        call_command("move_baggage", *args, stdout=output)
+        return output.getvalue()
+
+    def counts(self):
+        return baggage_utils.get_flight_baggage_counts(Flight.objects.filter(pk=self.flight.pk))[self.flight.id]
+
+    def test_moves_the_flight_in_the_air(self):
+        self.assertIn("Moved 3 bags of AA1 to Loaded", self.move("aa1", "Loaded"))
+        self.assertEqual(self.counts(), {"Loaded": 3, "Delivered": 1})
+        self.assertIn("Moved 0 bags", self.move("AA1", "Offloaded", "--from", "Checked-in"))
+
+    def test_rejects_unknown_flights_and_moves(self):
+        with self.assertRaisesMessage(CommandError, "Flight AA9 not found"):
+            self.move("AA9", "Loaded")
+        with self.assertRaisesMessage(CommandError, "cannot move from Delivered to Loaded"):
+            self.move("AA1", "Loaded", "--from", "Delivered")
+        self.assertEqual(self.counts(), {"Checked-in": 2, "Offloaded": 1, "Delivered": 1})
+
+
+class AircraftCalendarTests(SimpleTestCase):
+    def test_incremental_updates_match_a_full_reindex(self):
+        rng = random.Random(7)
+        calendar = availability_utils.AircraftCalendar()
+        for step in range(2000):
+            key = ("flight", rng.randrange(60))
+            if rng.random() < 0.3:
+                calendar.remove(key)
+            else:
+                start = NOW + timedelta(minutes=rng.randrange(0, 5000, 5))
+                calendar.set(key, start, start + timedelta(minutes=rng.randrange(30, 900, 5)))
+            if step % 50 == 0:
+                rebuilt = availability_utils.AircraftCalendar()
+                rebuilt.busy = dict(calendar.busy)
+                rebuilt._reindex()
+                self.assertEqual((calendar.entries, calendar.starts, calendar.max_ends),
+                                 (rebuilt.entries, rebuilt.starts, rebuilt.max_ends))
+
+    def test_is_free(self):
+        calendar = availability_utils.AircraftCalendar()
+        calendar.set(("flight", 1), NOW, NOW + timedelta(hours=5))
+        calendar.set(("flight", 2), NOW + timedelta(hours=1), NOW + timedelta(hours=2))
+        self.assertFalse(calendar.is_free(NOW + timedelta(hours=3), NOW + timedelta(hours=4)))
+        calendar.remove(("flight", 1))
+        self.assertTrue(calendar.is_free(NOW + timedelta(hours=3), NOW + timedelta(hours=4)))
+        self.assertTrue(calendar.is_free(NOW + timedelta(hours=2), NOW + timedelta(hours=3)))
+        self.assertFalse(calendar.is_free(NOW + timedelta(minutes=90), NOW + timedelta(hours=3)))
+
+
+class PassengerSearchApiTests(TestCase):
+    url = "/api/passengers/search/"
+
+    def setUp(self):
+        Passenger.objects.create(first_name="Anna", last_name="Benson", passport_number="LV1")
+        self.staff = User.objects.create_user("staff", password="pw", is_staff=True)
+
+    def test_anonymous_requests_are_refused(self):
+        response = self.client.get(self.url, {"q": "Benson"})
+        self.assertNotEqual(response.status_code, 200)
+        self.assertNotIn(b"LV1", response.content)
+
+    def test_staff_can_search(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, {"q": "Benson", "limit": -5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["passport_number"] for row in response.json()["results"]], ["LV1"])
+
+    def test_details_need_view_permissions(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(self.url, {"q": "Benson", "details": 1}).status_code, 403)
+        codenames = [permission.split(".")[1] for permission in views.DETAIL_PERMISSIONS]
+        self.staff.user_permissions.add(*Permission.objects.filter(codename__in=codenames))
+        self.client.force_login(User.objects.get(pk=self.staff.pk))
+        response = self.client.get(self.url, {"q": "Benson", "details": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("tickets", response.json()["results"][0])
+
+
+class FareQuoteTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight("AA1")
+        self.other = Airline.objects.create(name="Beta", iata_code="BB", country="LT")
+        today = clock_utils.today()
+        DiscountCode.objects.create(code="SPRING", discount_percent=15, valid_until=today + timedelta(days=30))
+        DiscountCode.objects.create(code="beta", discount_percent=10, valid_until=today + timedelta(days=30), airline=self.other)
+        self.index = pricing_utils.PricingIndex()
+        self.index.build()
+        self.today = today
+
+    def test_prices_match_decimal_arithmetic(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            fares = {(self.flight.airline_id, self.flight.route_id): rng.randrange(1, 10_000_000)}
+            self.index.fares = pd.Series(fares, dtype="int64")
+            percents = list(range(0, 101))
+            codes = pd.DataFrame(
+                {"airline_id": None, "percent": percents, "valid_until": self.today},
+                index=[f"P{percent}" for percent in percents],
+            )
+            self.index.codes = codes
+            quoted = self.index.quote([(self.flight.id, code) for code in codes.index], on=self.today)
+            base = Decimal(fares[self.flight.airline_id, self.flight.route_id]).scaleb(-2)
+            for percent, price, base_fare in zip(percents, quoted["price"], quoted["base_fare"]):
+                expected = (base * (100 - percent) / 100).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+                self.assertEqual((base_fare, price), (base, expected))
+
+    def test_half_cents_round_up(self):
+        self.index.codes = pd.DataFrame(
+            {"airline_id": None, "percent": [50, 33], "valid_until": self.today}, index=["HALF", "THIRD"],
+        )
+        for fare_cents, code, price in [(12345, "HALF", "61.73"), (101, "HALF", "0.51"), (999, "THIRD", "6.69"),
+                                        (12345, "", "123.45")]:
+            self.index.fares = pd.Series({(self.flight.airline_id, self.flight.route_id): fare_cents}, dtype="int64")
+            quoted = self.index.quote([(self.flight.id, code)], on=self.today)
+            self.assertEqual(quoted["price"].iloc[0], Decimal(price))
+
+    def test_base_fare_falls_back_from_airline_to_route_to_default(self):
+        route = (self.flight.airline_id, self.flight.route_id)
+        self.index.fares = pd.Series({route: 20000}, dtype="int64")
+        self.index.route_fares = pd.Series({self.flight.route_id: 15000}, dtype="int64")
+        self.index.default_fare = 10000
+
+        def fare():
+            return self.index.quote([(self.flight.id, "")], on=self.today)["base_fare"].iloc[0]
+
+        self.assertEqual(fare(), Decimal("200.00"))
+        self.index.fares = pd.Series(dtype="int64")
+        self.assertEqual(fare(), Decimal("150.00"))
+        self.index.route_fares = pd.Series(dtype="int64")
+        self.assertEqual(fare(), Decimal("100.00"))
+
+    def test_code_statuses(self):
+        quoted = self.index.quote(
+            [(self.flight.id, " spring "), (self.flight.id, "BETA"), (self.flight.id, "NOPE"),
+             (self.flight.id, ""), (999999, "SPRING")],
+            on=self.today,
+        )
+        self.assertEqual(list(quoted["code_status"]), [
+            pricing_utils.CODE_VALID, pricing_utils.CODE_OTHER_AIRLINE, pricing_utils.CODE_UNKNOWN, "",
+            pricing_utils.CODE_NO_FLIGHT,
+        ])
+        self.assertEqual(list(quoted["discount_percent"]), [15, 0, 0, 0, 0])
+        self.assertIsNone(quoted["price"].iloc[-1])
+
+    def test_codes_differing_in_case_are_one_code(self):
+        DiscountCode.objects.create(code="spring", discount_percent=20, valid_until=self.today + timedelta(days=60))
+        self.index.build()
+        self.assertEqual(self.index.validate("Spring", on=self.today), (20, pricing_utils.CODE_VALID))
+        quoted = self.index.quote([(self.flight.id, "SPRING")], on=self.today)
+        self.assertEqual(list(quoted["discount_percent"]), [20])
+
+
+class WeatherMatchTests(SimpleTestCase):
+    def test_delays_take_the_latest_report_in_km_per_hour_bands(self):
+        at = pd.Timestamp(NOW)
+        delays = pd.DataFrame({
+            "id": [1, 2, 3], "minutes_delayed": [10, 20, 30], "airport_id": [1, 1, 2],
+            "at": [at, at + pd.Timedelta(hours=5), at],
+        })
+        weather = pd.DataFrame({
+            "airport_id": [1, 1], "at": [at - pd.Timedelta(hours=2), at - pd.Timedelta(minutes=30)],
+            "conditions": ["Rain", "Fog"], "visibility": [8.0, 0.5], "wind_speed": [5.0, 30.0],
+        })
+        matched = weather_utils.match_weather(delays, weather).set_index("id")
+        self.assertEqual(matched.loc[1, "conditions"], "Fog")
+        self.assertEqual(matched.loc[1, "wind_band"], "25-40 km/h")
+        self.assertEqual(matched.loc[1, "visibility_band"], "< 1 km")
+        # past the tolerance, and at an airport with no reports
+        self.assertTrue(pd.isna(matched.loc[2, "conditions"]))
+        self.assertTrue(pd.isna(matched.loc[3, "wind_band"]))
+
+
+class ProfileGateTests(SimpleTestCase):
+    def enabled(self, mode, query_params):
+        previous = os.environ.pop(profile_utils.ENV_VAR, None)
+        if mode is not None:
+            os.environ[profile_utils.ENV_VAR] = mode
+        try:
+            return profile_utils.profiling_enabled(query_params)
+        finally:
+            os.environ.pop(profile_utils.ENV_VAR, None)
+            if previous is not None:
+                os.environ[profile_utils.ENV_VAR] = previous
+
+    @override_settings(DEBUG=False)
+    def test_query_param_needs_opt_in(self):
+        self.assertFalse(self.enabled(None, {"profile": "1"}))
+        self.assertTrue(self.enabled("query", {"profile": "1"}))
+        self.assertFalse(self.enabled("query", {}))
+        self.assertTrue(self.enabled("1", {}))
+
+    @override_settings(DEBUG=True)
+    def test_query_param_allowed_in_debug(self):
+        self.assertTrue(self.enabled(None, {"profile": "1"}))
+        self.assertFalse(self.enabled(None, {"profile": "0"}))
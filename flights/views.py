@@ -1,3 +1,29 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
 # Create your views here.
+
+# passport numbers, tickets, bags and security checks all come back with details=1
+DETAIL_PERMISSIONS = [
+    "flights.view_passenger", "flights.view_ticket", "flights.view_baggage", "flights.view_securitycheck",
+]
+
+
+@staff_member_required
+def passenger_search(request):
+    from search_utils import search_passengers, get_passenger_details
+
+    query = request.GET.get("q", "").strip()
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 20)), 100))
+    except ValueError:
+        limit = 20
+    details = bool(request.GET.get("details"))
+    if details and not request.user.has_perms(DETAIL_PERMISSIONS):
+        return JsonResponse({"error": "not allowed to view passenger details"}, status=403)
+    results = search_passengers(query, limit) if query else []
+    if details and results:
+        for result in results:
+            result.update(get_passenger_details(result["id"]))
+    return JsonResponse({"query": query, "results": results})
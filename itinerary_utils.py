@@ -0,0 +1,164 @@
+import threading
+import time
+from bisect import bisect_left
+from datetime import timedelta
+
+from flights.models import Flight
+
+MIN_CONNECTION = timedelta(minutes=45)
+SEARCH_HORIZON = timedelta(hours=48)
+MAX_LEGS = 4
+# other processes do not see our signals, so rebuild periodically as well
+MAX_AGE_SECONDS = 300
+
+
+class Timetable:
+    # every non-cancelled flight as a connection (departure, arrival, from,
+    # to, flight id, flight number), sorted by departure so a query only
+    # scans the connections inside its search horizon
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built_at = 0.0
+        self.connections = []
+        self.departures = []
+        self.by_flight = {}
+
+    def build(self):
+        flights = Flight.objects.exclude(status="Cancelled").values_list(
+            "departure_time", "arrival_time", "route__departure_airport_id", "route__arrival_airport_id", "id", "flight_number"
+        )
+        connections = sorted(flights.iterator(chunk_size=20000))
+        with self.lock:
+            self.connections = connections
+            self.departures = [connection[0] for connection in connections]
+            self.by_flight = {connection[4]: connection for connection in connections}
+            self.built_at = time.monotonic()
+
+    def update_flight(self, flight):
+        with self.lock:
+            self._remove(flight.id)
+            if flight.status != "Cancelled" and flight.route_id:
+                route = flight.route
+                connection = (
+                    flight.departure_time, flight.arrival_time,
+                    route.departure_airport_id, route.arrival_airport_id, flight.id, flight.flight_number,
+                )
+                position = bisect_left(self.connections, connection)
+                self.connections.insert(position, connection)
+                self.departures.insert(position, connection[0])
+                self.by_flight[flight.id] = connection
+
+    def remove_flight(self, flight):
+        with self.lock:
+            self._remove(flight.id)
+
+    def _remove(self, flight_id):
+        connection = self.by_flight.pop(flight_id, None)
+        if connection is not None:
+            position = bisect_left(self.connections, connection)
+            del self.connections[position]
+            del self.departures[position]
+
+    def _window(self, depart_after, horizon):
+        start = bisect_left(self.departures, depart_after)
+        end = bisect_left(self.departures, depart_after + horizon)
+        return self.connections[start:end]
+
+    def earliest_arrival(self, origin, destination, depart_after, min_connection=MIN_CONNECTION, horizon=SEARCH_HORIZON):
+        # connection scan: one pass in departure order, relaxing arrival times
+        with self.lock:
+            window = self._window(depart_after, horizon)
+        ready = {origin: depart_after}
+        arrival = {}
+        came_by = {}
+        for connection in window:
+            departure, arrives, source, target, _, _ = connection
+            if destination in arrival and departure >= arrival[destination]:
+                break
+            if source in ready and ready[source] <= departure and target != origin:
+                if target not in arrival or arrives < arrival[target]:
+                    arrival[target] = arrives
+                    ready[target] = arrives + min_connection
+                    came_by[target] = connection
+        if destination not in came_by:
+            return None
+        return _journey(came_by, origin, destination)
+
+    def fewest_legs(self, origin, destination, depart_after, min_connection=MIN_CONNECTION,
+                    horizon=SEARCH_HORIZON, max_legs=MAX_LEGS):
+        # round k extends only the journeys of at most k - 1 legs and keeps an
+        # airport when it is reached earlier than before, so the first round
+        # reaching the destination has the fewest legs (and, among those, the
+        # earliest arrival)
+        with self.lock:
+            window = self._window(depart_after, horizon)
+        ready = {origin: depart_after}
+        journeys = {origin: []}
+        for _ in range(max_legs):
+            improved = {}
+            improved_journeys = {}
+            for connection in window:
+                departure, arrives, source, target, _, _ = connection
+                if source in ready and ready[source] <= departure:
+                    arrives_ready = arrives + min_connection
+                    if (target not in ready or arrives_ready < ready[target]) and \
+                            (target not in improved or arrives_ready < improved[target]):
+                        improved[target] = arrives_ready
+                        improved_journeys[target] = journeys[source] + [connection]
+            if destination in improved_journeys:
+                return _legs(improved_journeys[destination])
+            if not improved:
+                return None
+            ready.update(improved)
+            journeys.update(improved_journeys)
+        return None
+
+
+def _journey(came_by, origin, destination):
+    legs = []
+    airport = destination
+    while airport != origin:
+        connection = came_by[airport]
+        legs.append(connection)
+        airport = connection[2]
+    legs.reverse()
+    return _legs(legs)
+
+
+def _legs(connections):
+    return [
+        {
+            "flight_id": flight_id,
+            "flight_number": flight_number,
+            "from_airport_id": source,
+            "to_airport_id": target,
+            "departure_time": departure,
+            "arrival_time": arrival,
+        }
+        for departure, arrival, source, target, flight_id, flight_number in connections
+    ]
+
+
+_timetable = Timetable()
+
+
+def is_built():
+    return _timetable.built_at != 0.0
+
+
+def invalidate():
+    _timetable.built_at = 0.0
+
+
+def get_timetable():
+    if _timetable.built_at == 0.0 or time.monotonic() - _timetable.built_at > MAX_AGE_SECONDS:
+        _timetable.build()
+    return _timetable
+
+
+def search_itineraries(origin, destination, depart_after, min_connection=MIN_CONNECTION):
+    timetable = get_timetable()
+    return {
+        "earliest_arrival": timetable.earliest_arrival(origin, destination, depart_after, min_connection),
+        "fewest_legs": timetable.fewest_legs(origin, destination, depart_after, min_connection),
+    }
@@ -0,0 +1,111 @@
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.db.models import F, Q
+from flights.models import JobLease
+import clock_utils
+
+# per-process numbers; the latest wait/hold per job is also kept on JobLease
+LEASE_METRICS = {}
+_metrics_lock = threading.Lock()
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _record(name, **values):
+    with _metrics_lock:
+        metrics = LEASE_METRICS.setdefault(name, {
+            "runs": 0, "skips": 0, "wait_ms": 0.0, "hold_ms": 0.0, "last_wait_ms": 0.0, "last_hold_ms": 0.0,
+        })
+        for key, value in values.items():
+            if key in ("runs", "skips", "wait_ms", "hold_ms"):
+                metrics[key] += value
+            else:
+                metrics[key] = value
+
+
+def _fresh(lease, min_interval, now):
+    return lease.last_run_at is not None and now - lease.last_run_at < min_interval
+
+
+def try_acquire(name, owner, ttl):
+    # leases run on the same clock as the jobs, so a replay's min_interval
+    # and watermarks are in simulated time
+    now = clock_utils.now()
+    JobLease.objects.get_or_create(name=name)
+    # a single conditional UPDATE is the lock: only one caller can flip an
+    # expired (or never taken) lease to itself
+    return JobLease.objects.filter(name=name).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__lt=now) | Q(owner=owner)
+    ).update(owner=owner, expires_at=now + ttl) == 1
+
+
+def release(name, owner, wait_ms, hold_ms, succeeded=True):
+    # only a run that finished stamps the watermark; after a failure the
+    # lease is just given back, so the next caller retries straight away
+    changes = {"owner": "", "expires_at": None}
+    if succeeded:
+        changes.update(
+            last_run_at=clock_utils.now(),
+            last_wait_ms=wait_ms,
+            last_hold_ms=hold_ms,
+            runs=F("runs") + 1,
+        )
+    JobLease.objects.filter(name=name, owner=owner).update(**changes)
+
+
+def run_exclusive(name, func, ttl=timedelta(minutes=5), min_interval=timedelta(seconds=60), wait=0.0):
+    # returns (ran, result). callers skip when the job ran within min_interval
+    # or another process holds the lease; with wait > 0 they poll until the
+    # holder finishes and then skip if it left a fresh watermark
+    owner = _owner()
+    started = time.perf_counter()
+    delay = 0.05
+    while True:
+        lease = JobLease.objects.filter(name=name).first()
+        if lease and _fresh(lease, min_interval, clock_utils.now()):
+            break
+        if try_acquire(name, owner, ttl):
+            wait_ms = (time.perf_counter() - started) * 1000
+            hold_started = time.perf_counter()
+            try:
+                result = func()
+            except BaseException:
+                release(name, owner, wait_ms, (time.perf_counter() - hold_started) * 1000, succeeded=False)
+                raise
+            hold_ms = (time.perf_counter() - hold_started) * 1000
+            release(name, owner, wait_ms, hold_ms)
+            _record(name, runs=1, wait_ms=wait_ms, hold_ms=hold_ms, last_wait_ms=wait_ms, last_hold_ms=hold_ms)
+            return True, result
+        if time.perf_counter() - started + delay > wait:
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+
+    wait_ms = (time.perf_counter() - started) * 1000
+    JobLease.objects.filter(name=name).update(skips=F("skips") + 1)
+    _record(name, skips=1, wait_ms=wait_ms, last_wait_ms=wait_ms)
+    return False, None
+
+
+def get_lease_metrics():
+    data = []
+    for lease in JobLease.objects.order_by("name"):
+        local = LEASE_METRICS.get(lease.name, {})
+        data.append({
+            "job": lease.name,
+            "last_run_at": lease.last_run_at,
+            "held_by": lease.owner or None,
+            "runs": lease.runs,
+            "skips": lease.skips,
+            "last_wait_ms": round(lease.last_wait_ms, 1),
+            "last_hold_ms": round(lease.last_hold_ms, 1),
+            "process_wait_ms": round(local.get("wait_ms", 0.0), 1),
+            "process_hold_ms": round(local.get("hold_ms", 0.0), 1),
+        })
+    return data
@@ -0,0 +1,162 @@
+import random
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import OperationalError, connection, transaction
+
+import clock_utils
+from counter_utils import get_count
+from flight_utils import board_state_at, update_flight_statuses
+from flights.models import Airline, Airport, Booking, Delay, Flight, Passenger, Payment, SecurityCheck, WeatherReport
+from search_utils import search_passengers
+from security_utils import get_checkpoint_throughput, get_uncleared_departures
+
+PERCENTILES = [50, 95, 99]
+SEARCH_TERMS = ["ann", "son", "mar", "lee", "AB1", "T12", "B4"]
+
+
+def percentiles(seconds):
+    # p50/p95/p99 and max in milliseconds
+    if not seconds:
+        return [0.0] * (len(PERCENTILES) + 1)
+    return [*(np.percentile(seconds, PERCENTILES) * 1000), max(seconds) * 1000]
+
+
+def _is_lock_timeout(error):
+    # SQLite gave up waiting for the write lock (busy_timeout expired)
+    return "locked" in str(error)
+
+
+class Sample:
+    # ids drawn once up front so the operations themselves only do the
+    # reads and writes being measured
+    def __init__(self):
+        self.passengers = list(Passenger.objects.values_list("id", flat=True)[:5000])
+        self.flights = list(Flight.objects.values_list("id", flat=True)[:5000])
+        self.airports = list(Airport.objects.values_list("id", flat=True))
+        if not (self.passengers and self.flights and self.airports):
+            raise ValueError("load tests need passengers, flights and airports; run populate.py first")
+
+
+def read_operations(sample):
+    # the queries behind the dashboard's panels
+    return {
+        "read:headline_counts": lambda rng: [get_count(model) for model in (Flight, Passenger, Airline, Airport)],
+        "read:security_throughput": lambda rng: get_checkpoint_throughput(timedelta(hours=2)),
+        "read:uncleared_departures": lambda rng: get_uncleared_departures(),
+        "read:passenger_search": lambda rng: search_passengers(rng.choice(SEARCH_TERMS)),
+        "read:board_state": lambda rng: board_state_at(clock_utils.now()),
+        "read:recent_delays": lambda rng: list(
+            Delay.objects.select_related("flight", "flight__route").order_by("-updated_at")[:10]
+        ),
+    }
+
+
+def _book(sample, rng):
+    with transaction.atomic():
+        booking = Booking.objects.create(
+            passenger_id=rng.choice(sample.passengers),
+            flight_id=rng.choice(sample.flights),
+            status="Confirmed",
+            total_price=Decimal(rng.randint(5000, 90000)) / 100,
+        )
+        Payment.objects.create(booking=booking, amount=booking.total_price, method=rng.choice(["Card", "PayPal"]))
+
+
+def write_operations(sample):
+    return {
+        "write:delay": lambda rng: Delay.objects.create(
+            flight_id=rng.choice(sample.flights), reason="Load test", minutes_delayed=rng.randint(5, 120)
+        ),
+        "write:booking_payment": lambda rng: _book(sample, rng),
+        "write:weather_report": lambda rng: WeatherReport.objects.create(
+            airport_id=rng.choice(sample.airports), timestamp=clock_utils.now(),
+            temperature=rng.uniform(-10, 35), visibility=rng.uniform(0.5, 10),
+            wind_speed=rng.uniform(0, 25), conditions="Load test",
+        ),
+        "write:security_check": lambda rng: SecurityCheck.objects.create(
+            passenger_id=rng.choice(sample.passengers), flight_id=rng.choice(sample.flights),
+            status=rng.choice(["Cleared", "Cleared", "Cleared", "Pending", "Additional Screening"]),
+        ),
+    }
+
+
+class OperationStats:
+    def __init__(self):
+        self.seconds = []
+        self.lock_timeouts = 0
+        self.errors = 0
+        self.last_error = None
+
+    def merge(self, other):
+        self.seconds += other.seconds
+        self.lock_timeouts += other.lock_timeouts
+        self.errors += other.errors
+        self.last_error = other.last_error or self.last_error
+
+
+def _worker(operations, deadline, seed, think, busy_timeout, results):
+    rng = random.Random(seed)
+    stats = {name: OperationStats() for name in operations}
+    names = list(operations)
+    try:
+        if busy_timeout is not None:
+            with connection.cursor() as cursor:
+                cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+        while time.monotonic() < deadline:
+            name = rng.choice(names)
+            start = time.perf_counter()
+            try:
+                operations[name](rng)
+            except Exception as error:
+                if isinstance(error, OperationalError) and _is_lock_timeout(error):
+                    stats[name].lock_timeouts += 1
+                else:
+                    stats[name].errors += 1
+                    stats[name].last_error = repr(error)
+            else:
+                stats[name].seconds.append(time.perf_counter() - start)
+            if think:
+                time.sleep(think)
+    finally:
+        connection.close()
+        results.append(stats)
+
+
+def run_load(readers=4, writers=2, duration=30, status_engine=True, status_interval=1.0, think=0.0,
+             busy_timeout=None, seed=0):
+    # readers and writers in threads, each with its own connection, for
+    # `duration` seconds; returns {operation: OperationStats} plus the wall
+    # time actually taken
+    sample = Sample()
+    reads, writes = read_operations(sample), write_operations(sample)
+    deadline = time.monotonic() + duration
+    results = []
+    threads = [
+        threading.Thread(target=_worker, args=(reads, deadline, seed + index, think, busy_timeout, results))
+        for index in range(readers)
+    ] + [
+        threading.Thread(target=_worker, args=(writes, deadline, seed + readers + index, think, busy_timeout, results))
+        for index in range(writers)
+    ]
+    if status_engine:
+        # the maintenance job, run back to back with a pause
+        engine = {"write:update_flight_statuses": lambda rng: update_flight_statuses()}
+        threads.append(threading.Thread(
+            target=_worker, args=(engine, deadline, seed, status_interval, busy_timeout, results)
+        ))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    totals = {}
+    for stats in results:
+        for name, operation in stats.items():
+            totals.setdefault(name, OperationStats()).merge(operation)
+    return totals, elapsed
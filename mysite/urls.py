@@ -17,6 +17,9 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
+from flights import views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/passengers/search/', views.passenger_search, name='passenger_search'),
 ]
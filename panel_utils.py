@@ -0,0 +1,46 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# seconds a section waits for any one panel, counted from submission
+PANEL_TIMEOUT = 10
+MAX_WORKERS = 8
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor():
+    # one pool per process, shared by every session
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="panel")
+        return _executor
+
+
+def _run(func):
+    # Django connections are per thread; close ours so a pool thread never
+    # carries one over to the next panel
+    from django.db import connection
+    try:
+        return func()
+    finally:
+        connection.close()
+
+
+class PanelQueries:
+    # starts every query at once; result() then waits only for the one
+    # panel being drawn, so a section takes about as long as its slowest
+    # panel instead of the sum of all of them
+    def __init__(self, queries, timeout=PANEL_TIMEOUT):
+        self.deadline = time.monotonic() + timeout
+        executor = _get_executor()
+        self.futures = {name: executor.submit(_run, func) for name, func in queries.items()}
+
+    def result(self, name):
+        # raises the query's own exception, or TimeoutError once the
+        # deadline has passed; a timed-out query finishes in the background
+        # and its result is dropped
+        return self.futures[name].result(timeout=max(self.deadline - time.monotonic(), 0))
+
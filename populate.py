@@ -13,12 +13,14 @@ from flights.models import (
     Airport, Route, Airline, Pilot, Flight, Passenger, Ticket,
     Aircraft, CrewMember, FlightCrew, Gate, Runway, Baggage,
     Booking, Payment, DiscountCode, Maintenance, Delay,
-    WeatherReport, SecurityCheck
+    WeatherReport, SecurityCheck, SeatMap, RevenueFact, Watermark
 )
+from seat_utils import rebuild_seat_maps
 
 fake = Faker()
 
 def clear_database(): 
+    SeatMap.objects.all().delete()
     SecurityCheck.objects.all().delete()
     WeatherReport.objects.all().delete()
     Delay.objects.all().delete()
@@ -26,6 +28,10 @@ def clear_database():
     DiscountCode.objects.all().delete()
     Payment.objects.all().delete()
     Booking.objects.all().delete()
+    # after the payments, whose delete signals would otherwise write the
+    # cube again; the watermark would skip the new payments' ids
+    RevenueFact.objects.all().delete()
+    Watermark.objects.all().delete()
     Baggage.objects.all().delete()
     Runway.objects.all().delete()
     Gate.objects.all().delete()
@@ -282,15 +288,22 @@ def create_passengers():
 def create_tickets(passengers, flights):
     seats = [f"{row}{seat}" for row in range(1, 33) for seat in ['A', 'B', 'C', 'D', 'E', 'F']]
     
+    taken_seats = {}
     tickets = []
     for _ in range(3000):
         passenger = random.choice(passengers)
         flight = random.choice(flights)
+        capacity = flight.aircraft.capacity if flight.aircraft else len(seats)
+        free = [seat for seat in seats[:capacity] if seat not in taken_seats.setdefault(flight.id, set())]
+        if not free:
+            continue
+        seat = random.choice(free)
+        taken_seats[flight.id].add(seat)
         
         ticket = Ticket.objects.create(
             passenger=passenger,
             flight=flight,
-            seat=random.choice(seats)
+            seat=seat
         )
         tickets.append(ticket)
         print(f"Created ticket: {ticket}")
@@ -315,9 +328,13 @@ def create_crew_members(airlines):
 def create_flight_crews(flights, crew_members, pilots):
     flight_crews = []
     pilot_roles = ["Captain", "First Officer"]
+    busy = {}
+    
+    def is_free(person, flight):
+        return all(flight.arrival_time <= start or flight.departure_time >= end for start, end in busy.get(person, []))
     
     for flight in flights:
-        airline_pilots = [p for p in pilots if p.airline == flight.airline]
+        airline_pilots = [p for p in pilots if p.airline == flight.airline and is_free(p, flight)]
         if airline_pilots:
             num_pilots = 2
             assigned_pilots = random.sample(airline_pilots, min(num_pilots, len(airline_pilots)))
@@ -330,14 +347,16 @@ def create_flight_crews(flights, crew_members, pilots):
                     role_on_flight=role
                 )
                 flight_crews.append(flight_crew)
+                busy.setdefault(pilot, []).append((flight.departure_time, flight.arrival_time))
                 print(f"Assigned pilot {pilot} to {flight.flight_number} as {role}")
         
         num_crew = random.randint(3, 6)
-        airline_crew = [cm for cm in crew_members if cm.airline == flight.airline]
+        airline_crew = [cm for cm in crew_members if cm.airline == flight.airline and is_free(cm, flight)]
         if airline_crew:
             assigned_crew = random.sample(airline_crew, min(num_crew, len(airline_crew)))
             
             for crew_member in assigned_crew:
+                busy.setdefault(crew_member, []).append((flight.departure_time, flight.arrival_time))
                 flight_crew = FlightCrew.objects.create(
                     flight=flight,
                     crew_member=crew_member,
@@ -469,6 +488,7 @@ def main():
     passengers = create_passengers()
     delays = create_delays(flights)
     tickets = create_tickets(passengers, flights)
+    rebuild_seat_maps(Flight.objects.all())
     crew_members = create_crew_members(airlines)
     flight_crews = create_flight_crews(flights, crew_members, pilots)
     
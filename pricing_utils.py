@@ -0,0 +1,202 @@
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.db.models import Avg
+
+import clock_utils
+from flights.models import Booking, DiscountCode, Flight
+
+# other processes do not see our signals, so rebuild periodically as well
+MAX_AGE_SECONDS = 300
+# base fare when nothing has been booked yet to price from
+DEFAULT_FARE_CENTS = 50000
+
+CODE_VALID = "valid"
+CODE_UNKNOWN = "unknown"
+CODE_EXPIRED = "expired"
+CODE_OTHER_AIRLINE = "other airline"
+CODE_NO_FLIGHT = "flight not found"
+
+
+def normalise_code(code):
+    return (code or "").strip().upper()
+
+
+def _cents(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal("1")))
+
+
+def _money(cents):
+    # exact Decimals from integer cents, at the edge of the vectorised maths
+    return [Decimal(int(value)).scaleb(-2) for value in cents]
+
+
+class PricingIndex:
+    # active discount codes keyed by code, each with the airline it is for
+    # (None for all airlines), plus base fares in cents per airline and
+    # route taken from what was actually booked; quotes never query
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built_at = 0.0
+        self.built_on = None
+        self.expires_on = None
+        self.codes = pd.DataFrame(columns=["airline_id", "percent", "valid_until"])
+        self.flights = pd.DataFrame(columns=["airline_id", "route_id"])
+        self.fares = pd.Series(dtype="int64")
+        self.route_fares = pd.Series(dtype="int64")
+        self.default_fare = DEFAULT_FARE_CENTS
+
+    def build(self):
+        today = clock_utils.today()
+        codes = pd.DataFrame(
+            [
+                (normalise_code(code), airline_id, percent, valid_until)
+                for code, airline_id, percent, valid_until in DiscountCode.objects.filter(
+                    valid_until__gte=today
+                ).order_by("valid_until", "id").values_list("code", "airline_id", "discount_percent", "valid_until")
+            ],
+            columns=["code", "airline_id", "percent", "valid_until"],
+        )
+        # codes differing only in case (written before the admin refused
+        # them) are one code here: the one valid longest, then the newest
+        codes = codes.drop_duplicates("code", keep="last").set_index("code")
+        flights = pd.DataFrame(
+            list(Flight.objects.values_list("id", "airline_id", "route_id").iterator(chunk_size=20000)),
+            columns=["id", "airline_id", "route_id"],
+        ).set_index("id")
+
+        booked = Booking.objects.exclude(status="Cancelled")
+        fares = pd.Series({
+            (row["flight__airline_id"], row["flight__route_id"]): _cents(row["fare"])
+            for row in booked.values("flight__airline_id", "flight__route_id").annotate(fare=Avg("total_price")).order_by()
+        }, dtype="int64")
+        route_fares = pd.Series({
+            row["flight__route_id"]: _cents(row["fare"])
+            for row in booked.values("flight__route_id").annotate(fare=Avg("total_price")).order_by()
+        }, dtype="int64")
+        overall = booked.aggregate(fare=Avg("total_price"))["fare"]
+
+        with self.lock:
+            self.codes = codes
+            self.flights = flights
+            self.fares = fares
+            self.route_fares = route_fares
+            self.default_fare = _cents(overall) if overall is not None else DEFAULT_FARE_CENTS
+            # the index is rebuilt the day after the first code runs out
+            self.expires_on = codes["valid_until"].min() if len(codes) else None
+            self.built_on = today
+            self.built_at = time.monotonic()
+
+    def is_stale(self, today):
+        return (
+            self.built_at == 0.0
+            or time.monotonic() - self.built_at > MAX_AGE_SECONDS
+            or self.expires_on is not None and today > self.expires_on
+        )
+
+    def validate(self, code, airline_id=None, on=None):
+        # (discount percent, status) for one code; the percent is 0 unless
+        # the status is CODE_VALID
+        on = on or clock_utils.today()
+        with self.lock:
+            codes = self.codes
+        code = normalise_code(code)
+        if code not in codes.index:
+            return 0, CODE_UNKNOWN
+        row = codes.loc[code]
+        if row["valid_until"] < on:
+            return 0, CODE_EXPIRED
+        if pd.notna(row["airline_id"]) and airline_id is not None and row["airline_id"] != airline_id:
+            return 0, CODE_OTHER_AIRLINE
+        return int(row["percent"]), CODE_VALID
+
+    def quote(self, requests, on=None):
+        # requests: rows or a DataFrame of (flight_id, code), code may be
+        # empty; returns one priced row per request, with
+        # base_fare and price as exact Decimals (price rounded half up to
+        # the cent), and price None and CODE_NO_FLIGHT for flights the index
+        # does not know
+        on = on or clock_utils.today()
+        frame = pd.DataFrame(requests, columns=["flight_id", "code"])
+        with self.lock:
+            flights, codes = self.flights, self.codes
+            fares, route_fares, default_fare = self.fares, self.route_fares, self.default_fare
+
+        legs = flights.reindex(frame["flight_id"].to_numpy())
+        airline = legs["airline_id"].to_numpy(dtype="float64")
+        route = legs["route_id"].to_numpy(dtype="float64")
+        known = ~np.isnan(airline)
+
+        base = np.full(len(frame), default_fare, dtype="int64")
+        by_route = route_fares.reindex(route).to_numpy(dtype="float64")
+        base = np.where(np.isnan(by_route), base, np.nan_to_num(by_route).astype("int64"))
+        if len(fares):
+            by_airline_route = fares.reindex(pd.MultiIndex.from_arrays([airline, route])).to_numpy(dtype="float64")
+            base = np.where(np.isnan(by_airline_route), base, np.nan_to_num(by_airline_route).astype("int64"))
+
+        code = frame["code"].fillna("").astype(str).str.strip().str.upper().to_numpy()
+        matched = codes.reindex(code)
+        code_airline = matched["airline_id"].to_numpy(dtype="float64")
+        listed = matched["percent"].notna().to_numpy()
+        unexpired = listed & (matched["valid_until"].fillna(on).to_numpy() >= on)
+        for_airline = np.isnan(code_airline) | (code_airline == airline)
+        valid = unexpired & for_airline & known
+        percent = np.where(valid, matched["percent"].fillna(0).to_numpy(dtype="int64"), 0)
+
+        # integer cents throughout, so there is no float rounding to undo
+        price = (base * (100 - percent) + 50) // 100
+
+        status = np.select(
+            [~known, code == "", ~listed, ~unexpired, ~for_airline],
+            [CODE_NO_FLIGHT, "", CODE_UNKNOWN, CODE_EXPIRED, CODE_OTHER_AIRLINE],
+            default=CODE_VALID,
+        )
+        frame["code"] = code
+        frame["code_status"] = status
+        frame["discount_percent"] = percent
+        frame["base_fare"] = [fare if ok else None for fare, ok in zip(_money(base), known)]
+        frame["price"] = [fare if ok else None for fare, ok in zip(_money(price), known)]
+        return frame
+
+    def update_flight(self, flight):
+        with self.lock:
+            flights = self.flights.copy()
+            flights.loc[flight.id] = (flight.airline_id, flight.route_id)
+            self.flights = flights
+
+
+_index = PricingIndex()
+
+
+def is_built():
+    return _index.built_at != 0.0
+
+
+def invalidate():
+    _index.built_at = 0.0
+
+
+def get_pricing_index():
+    if _index.is_stale(clock_utils.today()):
+        _index.build()
+    return _index
+
+
+def get_active_codes(on=None):
+    # code, airline_id, percent and valid_until of the codes still valid on `on`
+    on = on or clock_utils.today()
+    index = get_pricing_index()
+    with index.lock:
+        codes = index.codes
+    return codes[codes["valid_until"] >= on].rename_axis("code").reset_index().sort_values("valid_until")
+
+
+def validate_discount_code(code, airline_id=None, on=None):
+    return get_pricing_index().validate(code, airline_id, on)
+
+
+def quote_fares(requests, on=None):
+    return get_pricing_index().quote(requests, on)
@@ -0,0 +1,219 @@
+import hashlib
+import html
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+
+# DASHBOARD_PROFILE=1 samples the script thread while a section renders.
+# Anyone who can open the dashboard can add ?profile=1 to the URL, so it is
+# only honoured with DASHBOARD_PROFILE=query or Django's DEBUG on; otherwise
+# the dashboard only checks a flag
+ENV_VAR = "DASHBOARD_PROFILE"
+ALLOW_QUERY = "query"
+QUERY_PARAM = "profile"
+PROFILE_DIR = Path(os.environ.get("DASHBOARD_PROFILE_DIR", Path(__file__).resolve().parent / "profiles"))
+INTERVAL = 0.005
+TOP_N = 20
+# a section that raises never reaches finish(); its sampler stops by itself
+MAX_SECONDS = 120
+ROOT = str(Path(__file__).resolve().parent)
+TRUTHY = ("1", "on", "true", "yes")
+
+
+def _debug():
+    try:
+        from django.conf import settings
+
+        return bool(settings.DEBUG)
+    except Exception:
+        return False
+
+
+def profiling_enabled(query_params=None):
+    mode = os.environ.get(ENV_VAR, "").lower()
+    if mode in TRUTHY:
+        return True
+    if query_params is None or str(query_params.get(QUERY_PARAM, "")).lower() not in TRUTHY:
+        return False
+    return mode == ALLOW_QUERY or _debug()
+
+
+def _frame_name(code):
+    # one name per function rather than per line, so samples add up
+    path = code.co_filename
+    if path.startswith(ROOT):
+        path = os.path.relpath(path, ROOT)
+    elif "site-packages" in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    # a background thread that records the target thread's stack every
+    # `interval` seconds; stacks are kept root first, counted by occurrence
+    def __init__(self, thread_id, interval=INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="dashboard-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        deadline = time.monotonic() + MAX_SECONDS
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+
+def top_functions(stacks, limit=TOP_N):
+    # self time: the function was on top of the stack; total time: it was
+    # anywhere on it (counted once per sample, for recursion)
+    samples = sum(stacks.values()) or 1
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for name in set(stack):
+            total[name] += count
+    return [
+        {"function": name, "self_pct": own[name] / samples * 100, "total_pct": count / samples * 100}
+        for name, count in sorted(total.items(), key=lambda item: (-own[item[0]], -item[1]))[:limit]
+    ]
+
+
+def folded(stacks):
+    # the collapsed-stack format flamegraph.pl, inferno and speedscope read
+    return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+def flame_graph_svg(stacks, title, width=1200, row=16):
+    # a static flame graph: the root at the bottom, each frame as wide as
+    # its share of the samples; hover a frame for its name and share
+    tree = {}
+    for stack, count in stacks.items():
+        node = tree
+        for name in stack:
+            node = node.setdefault(name, [0, {}])
+            node[0] += count
+            node = node[1]
+    samples = sum(stacks.values()) or 1
+    depth = max((len(stack) for stack in stacks), default=0)
+    height = (depth + 2) * row
+    rects = []
+
+    def draw(children, x, level):
+        for name, (count, grandchildren) in sorted(children.items()):
+            w = count / samples * width
+            if w >= 0.5:
+                y = height - (level + 1) * row
+                # warm colours, one per file
+                hue = 20 + zlib.crc32(name.split(" (")[-1].split(":")[0].encode()) % 40
+                label = html.escape(name)
+                rects.append(
+                    f'<g><title>{label} — {count / samples * 100:.1f}%</title>'
+                    f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" fill="hsl({hue},80%,60%)"/>'
+                    + (f'<text x="{x + 3:.1f}" y="{y + row - 4}" font-size="11">'
+                       f'{html.escape(name[:int(w / 7)])}</text>' if w > 35 else "")
+                    + "</g>"
+                )
+                draw(grandchildren, x, level + 1)
+            x += w
+
+    draw(tree, 0.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace">'
+        f'<text x="4" y="{row - 4}" font-size="12">{html.escape(title)}</text>{"".join(rects)}</svg>\n'
+    )
+
+
+def filters_key(section, values):
+    # sections keep one profile per combination of filter values
+    digest = hashlib.sha1(repr(sorted(values.items())).encode()).hexdigest()[:10]
+    return f"{section.lower()}-{digest}"
+
+
+def current_filters():
+    # the values of this run's widgets, by widget id; unkeyed widgets are
+    # only reachable through the script run context
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        return {
+            state.id: state.SerializeToString().hex()
+            for state in ctx.session_state.get_widget_states()
+        }
+    except Exception:
+        return {}
+
+
+_lock = threading.Lock()
+# accumulated per key for the life of the process, so reruns with the same
+# filters add samples to the same profile
+_profiles = {}
+_running = {}
+
+
+def start(section):
+    thread_id = threading.get_ident()
+    with _lock:
+        previous = _running.pop(thread_id, None)
+    if previous is not None:
+        previous[1].stop()
+    sampler = SamplingProfiler(thread_id).start()
+    with _lock:
+        _running[thread_id] = (section, sampler)
+    return sampler
+
+
+def finish(sampler, filters=None):
+    # stops the sampler and rewrites the section's flame graph, folded
+    # stacks and summary; returns (key, top functions, paths written)
+    sampler.stop()
+    filters = current_filters() if filters is None else filters
+    with _lock:
+        section, _ = _running.pop(sampler.thread_id, (None, None))
+        key = filters_key(section or "section", filters)
+        profile = _profiles.setdefault(key, {"stacks": Counter(), "runs": 0, "seconds": 0.0})
+        profile["stacks"].update(sampler.stacks)
+        profile["runs"] += 1
+        profile["seconds"] += sampler.seconds
+        stacks = Counter(profile["stacks"])
+        runs, seconds = profile["runs"], profile["seconds"]
+
+    top = top_functions(stacks)
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    title = f"{section} ({key}): {sum(stacks.values())} samples over {runs} runs, {seconds:.2f} s"
+    paths = {
+        "folded": PROFILE_DIR / f"{key}.folded",
+        "svg": PROFILE_DIR / f"{key}.svg",
+        "summary": PROFILE_DIR / f"{key}.txt",
+    }
+    paths["folded"].write_text(folded(stacks))
+    paths["svg"].write_text(flame_graph_svg(stacks, title))
+    paths["summary"].write_text(
+        title + "\n\n  self%  total%  function\n"
+        + "".join(f"{row['self_pct']:7.1f} {row['total_pct']:7.1f}  {row['function']}\n" for row in top)
+    )
+    return key, top, paths
@@ -0,0 +1,333 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.db import transaction
+
+import clock_utils
+from flights.models import Delay, Flight, FlightCrew, ProjectedDelay
+
+# other processes do not see our signals, so rebuild periodically as well
+MAX_AGE_SECONDS = 300
+# minimum minutes between an arrival and the next departure of the same
+# aircraft or crew; any slack beyond it absorbs delay
+MIN_TURNAROUND = {"aircraft": 45, "crew": 30}
+# flights that arrived longer ago than this can no longer pass delay on
+LOOKBACK = timedelta(hours=24)
+NOTHING = (0, None, None)
+
+
+def _via(key):
+    return "aircraft" if key[0] == "aircraft" else "crew"
+
+
+def _crew_key(crew_member_id, pilot_id):
+    key = ("pilot", pilot_id) if pilot_id is not None else ("crew member", crew_member_id)
+    return key if key[1] is not None else None
+
+
+def load_flights(flight_ids=None):
+    # {flight id: (departure, arrival, rotation keys, own delay minutes)} for
+    # the flights the graph covers, all of them or just flight_ids
+    flights = Flight.objects.exclude(status="Cancelled").filter(arrival_time__gte=clock_utils.now() - LOOKBACK)
+    if flight_ids is not None:
+        flights = flights.filter(id__in=flight_ids)
+    rows = {}
+    for flight_id, aircraft_id, departure, arrival in flights.values_list(
+        "id", "aircraft_id", "departure_time", "arrival_time"
+    ).iterator(chunk_size=20000):
+        rows[flight_id] = [departure, arrival, {("aircraft", aircraft_id)} if aircraft_id is not None else set(), 0]
+    assignments = FlightCrew.objects.filter(flight__in=flights).values_list("flight_id", "crew_member_id", "pilot_id")
+    for flight_id, crew_member_id, pilot_id in assignments.iterator(chunk_size=20000):
+        key = _crew_key(crew_member_id, pilot_id)
+        if key is not None:
+            rows[flight_id][2].add(key)
+    # the latest delay is the flight's own
+    for flight_id, minutes in Delay.objects.filter(flight__in=flights).order_by("updated_at", "id").values_list(
+        "flight_id", "minutes_delayed"
+    ).iterator(chunk_size=20000):
+        rows[flight_id][3] = minutes
+    return {flight_id: tuple(row) for flight_id, row in rows.items()}
+
+
+class DelayGraph:
+    # flights as nodes, an edge from each flight to the next one flown by the
+    # same aircraft, pilot or crew member; a flight inherits its
+    # predecessors' delay less the slack in the turnaround between them,
+    # and remembers the flight whose own delay started the chain
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built_at = 0.0
+        self.departures = {}
+        self.arrivals = {}
+        # rotation key -> [(departure, flight id)] in departure order
+        self.rotations = {}
+        self.keys = {}
+        self.successors = {}
+        self.predecessors = {}
+        self.own = {}
+        # flight id -> (minutes, root flight, via)
+        self.inherited = {}
+
+    def build(self):
+        rows = load_flights()
+        with self.lock:
+            self.departures, self.arrivals, self.rotations, self.keys = {}, {}, {}, {}
+            self.successors, self.predecessors, self.own, self.inherited = {}, {}, {}, {}
+            for flight_id, (departure, arrival, keys, minutes) in rows.items():
+                self.departures[flight_id] = departure
+                self.arrivals[flight_id] = arrival
+                self.keys[flight_id] = keys
+                self.successors[flight_id] = {}
+                self.predecessors[flight_id] = {}
+                if minutes:
+                    self.own[flight_id] = minutes
+                for key in keys:
+                    self.rotations.setdefault(key, []).append((departure, flight_id))
+            for legs in self.rotations.values():
+                legs.sort()
+            for flight_id in rows:
+                self._link(flight_id)
+            # in departure order every predecessor is final before its successors
+            for flight_id in sorted(rows, key=lambda flight_id: (self.departures[flight_id], flight_id)):
+                found = self._inherit(flight_id)
+                if found[0]:
+                    self.inherited[flight_id] = found
+            self.built_at = time.monotonic()
+
+    def _state(self, flight_id):
+        # (effective delay, root flight): a flight's own delay is its root
+        # unless more arrives from upstream
+        own = self.own.get(flight_id, 0)
+        minutes, root, _ = self.inherited.get(flight_id, NOTHING)
+        if minutes > own:
+            return minutes, root
+        return own, flight_id if own else None
+
+    def _inherit(self, flight_id):
+        # (minutes, root flight, via) of the worst delay arriving from the
+        # flight's predecessors; ties go to the lowest root id, so the result
+        # does not depend on the order edges were added in
+        best = NOTHING
+        for source, (slack, via) in self.predecessors.get(flight_id, {}).items():
+            effective, root = self._state(source)
+            found = (effective - slack, root, via)
+            if found[0] > 0 and (found[0], -found[1], found[2]) > (best[0], -(best[1] or 0), best[2] or ""):
+                best = found
+        return best
+
+    def _neighbours(self, key, flight_id):
+        legs = self.rotations[key]
+        position = bisect_left(legs, (self.departures[flight_id], flight_id))
+        return (
+            legs[position - 1][1] if position else None,
+            legs[position + 1][1] if position + 1 < len(legs) else None,
+        )
+
+    def _link(self, flight_id):
+        # recomputes the edges into flight_id from the previous leg of each of
+        # its rotations; an aircraft and a crew link between the same two
+        # flights: the tighter one decides
+        for source in self.predecessors[flight_id]:
+            self.successors[source].pop(flight_id, None)
+        links = {}
+        for key in self.keys[flight_id]:
+            source, _ = self._neighbours(key, flight_id)
+            if source is None:
+                continue
+            via = _via(key)
+            gap = (self.departures[flight_id] - self.arrivals[source]).total_seconds() / 60
+            slack = max(int(gap) - MIN_TURNAROUND[via], 0)
+            if source not in links or slack < links[source][0]:
+                links[source] = (slack, via)
+        self.predecessors[flight_id] = links
+        for source, link in links.items():
+            self.successors[source][flight_id] = link
+
+    def _unplace(self, flight_id):
+        # takes a flight out of the graph; returns the legs that followed it
+        # and now follow something else
+        followers = set()
+        for key in self.keys.pop(flight_id):
+            _, following = self._neighbours(key, flight_id)
+            if following is not None:
+                followers.add(following)
+            legs = self.rotations[key]
+            del legs[bisect_left(legs, (self.departures[flight_id], flight_id))]
+            if not legs:
+                del self.rotations[key]
+        for source in self.predecessors.pop(flight_id):
+            self.successors[source].pop(flight_id, None)
+        for follower in self.successors.pop(flight_id):
+            self.predecessors[follower].pop(flight_id, None)
+        del self.departures[flight_id], self.arrivals[flight_id]
+        self.own.pop(flight_id, None)
+        return followers
+
+    def _place(self, flight_id, departure, arrival, keys, minutes):
+        self.departures[flight_id] = departure
+        self.arrivals[flight_id] = arrival
+        self.keys[flight_id] = keys
+        self.successors[flight_id] = {}
+        self.predecessors[flight_id] = {}
+        if minutes:
+            self.own[flight_id] = minutes
+        followers = set()
+        for key in keys:
+            legs = self.rotations.setdefault(key, [])
+            legs.insert(bisect_left(legs, (departure, flight_id)), (departure, flight_id))
+            _, following = self._neighbours(key, flight_id)
+            if following is not None:
+                followers.add(following)
+        return followers
+
+    def refresh(self, rows, flight_ids):
+        # re-reads flight_ids from rows (see load_flights; a flight missing
+        # from rows has gone or left the window), patches the rotations
+        # around them and pushes the change downstream, in departure order,
+        # only as far as delays actually change. Returns {flight id:
+        # (minutes, root, via)} for every flight whose inherited delay
+        # changed, minutes 0 when it cleared
+        with self.lock:
+            before = {flight_id: self._state(flight_id) for flight_id in flight_ids if flight_id in self.departures}
+            prior = {flight_id: self.inherited.pop(flight_id, NOTHING) for flight_id in flight_ids}
+            relink = set()
+            for flight_id in flight_ids:
+                if flight_id in self.departures:
+                    relink |= self._unplace(flight_id)
+                if flight_id in rows:
+                    relink |= self._place(flight_id, *rows[flight_id])
+                    relink.add(flight_id)
+            relink = {flight_id for flight_id in relink if flight_id in self.departures}
+            for flight_id in relink:
+                self._link(flight_id)
+
+            changed = {
+                flight_id: NOTHING for flight_id, inherited in prior.items()
+                if inherited != NOTHING and flight_id not in self.departures
+            }
+            queue = [(self.departures[flight_id], flight_id) for flight_id in relink]
+            heapq.heapify(queue)
+            seen = set()
+            while queue:
+                _, current = heapq.heappop(queue)
+                if current in seen:
+                    continue
+                seen.add(current)
+                state = before.get(current) or self._state(current)
+                old = prior.get(current, self.inherited.get(current, NOTHING))
+                new = self._inherit(current)
+                if new[0]:
+                    self.inherited[current] = new
+                else:
+                    self.inherited.pop(current, None)
+                if new != old:
+                    changed[current] = new
+                if self._state(current) != state:
+                    for successor in self.successors[current]:
+                        heapq.heappush(queue, (self.departures[successor], successor))
+            return changed
+
+    def projected(self):
+        with self.lock:
+            return dict(self.inherited)
+
+
+_graph = DelayGraph()
+# flights whose delays, times or crew changed in this process and have not
+# been propagated yet; drained after the writing transaction commits
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def is_built():
+    return _graph.built_at != 0.0
+
+
+def invalidate():
+    _graph.built_at = 0.0
+
+
+def get_delay_graph():
+    if _graph.built_at == 0.0 or time.monotonic() - _graph.built_at > MAX_AGE_SECONDS:
+        _graph.build()
+    return _graph
+
+
+def _write(changed):
+    cleared = [flight_id for flight_id, (minutes, _, _) in changed.items() if not minutes]
+    rows = [
+        ProjectedDelay(flight_id=flight_id, minutes=minutes, source_id=source, via=via)
+        for flight_id, (minutes, source, via) in changed.items() if minutes
+    ]
+    with transaction.atomic():
+        ProjectedDelay.objects.filter(flight_id__in=cleared).delete()
+        ProjectedDelay.objects.bulk_create(
+            rows, batch_size=500, update_conflicts=True,
+            unique_fields=["flight"], update_fields=["minutes", "source", "via", "updated_at"],
+        )
+
+
+def _stale_projections(graph):
+    # after a full build, which already includes the latest changes: the
+    # flights in the window whose stored projection differs from the graph's
+    projected = graph.projected()
+    stored = {
+        flight_id: (minutes, source, via)
+        for flight_id, minutes, source, via in ProjectedDelay.objects.filter(
+            flight__arrival_time__gte=clock_utils.now() - LOOKBACK
+        ).values_list("flight_id", "minutes", "source_id", "via")
+    }
+    changed = {flight_id: found for flight_id, found in projected.items() if stored.get(flight_id) != found}
+    changed.update((flight_id, NOTHING) for flight_id in stored if flight_id not in projected)
+    return changed
+
+
+def propagate_flights(flight_ids):
+    # re-reads the flights, patches the graph around them and writes the
+    # projected delays that changed; returns how many changed
+    flight_ids = set(flight_ids)
+    if not flight_ids:
+        return 0
+    if _graph.built_at == 0.0 or time.monotonic() - _graph.built_at > MAX_AGE_SECONDS:
+        _graph.build()
+        changed = _stale_projections(_graph)
+    else:
+        changed = _graph.refresh(load_flights(flight_ids), flight_ids)
+    if changed:
+        _write(changed)
+    return len(changed)
+
+
+def propagate_delay(flight_id):
+    return propagate_flights([flight_id])
+
+
+def _drain():
+    with _pending_lock:
+        flight_ids = set(_pending)
+        _pending.clear()
+    propagate_flights(flight_ids)
+
+
+def flights_changed(flight_ids):
+    # called from signals: the work runs once the writer's transaction has
+    # committed, so it neither holds the write lock nor sees rolled-back
+    # rows. Several changes in one transaction are propagated together
+    with _pending_lock:
+        _pending.update(flight_id for flight_id in flight_ids if flight_id is not None)
+    transaction.on_commit(_drain)
+
+
+def rebuild_projected_delays():
+    # recomputes every projection from a fresh graph and replaces the table;
+    # for repairs, e.g. after writes that sent no signals. Returns the
+    # number of flights with a knock-on delay
+    _graph.build()
+    projected = _graph.projected()
+    with transaction.atomic():
+        ProjectedDelay.objects.all().delete()
+        _write(projected)
+    return len(projected)
@@ -0,0 +1,133 @@
+from decimal import Decimal
+
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, Count, F, Max, Sum, Value
+from django.db.models.functions import Cast, Concat, Round, TruncDate, TruncMonth
+from flights.models import Payment, RevenueFact, Watermark
+
+WATERMARK = "revenue_cube"
+# payments folded per transaction
+BATCH_SIZE = 50000
+
+# slicer name -> (column, annotation it needs or None); rolling up is
+# grouping by fewer of them, drilling down grouping by more
+DIMENSIONS = {
+    "day": ("day", None),
+    "month": ("month", TruncMonth("day")),
+    "airline": ("airline__name", None),
+    "route": ("route_name", Concat("route__departure_airport__code", Value(" → "), "route__arrival_airport__code")),
+    "method": ("method", None),
+    "booking status": ("booking_status", None),
+}
+# filter name -> cube field
+FILTERS = {"airline": "airline_id", "route": "route_id", "method": "method", "booking status": "booking_status"}
+
+# a Payment's cell in the cube and its amount in cents
+FACT_FIELDS = {
+    "day": TruncDate("payment_date"),
+    "airline_id": F("booking__flight__airline_id"),
+    "route_id": F("booking__flight__route_id"),
+    "cube_method": F("method"),
+    "cube_status": F("booking__status"),
+}
+CENTS = Cast(Round(F("amount") * 100), BigIntegerField())
+KEY = ["day", "airline_id", "route_id", "cube_method", "cube_status"]
+
+
+def get_watermark():
+    return Watermark.objects.filter(name=WATERMARK).values_list("last_id", flat=True).first() or 0
+
+
+def _upsert(rows):
+    # rows: (day, airline_id, route_id, method, booking_status, payments, cents)
+    rows = [row for row in rows if row[5] or row[6]]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO flights_revenuefact (day, airline_id, route_id, method, booking_status, payments, revenue_cents) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s) "
+            "ON CONFLICT (day, airline_id, route_id, method, booking_status) DO UPDATE SET "
+            "payments = flights_revenuefact.payments + excluded.payments, "
+            "revenue_cents = flights_revenuefact.revenue_cents + excluded.revenue_cents",
+            [(connection.ops.adapt_datefield_value(row[0]), *row[1:]) for row in rows],
+        )
+
+
+def _facts(payments, sign=1):
+    grouped = payments.values(**FACT_FIELDS).annotate(payments=Count("id"), cents=Sum(CENTS)).order_by()
+    return [(*(row[key] for key in KEY), sign * row["payments"], sign * (row["cents"] or 0)) for row in grouped]
+
+
+def refresh_revenue_cube(batch_size=BATCH_SIZE):
+    # folds payments with ids past the watermark into the cube; payments
+    # are only ever appended, so the id is a safe high-water mark
+    folded = 0
+    upper = Payment.objects.aggregate(last=Max("id"))["last"] or 0
+    while True:
+        with transaction.atomic():
+            watermark, _ = Watermark.objects.get_or_create(name=WATERMARK)
+            if watermark.last_id >= upper:
+                break
+            batch_end = min(watermark.last_id + batch_size, upper)
+            payments = Payment.objects.filter(id__gt=watermark.last_id, id__lte=batch_end)
+            folded += payments.count()
+            _upsert(_facts(payments))
+            Watermark.objects.filter(pk=watermark.pk).update(last_id=batch_end)
+    return folded
+
+
+def rebuild_revenue_cube():
+    with transaction.atomic():
+        RevenueFact.objects.all().delete()
+        Watermark.objects.filter(name=WATERMARK).delete()
+    return refresh_revenue_cube()
+
+
+def payment_facts(payment_ids):
+    # the cells folded payments sit in now; signals take these before a
+    # change and add them back, re-read, after it
+    watermark = get_watermark()
+    return _facts(Payment.objects.filter(id__in=[pk for pk in payment_ids if pk and pk <= watermark]))
+
+
+def move_facts(before, after):
+    # before/after: payment_facts of the same payments around a change
+    _upsert([(*row[:5], -row[5], -row[6]) for row in before] + list(after))
+
+
+def query_cube(by=("day",), start=None, end=None, **filters):
+    # revenue and payment counts grouped by the named DIMENSIONS, for days
+    # in [start, end] and the FILTERS given as lists of values; reads only
+    # the cube
+    facts = RevenueFact.objects.all()
+    if start is not None:
+        facts = facts.filter(day__gte=start)
+    if end is not None:
+        facts = facts.filter(day__lte=end)
+    columns = [DIMENSIONS[name][0] for name in by]
+    for name, values in filters.items():
+        if values:
+            facts = facts.filter(**{f"{FILTERS[name.replace('_', ' ')]}__in": values})
+    totals = {"payments": Sum("payments"), "revenue_cents": Sum("revenue_cents")}
+    if not by:
+        rows = [facts.aggregate(**totals)]
+    else:
+        annotations = {column: expression for column, expression in (DIMENSIONS[name] for name in by) if expression}
+        rows = facts.annotate(**annotations).values(*columns).annotate(**totals).order_by(*columns)
+    frame = pd.DataFrame(list(rows), columns=[*columns, "payments", "revenue_cents"]).fillna(0)
+    frame.columns = [*by, "payments", "revenue_cents"]
+    frame["revenue"] = frame["revenue_cents"] / 100
+    return frame
+
+
+def get_revenue_total(**filters):
+    # exact grand total as a Decimal
+    return Decimal(int(query_cube(by=(), **filters)["revenue_cents"].iloc[0])) / 100
+
+
+def get_dimension_values(name):
+    # distinct values of a text dimension, for the slicers
+    column = FILTERS[name]
+    return list(RevenueFact.objects.order_by(column).values_list(column, flat=True).distinct())
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from flights.models import Flight
+
+FLIGHT_COLUMNS = [
+    "id", "flight_number", "aircraft_id", "aircraft__registration_number",
+    "departure_time", "arrival_time", "route__departure_airport__code", "route__arrival_airport__code",
+]
+
+
+def load_rotations(start=None, end=None):
+    flights = Flight.objects.filter(aircraft__isnull=False).exclude(status="Cancelled")
+    if start is not None:
+        flights = flights.filter(arrival_time__gte=start)
+    if end is not None:
+        flights = flights.filter(departure_time__lte=end)
+    frame = pd.DataFrame.from_records(flights.values_list(*FLIGHT_COLUMNS).iterator(chunk_size=20000), columns=FLIGHT_COLUMNS)
+    frame = frame.rename(columns={
+        "aircraft__registration_number": "registration",
+        "route__departure_airport__code": "origin",
+        "route__arrival_airport__code": "destination",
+    })
+    return frame.sort_values(["aircraft_id", "departure_time"], kind="stable", ignore_index=True)
+
+
+def _utc_datetime64(value):
+    value = pd.Timestamp(value)
+    if value.tzinfo is not None:
+        value = value.tz_convert("UTC").tz_localize(None)
+    return value.to_datetime64()
+
+
+def analyse_rotations(frame, start=None, end=None):
+    # one vectorised pass over flights sorted by (aircraft, departure): each
+    # row is compared with the next row of the same tail
+    if frame.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    departure = frame["departure_time"].to_numpy(dtype="datetime64[ns]")
+    arrival = frame["arrival_time"].to_numpy(dtype="datetime64[ns]")
+    aircraft = frame["aircraft_id"].to_numpy()
+    block_hours = (arrival - departure) / np.timedelta64(1, "h")
+
+    same_tail = np.zeros(len(frame), dtype=bool)
+    same_tail[:-1] = aircraft[:-1] == aircraft[1:]
+    gap_hours = np.full(len(frame), np.nan)
+    gap_hours[:-1] = (departure[1:] - arrival[:-1]) / np.timedelta64(1, "h")
+    gap_hours[~same_tail] = np.nan
+    next_origin = frame["origin"].shift(-1).to_numpy()
+
+    overlap = same_tail & (gap_hours < 0)
+    mismatch = same_tail & (next_origin != frame["destination"].to_numpy())
+
+    window_start = _utc_datetime64(start) if start is not None else departure.min()
+    window_end = _utc_datetime64(end) if end is not None else arrival.max()
+    window_hours = max((window_end - window_start) / np.timedelta64(1, "h"), 1e-9)
+    # only the part of each flight inside the window counts towards utilisation
+    in_window = (np.minimum(arrival, window_end) - np.maximum(departure, window_start)) / np.timedelta64(1, "h")
+
+    per_flight = pd.DataFrame({
+        "aircraft_id": aircraft,
+        "registration": frame["registration"].to_numpy(),
+        "block_hours": block_hours,
+        "in_window_hours": np.clip(in_window, 0, None),
+        "gap_hours": gap_hours,
+        "overlap": overlap,
+        "mismatch": mismatch,
+    })
+    summary = per_flight.groupby(["aircraft_id", "registration"], sort=False).agg(
+        flights=("block_hours", "size"),
+        block_hours=("block_hours", "sum"),
+        in_window_hours=("in_window_hours", "sum"),
+        avg_turnaround_hours=("gap_hours", "mean"),
+        min_turnaround_hours=("gap_hours", "min"),
+        overlaps=("overlap", "sum"),
+        airport_mismatches=("mismatch", "sum"),
+    ).reset_index()
+    summary["utilisation_pct"] = summary.pop("in_window_hours") / window_hours * 100
+    summary = summary.sort_values("utilisation_pct", ascending=False, ignore_index=True)
+
+    bad = np.flatnonzero(overlap | mismatch)
+    issues = pd.DataFrame({
+        "registration": frame["registration"].to_numpy()[bad],
+        "flight": frame["flight_number"].to_numpy()[bad],
+        "arrives": frame["arrival_time"].to_numpy()[bad],
+        "destination": frame["destination"].to_numpy()[bad],
+        "next_flight": frame["flight_number"].to_numpy()[bad + 1],
+        "next_departs": frame["departure_time"].to_numpy()[bad + 1],
+        "next_origin": next_origin[bad],
+        "problem": np.where(overlap[bad], np.where(mismatch[bad], "overlap, airport mismatch", "overlap"), "airport mismatch"),
+    })
+    return summary, issues
+
+
+def get_rotation_analytics(start=None, end=None):
+    return analyse_rotations(load_rotations(start, end), start, end)
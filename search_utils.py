@@ -0,0 +1,135 @@
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from flights.models import Passenger, Ticket, Baggage, SecurityCheck
+
+SEARCH_TABLE = "flights_passenger_search"
+STATE_TABLE = "flights_passenger_search_state"
+REFS = """
+    coalesce((SELECT group_concat('T' || t.id || ' ' || f.flight_number, ' ')
+              FROM flights_ticket t JOIN flights_flight f ON f.id = t.flight_id
+              WHERE t.passenger_id = p.id), '')
+    || ' ' ||
+    coalesce((SELECT group_concat('B' || b.id, ' ') FROM flights_booking b WHERE b.passenger_id = p.id), '')
+"""
+
+
+def _fts_available():
+    return connection.vendor == "sqlite"
+
+
+def rebuild_search_index():
+    if not _fts_available():
+        return 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, first_name, last_name, passport_number, refs) "
+            f"SELECT p.id, p.first_name, p.last_name, p.passport_number, {REFS} FROM flights_passenger p"
+        )
+        return cursor.rowcount
+
+
+def refresh_search_index(passenger_ids):
+    if not _fts_available() or not passenger_ids:
+        return
+    passenger_ids = list(passenger_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(passenger_ids), 10000):
+            chunk = passenger_ids[start:start + 10000]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", chunk)
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, first_name, last_name, passport_number, refs) "
+                f"SELECT p.id, p.first_name, p.last_name, p.passport_number, {REFS} "
+                f"FROM flights_passenger p WHERE p.id IN ({placeholders})",
+                chunk,
+            )
+
+
+@contextmanager
+def deferred_search_index():
+    # for bulk writers: switches the sync triggers off for the current
+    # transaction and re-indexes the passenger ids collected in the yielded
+    # set once at the end. the flag lives in the database, so it is only
+    # ever visible to our own transaction, which holds the write lock
+    if not _fts_available():
+        yield set()
+        return
+    touched = set()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"UPDATE {STATE_TABLE} SET paused = 1")
+        yield touched
+        refresh_search_index(touched)
+        cursor.execute(f"UPDATE {STATE_TABLE} SET paused = 0")
+
+
+def _matching_ids(terms, limit):
+    # the trigram tokenizer needs at least three characters per term
+    if _fts_available() and all(len(term) >= 3 for term in terms):
+        match = " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    passengers = Passenger.objects.all()
+    for term in terms:
+        passengers = passengers.filter(
+            Q(first_name__istartswith=term) | Q(last_name__istartswith=term) | Q(passport_number__istartswith=term)
+        )
+    return list(passengers.values_list("id", flat=True)[:limit])
+
+
+def search_passengers(query, limit=20):
+    terms = query.split()
+    if not terms:
+        return []
+    ids = _matching_ids(terms, limit)
+    passengers = Passenger.objects.filter(id__in=ids).annotate(
+        tickets=Count("ticket", distinct=True),
+        bookings=Count("booking", distinct=True),
+    ).in_bulk()
+    return [
+        {
+            "id": passenger.id,
+            "name": f"{passenger.first_name} {passenger.last_name}",
+            "passport_number": passenger.passport_number,
+            "tickets": passenger.tickets,
+            "bookings": passenger.bookings,
+        }
+        for passenger in (passengers.get(passenger_id) for passenger_id in ids)
+        if passenger is not None
+    ]
+
+
+def get_passenger_details(passenger_id):
+    tickets = Ticket.objects.filter(passenger_id=passenger_id).select_related(
+        "flight", "flight__route__departure_airport", "flight__route__arrival_airport"
+    ).order_by("-flight__departure_time")
+    baggage = Baggage.objects.filter(ticket__passenger_id=passenger_id).select_related("ticket__flight")
+    checks = SecurityCheck.objects.filter(passenger_id=passenger_id).select_related("flight").order_by("-checked_at")
+    return {
+        "tickets": [
+            {
+                "ticket": f"T{ticket.id}",
+                "flight": ticket.flight.flight_number,
+                "route": f"{ticket.flight.route.departure_airport.code} → {ticket.flight.route.arrival_airport.code}",
+                "departure": ticket.flight.departure_time.strftime("%Y-%m-%d %H:%M"),
+                "seat": ticket.seat,
+                "status": ticket.flight.status,
+            }
+            for ticket in tickets
+        ],
+        "baggage": [
+            {"flight": bag.ticket.flight.flight_number, "weight": bag.weight, "status": bag.status}
+            for bag in baggage
+        ],
+        "security_checks": [
+            {"flight": check.flight.flight_number, "status": check.status, "checked_at": check.checked_at.strftime("%Y-%m-%d %H:%M")}
+            for check in checks
+        ],
+    }
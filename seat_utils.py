@@ -0,0 +1,250 @@
+from datetime import datetime, time
+
+from django.db import connection, transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
+from flights.models import Flight, Ticket, SeatMap
+from archive_utils import with_history
+
+SEAT_LETTERS = "ABCDEF"
+# flights without an aircraft get the same 32-row cabin populate.py seats from
+DEFAULT_CAPACITY = 32 * len(SEAT_LETTERS)
+
+
+def seat_label(index):
+    row, col = divmod(index, len(SEAT_LETTERS))
+    return f"{row + 1}{SEAT_LETTERS[col]}"
+
+
+def seat_index(label):
+    label = label.strip().upper()
+    if len(label) < 2 or not label[:-1].isdigit() or label[-1] not in SEAT_LETTERS:
+        return None
+    return (int(label[:-1]) - 1) * len(SEAT_LETTERS) + SEAT_LETTERS.index(label[-1])
+
+
+def flight_capacity(flight):
+    if flight.aircraft_id and flight.aircraft:
+        return flight.aircraft.capacity
+    return DEFAULT_CAPACITY
+
+
+def _is_taken(bitmap, index):
+    return bool(bitmap[index >> 3] & (1 << (index & 7)))
+
+
+def _first_free(bitmap, capacity):
+    for byte_pos, byte in enumerate(bitmap):
+        if byte != 0xFF:
+            for bit in range(8):
+                index = (byte_pos << 3) + bit
+                if index >= capacity:
+                    return None
+                if not byte & (1 << bit):
+                    return index
+    return None
+
+
+def _is_full(seat_map):
+    # tickets on seats the cabin does not have (older data, or an aircraft
+    # swapped for a smaller one) count too, so a map can be full with free bits
+    return seat_map.seats_taken >= seat_map.capacity
+
+
+def _build_bitmap(capacity, seats):
+    # every ticket counts towards seats_taken; only seats inside the cabin
+    # have a bit
+    bitmap = bytearray((capacity + 7) // 8)
+    for seat in seats:
+        index = seat_index(seat)
+        if index is not None and index < capacity:
+            bitmap[index >> 3] |= 1 << (index & 7)
+    return bitmap, len(seats)
+
+
+def _apply(seat_map, bitmap, taken):
+    seat_map.bitmap = bytes(bitmap)
+    seat_map.seats_taken = taken
+    seat_map.load_factor = taken / seat_map.capacity if seat_map.capacity else 0
+    return seat_map
+
+
+def rebuild_seat_maps(flights=None):
+    if flights is None:
+        flights = Flight.objects.all()
+    flights = list(flights.select_related("aircraft")) if hasattr(flights, "select_related") else list(flights)
+    flight_ids = [flight.id for flight in flights]
+
+    seats_by_flight = {}
+    for flight_id, seat in Ticket.objects.filter(flight_id__in=flight_ids).values_list("flight_id", "seat"):
+        seats_by_flight.setdefault(flight_id, []).append(seat)
+
+    existing = SeatMap.objects.in_bulk(flight_ids, field_name="flight_id")
+    to_create, to_update = [], []
+    for flight in flights:
+        capacity = flight_capacity(flight)
+        bitmap, taken = _build_bitmap(capacity, seats_by_flight.get(flight.id, []))
+        seat_map = existing.get(flight.id)
+        if seat_map is None:
+            to_create.append(_apply(SeatMap(flight=flight, capacity=capacity), bitmap, taken))
+        else:
+            seat_map.capacity = capacity
+            to_update.append(_apply(seat_map, bitmap, taken))
+
+    with transaction.atomic():
+        SeatMap.objects.bulk_create(to_create, batch_size=500)
+        SeatMap.objects.bulk_update(to_update, ["capacity", "bitmap", "seats_taken", "load_factor"], batch_size=500)
+    return len(to_create) + len(to_update)
+
+
+def _locked_seat_map(flight):
+    _lock_for_write([flight.id])
+    seat_map = SeatMap.objects.select_for_update().filter(flight=flight).first()
+    if seat_map is None:
+        rebuild_seat_maps([flight])
+        seat_map = SeatMap.objects.select_for_update().get(flight=flight)
+    return seat_map
+
+
+def _lock_for_write(flight_ids):
+    # select_for_update is a no-op on SQLite, so take the write lock up front
+    # with an UPDATE that changes nothing; two claims can then never read
+    # the same bitmap
+    if connection.vendor == "sqlite" and flight_ids:
+        SeatMap.objects.filter(flight_id__in=flight_ids).update(capacity=F("capacity"))
+
+
+def assign_seat(flight, passenger, seat=None):
+    # the unique (flight, seat) constraint backs the bitmap check, so two
+    # writers racing for the same seat can never both commit; the ticket's
+    # post_save signal marks the seat taken
+    with transaction.atomic():
+        seat_map = _locked_seat_map(flight)
+        bitmap = bytearray(seat_map.bitmap)
+
+        if _is_full(seat_map):
+            raise ValueError(f"Flight {flight.flight_number} is full")
+        if seat is None:
+            index = _first_free(bitmap, seat_map.capacity)
+            if index is None:
+                raise ValueError(f"Flight {flight.flight_number} is full")
+        else:
+            index = seat_index(seat)
+            if index is None or index >= seat_map.capacity:
+                raise ValueError(f"Seat {seat} does not exist on flight {flight.flight_number}")
+            if _is_taken(bitmap, index):
+                raise ValueError(f"Seat {seat} on flight {flight.flight_number} is already taken")
+
+        try:
+            with transaction.atomic():
+                ticket = Ticket.objects.create(passenger=passenger, flight=flight, seat=seat_label(index))
+        except IntegrityError:
+            raise ValueError(f"Seat {seat_label(index)} on flight {flight.flight_number} is already taken")
+    return ticket
+
+
+def claim_seats(claims):
+    # claims are (flight_id, seat or None) pairs; returns the seat label for
+    # each claim, or None when the seat is taken/invalid or the flight is full.
+    # for tickets written without signals (raw or bulk inserts): the caller
+    # must hold a transaction so the bitmaps commit with the tickets
+    flight_ids = {flight_id for flight_id, _ in claims}
+    _lock_for_write(flight_ids)
+    seat_maps = SeatMap.objects.select_for_update().in_bulk(flight_ids, field_name="flight_id")
+    missing = flight_ids - set(seat_maps)
+    if missing:
+        rebuild_seat_maps(Flight.objects.filter(id__in=missing))
+        seat_maps.update(SeatMap.objects.select_for_update().in_bulk(missing, field_name="flight_id"))
+
+    bitmaps = {}
+    labels = []
+    for flight_id, seat in claims:
+        seat_map = seat_maps[flight_id]
+        bitmap = bitmaps.setdefault(flight_id, bytearray(seat_map.bitmap))
+        if _is_full(seat_map):
+            index = None
+        elif seat:
+            index = seat_index(seat)
+            if index is None or index >= seat_map.capacity or _is_taken(bitmap, index):
+                index = None
+        else:
+            index = _first_free(bitmap, seat_map.capacity)
+        if index is None:
+            labels.append(None)
+            continue
+        bitmap[index >> 3] |= 1 << (index & 7)
+        seat_map.seats_taken += 1
+        labels.append(seat_label(index))
+
+    # bulk_update builds one CASE per field over every row, which dominates
+    # large batches; a prepared executemany is linear
+    changed = [_apply(seat_maps[flight_id], bitmap, seat_maps[flight_id].seats_taken) for flight_id, bitmap in bitmaps.items()]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {SeatMap._meta.db_table} SET bitmap = %s, seats_taken = %s, load_factor = %s WHERE id = %s",
+            [(seat_map.bitmap, seat_map.seats_taken, seat_map.load_factor, seat_map.id) for seat_map in changed],
+        )
+    return labels
+
+
+def release_seat(ticket):
+    # the ticket's post_delete signal frees the seat
+    ticket.delete()
+
+
+def mark_seat(flight_id, seat, taken):
+    # sets or clears one seat's bit; the Ticket signals call this, so the
+    # map follows tickets however they are saved or deleted. Setting a bit
+    # that is already set (claim_seats got there first) changes nothing; a
+    # seat outside the cabin has no bit and only moves the count
+    with transaction.atomic():
+        seat_map = SeatMap.objects.select_for_update().filter(flight_id=flight_id).first()
+        if seat_map is None:
+            # a flight being deleted must not get a new map; otherwise build
+            # it from the tickets, which already include this one
+            if taken and Flight.objects.filter(pk=flight_id).exists():
+                rebuild_seat_maps(Flight.objects.filter(pk=flight_id))
+            return
+        index = seat_index(seat or "")
+        in_cabin = index is not None and index < seat_map.capacity
+        if in_cabin and _is_taken(seat_map.bitmap, index) == taken:
+            return
+        bitmap = bytearray(seat_map.bitmap)
+        if in_cabin and taken:
+            bitmap[index >> 3] |= 1 << (index & 7)
+        elif in_cabin:
+            bitmap[index >> 3] &= ~(1 << (index & 7))
+        _apply(seat_map, bitmap, max(seat_map.seats_taken + (1 if taken else -1), 0)).save()
+
+
+def resize_seat_maps(flights):
+    # rebuilds the maps of flights whose aircraft, or its capacity, changed
+    stale = [
+        flight for flight in flights.select_related("aircraft", "seat_map")
+        if hasattr(flight, "seat_map") and flight.seat_map.capacity != flight_capacity(flight)
+    ]
+    if stale:
+        rebuild_seat_maps(stale)
+    return len(stale)
+
+
+def free_seats(flight):
+    seat_map = SeatMap.objects.filter(flight=flight).first()
+    if seat_map is None:
+        rebuild_seat_maps([flight])
+        seat_map = SeatMap.objects.get(flight=flight)
+    if _is_full(seat_map):
+        return []
+    bitmap = seat_map.bitmap
+    return [seat_label(i) for i in range(seat_map.capacity) if not _is_taken(bitmap, i)]
+
+
+def get_occupancy(day):
+    rows = with_history(
+        SeatMap.objects.filter(flight__departure_time__date=day)
+        .order_by("flight__departure_time")
+        .values("flight__flight_number", "flight__departure_time", "capacity", "seats_taken", "load_factor"),
+        timezone.make_aware(datetime.combine(day, time.min))
+    )
+    # merged rows are only re-sorted on plain fields
+    return sorted(rows, key=lambda row: row["flight__departure_time"])
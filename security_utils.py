@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+from flights.models import Flight, SecurityCheck, SecurityThroughput
+import clock_utils
+
+BUCKET = timedelta(minutes=5)
+# SecurityCheck.status → counter column
+STATUS_COLUMNS = {
+    "Cleared": "cleared",
+    "Pending": "pending",
+    "Additional Screening Required": "additional_screening",
+}
+COUNTERS = ["checks", "cleared", "pending", "additional_screening"]
+
+
+def bucket_start(moment):
+    minutes = int(BUCKET.total_seconds() // 60)
+    return moment.replace(second=0, microsecond=0) - timedelta(minutes=moment.minute % minutes)
+
+
+def _counter_row(status, sign=1):
+    row = [sign, 0, 0, 0]
+    column = STATUS_COLUMNS.get(status)
+    if column:
+        row[COUNTERS.index(column)] = sign
+    return row
+
+
+def _add(deltas, key, counts):
+    deltas[key] = [old + new for old, new in zip(deltas.get(key, [0, 0, 0, 0]), counts)]
+
+
+def adjust_throughput(deltas):
+    # deltas: {(flight_id, bucket_start): [checks, cleared, pending, additional_screening]};
+    # the airport is filled from the flight's route on first insert
+    rows = [
+        (flight_id, flight_id, connection.ops.adapt_datetimefield_value(start), *counts)
+        for (flight_id, start), counts in deltas.items() if any(counts)
+    ]
+    if not rows:
+        return
+    updates = ", ".join(f"{column} = flights_securitythroughput.{column} + excluded.{column}" for column in COUNTERS)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO flights_securitythroughput (flight_id, airport_id, bucket_start, "
+            f"{', '.join(COUNTERS)}) VALUES (%s, "
+            "(SELECT r.departure_airport_id FROM flights_flight f JOIN flights_route r ON r.id = f.route_id WHERE f.id = %s), "
+            f"%s, %s, %s, %s, %s) ON CONFLICT (flight_id, bucket_start) DO UPDATE SET {updates}",
+            rows,
+        )
+
+
+def record_check(check, previous=None):
+    # previous: (flight_id, status, checked_at) the check was counted under before
+    deltas = {}
+    if previous is not None:
+        flight_id, status, checked_at = previous
+        deltas[(flight_id, bucket_start(checked_at))] = _counter_row(status, -1)
+    _add(deltas, (check.flight_id, bucket_start(check.checked_at)), _counter_row(check.status))
+    adjust_throughput(deltas)
+
+
+def create_security_checks(checks):
+    # bulk_create skips signals, so count the whole batch in one upsert
+    checks = list(checks)
+    now = clock_utils.now()
+    with transaction.atomic():
+        for check in checks:
+            if check.checked_at is None:
+                check.checked_at = now
+        SecurityCheck.objects.bulk_create(checks, batch_size=1000)
+        deltas = {}
+        for check in checks:
+            _add(deltas, (check.flight_id, bucket_start(check.checked_at)), _counter_row(check.status))
+        adjust_throughput(deltas)
+    return checks
+
+
+def rebuild_security_throughput():
+    deltas = {}
+    for flight_id, status, checked_at in SecurityCheck.objects.values_list(
+        "flight_id", "status", "checked_at"
+    ).iterator(chunk_size=20000):
+        _add(deltas, (flight_id, bucket_start(checked_at)), _counter_row(status))
+    with transaction.atomic():
+        SecurityThroughput.objects.all().delete()
+        adjust_throughput(deltas)
+    return len(deltas)
+
+
+def get_checkpoint_throughput(window=timedelta(hours=1), airport_id=None, now=None):
+    # one row per 5-minute bucket of the rolling window, oldest first, with
+    # empty buckets filled in so the chart shows quiet periods as zeros
+    now = now or clock_utils.now()
+    start = bucket_start(now - window)
+    buckets = SecurityThroughput.objects.filter(bucket_start__gte=start, bucket_start__lte=now)
+    if airport_id is not None:
+        buckets = buckets.filter(airport_id=airport_id)
+    rows = buckets.values("bucket_start").annotate(**{column: Sum(column) for column in COUNTERS})
+    frame = pd.DataFrame(list(rows), columns=["bucket_start", *COUNTERS]).set_index("bucket_start")
+    frame.index = pd.to_datetime(frame.index, utc=True)
+    frame = frame.reindex(pd.date_range(start, bucket_start(now), freq=BUCKET, tz="UTC"), fill_value=0)
+    frame.index.name = "bucket_start"
+    return frame.reset_index()
+
+
+def get_airport_throughput(window=timedelta(hours=1), now=None):
+    now = now or clock_utils.now()
+    rows = SecurityThroughput.objects.filter(
+        bucket_start__gte=bucket_start(now - window), bucket_start__lte=now
+    ).values("airport__code").annotate(**{column: Sum(column) for column in COUNTERS}).order_by("-checks")
+    frame = pd.DataFrame(list(rows), columns=["airport__code", *COUNTERS]).rename(columns={"airport__code": "airport"})
+    frame["additional_share"] = (frame["additional_screening"] / frame["checks"].where(frame["checks"] > 0)).fillna(0)
+    return frame
+
+
+def get_uncleared_departures(within=timedelta(hours=1), now=None):
+    # ticketed passengers come from the seat map, cleared ones from the
+    # counters; a passenger is assumed to be cleared once per flight
+    now = now or clock_utils.now()
+    flights = Flight.objects.filter(
+        departure_time__gte=now, departure_time__lte=now + within
+    ).exclude(status="Cancelled").annotate(
+        cleared=Coalesce(Sum("security_buckets__cleared"), Value(0)),
+    ).values_list(
+        "flight_number", "route__departure_airport__code", "departure_time", "seat_map__seats_taken", "cleared"
+    ).order_by("departure_time")
+    data = []
+    for flight_number, airport, departure, ticketed, cleared in flights:
+        ticketed = ticketed or 0
+        data.append({
+            "flight": flight_number,
+            "airport": airport,
+            "departure": departure,
+            "ticketed": ticketed,
+            "cleared": cleared,
+            "not_cleared": max(ticketed - cleared, 0),
+        })
+    return pd.DataFrame(data, columns=["flight", "airport", "departure", "ticketed", "cleared", "not_cleared"])
@@ -0,0 +1,142 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds from the start of a script run; enforced by flights/tests.py
+FIRST_RENDER_BUDGET = 0.5
+READY_BUDGET = 5.0
+# must not be imported before the first render
+HEAVY_MODULES = ["pandas", "numpy", "plotly.express"]
+# reference data and caches are rebuilt as often as the in-memory indexes
+MAX_AGE_SECONDS = 300
+
+
+class StartupProfiler:
+    # timings of one script run: named stages (mostly imports) and marks
+    # for the first render and for the run being ready
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+        self.marks = {}
+        self.heavy_at_first_render = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+
+    def mark(self, name):
+        self.marks[name] = time.perf_counter() - self.started
+        if name == "first_render":
+            self.heavy_at_first_render = [module for module in HEAVY_MODULES if module in sys.modules]
+
+    def report(self):
+        return {
+            "marks": dict(self.marks),
+            "stages": [{"stage": name, "seconds": seconds} for name, seconds in self.stages],
+            "heavy_at_first_render": list(self.heavy_at_first_render),
+        }
+
+
+_lock = threading.Lock()
+_first_run = None
+_last_run = None
+
+
+def start_run():
+    return StartupProfiler()
+
+
+def finish_run(profiler):
+    # the first run of the process is the cold start; later runs are kept
+    # separately so the sidebar can compare the two
+    global _first_run, _last_run
+    profiler.mark("ready")
+    with _lock:
+        if _first_run is None:
+            _first_run = profiler.report()
+        _last_run = profiler.report()
+
+
+def get_startup_report():
+    with _lock:
+        return {"cold": _first_run, "last": _last_run}
+
+
+def maintenance_enabled():
+    # set DASHBOARD_MAINTENANCE=off when cron or another worker runs the jobs
+    return os.environ.get("DASHBOARD_MAINTENANCE", "on").lower() not in ("0", "off", "false", "no")
+
+
+_background = {}
+
+
+def run_in_background(name, func):
+    # at most one thread per name and process; returns False while the
+    # previous one is still running
+    with _lock:
+        thread = _background.get(name)
+        if thread is not None and thread.is_alive():
+            return False
+        thread = threading.Thread(target=_run_closing_connection, args=(func,), name=f"dashboard-{name}", daemon=True)
+        _background[name] = thread
+    thread.start()
+    return True
+
+
+def _run_closing_connection(func):
+    from django.db import connection
+    try:
+        func()
+    finally:
+        connection.close()
+
+
+_reference = {"built_at": 0.0, "airports": [], "airlines": []}
+
+
+def get_reference_data():
+    # airports and airlines for the dashboard's pickers, refreshed every
+    # MAX_AGE_SECONDS instead of queried on every rerun
+    with _lock:
+        if _reference["built_at"] and time.monotonic() - _reference["built_at"] <= MAX_AGE_SECONDS:
+            return _reference
+    from flights.models import Airline, Airport
+
+    airports = list(Airport.objects.order_by("code").values("id", "code", "city"))
+    airlines = list(Airline.objects.order_by("name").values("id", "name"))
+    with _lock:
+        _reference.update(built_at=time.monotonic(), airports=airports, airlines=airlines)
+        return _reference
+
+
+def prewarm():
+    # pre-warm hook: import the heavy libraries and fill the reference data
+    # and in-memory indexes, so the first user of a new worker does not pay
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    import plotly.express  # noqa: F401
+
+    import availability_utils
+    import itinerary_utils
+    import pricing_utils
+    import propagation_utils
+
+    get_reference_data()
+    availability_utils.get_availability_index()
+    itinerary_utils.get_timetable()
+    pricing_utils.get_pricing_index()
+    propagation_utils.get_delay_graph()
+
+
+def start_prewarm():
+    # once per process; later calls are no-ops
+    with _lock:
+        if "prewarm" in _background:
+            return False
+    return run_in_background("prewarm", prewarm)
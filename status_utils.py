@@ -0,0 +1,188 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, CharField, Exists, F, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.lookups import GreaterThan
+
+import availability_utils
+import clock_utils
+import itinerary_utils
+import pricing_utils
+import propagation_utils
+from crew_utils import record_flight_conflicts
+from flights.models import Delay, Flight, FlightStatusEvent, Route, StatusThreshold
+
+# thresholds used where no StatusThreshold row sets one
+DEFAULT_THRESHOLDS = {"cancel_after_minutes": 600, "boarding_minutes": 45}
+
+# status -> statuses it may move to; FLIGHT_STATUS_TRANSITIONS in settings
+# replaces it. Statuses that may move nowhere are never evaluated, and
+# statuses missing from it may move anywhere
+TRANSITIONS = {
+    "Scheduled": ["Delayed", "In Flight", "Landed", "Cancelled"],
+    "Boarding": ["Delayed", "In Flight", "Landed", "Cancelled"],
+    "Delayed": ["Landed", "Cancelled"],
+    "In Flight": ["Scheduled", "Boarding", "Delayed", "Landed", "Cancelled"],
+    "Landed": [],
+    "Cancelled": [],
+}
+
+
+def _latest_delay_over(now, thresholds):
+    latest = Subquery(
+        Delay.objects.filter(flight=OuterRef("pk")).order_by("-updated_at", "-id").values("minutes_delayed")[:1]
+    )
+    return GreaterThan(latest, thresholds["cancel_after_minutes"])
+
+
+# condition name -> (now, a flight's thresholds) -> SQL condition
+CONDITIONS = {
+    "latest delay over cancel threshold": _latest_delay_over,
+    "arrival passed": lambda now, thresholds: Q(arrival_time__lt=now),
+    "departure passed": lambda now, thresholds: Q(departure_time__lt=now),
+    "delay reported today": lambda now, thresholds: Exists(
+        Delay.objects.filter(flight=OuterRef("pk"), updated_at__date=now.date())
+    ),
+    "within boarding window": lambda now, thresholds: Q(
+        departure_time__lte=now + timedelta(minutes=thresholds["boarding_minutes"])
+    ),
+    "always": lambda now, thresholds: Q(pk__isnull=False),
+}
+
+# (new status, condition, cause) tried top to bottom; the first rule that
+# holds gives the new status, kept only if TRANSITIONS allows the move.
+# Causes are formatted with the flight's thresholds
+RULES = [
+    ("Cancelled", "latest delay over cancel threshold", "delay over {cancel_after_minutes} min"),
+    ("Landed", "arrival passed", "arrival time passed"),
+    ("In Flight", "departure passed", "departure time passed"),
+    ("Delayed", "delay reported today", "delay reported today"),
+    ("Boarding", "within boarding window", "boarding window"),
+    ("Scheduled", "always", "schedule"),
+]
+
+
+def get_transitions():
+    return getattr(settings, "FLIGHT_STATUS_TRANSITIONS", TRANSITIONS)
+
+
+def _scopes():
+    # (flights covered, thresholds) per StatusThreshold row, most specific
+    # first, so the first scope a flight falls in decides; a blank value
+    # falls through to the broader rows covering the same flights. Airports
+    # become route id lists, since an UPDATE cannot join to the route
+    rows = sorted(StatusThreshold.objects.order_by("id"), key=lambda row: (row.airline_id is None, row.airport_id is None))
+    routes = {}
+    if any(row.airport_id is not None for row in rows):
+        for route_id, airport_id in Route.objects.values_list("id", "departure_airport_id"):
+            routes.setdefault(airport_id, []).append(route_id)
+
+    scopes = []
+    for row in rows:
+        covering = [
+            other for other in rows
+            if other.airline_id in (None, row.airline_id) and other.airport_id in (None, row.airport_id)
+        ]
+        thresholds = {
+            name: next((getattr(other, name) for other in covering if getattr(other, name) is not None), default)
+            for name, default in DEFAULT_THRESHOLDS.items()
+        }
+        scope = Q()
+        if row.airline_id is not None:
+            scope &= Q(airline_id=row.airline_id)
+        if row.airport_id is not None:
+            scope &= Q(route_id__in=routes.get(row.airport_id, []))
+        # a row for all airlines at all airports covers every flight
+        scopes.append((scope or Q(pk__isnull=False), thresholds))
+    return scopes
+
+
+def _rules_case(now, thresholds, column):
+    # the RULES for one set of thresholds as a CASE giving the new status,
+    # or with column="cause" the cause
+    transitions = get_transitions()
+    whens = []
+    for status, condition, cause in RULES:
+        blocked = [old for old, allowed in transitions.items() if status not in allowed and old != status]
+        value = Value(status if column == "status" else cause.format(**thresholds))
+        if blocked:
+            value = Case(When(status__in=blocked, then=F(column) if column == "status" else Value("")), default=value)
+        whens.append(When(CONDITIONS[condition](now, thresholds), then=value))
+    return Case(*whens, default=F("status") if column == "status" else Value(""), output_field=CharField())
+
+
+def compile_rules(now, scopes=None):
+    # (new status, cause) expressions over a Flight row: a CASE per scope
+    # inside a CASE choosing the flight's scope
+    scopes = _scopes() if scopes is None else scopes
+    compiled = []
+    for column in ("status", "cause"):
+        default = _rules_case(now, DEFAULT_THRESHOLDS, column)
+        whens = [When(scope, then=_rules_case(now, thresholds, column)) for scope, thresholds in scopes]
+        compiled.append(Case(*whens, default=default, output_field=CharField()) if whens else default)
+    return compiled
+
+
+def _sql(expression):
+    query = Flight.objects.all().query
+    compiler = query.get_compiler(connection=connection)
+    return compiler.compile(expression.resolve_expression(query, allow_joins=False))
+
+
+def evaluate_statuses(now=None):
+    # {flight id: (old status, new status, cause)} for the flights the rules
+    # would move, without changing anything
+    now = now or clock_utils.now()
+    new_status, cause = compile_rules(now)
+    terminal = [status for status, allowed in get_transitions().items() if not allowed]
+    rows = Flight.objects.exclude(status__in=terminal).annotate(new_status=new_status, cause=cause).exclude(
+        status=F("new_status")
+    ).values_list("id", "status", "new_status", "cause")
+    return {flight_id: (old, new, reason) for flight_id, old, new, reason in rows}
+
+
+def apply_status_rules(now=None):
+    # records a FlightStatusEvent per change and updates the flights in one
+    # UPDATE ... CASE over the changed rows; returns the number changed
+    now = now or clock_utils.now()
+    new_status, cause = compile_rules(now)
+    terminal = [status for status, allowed in get_transitions().items() if not allowed]
+    status_sql, status_params = _sql(new_status)
+    cause_sql, cause_params = _sql(cause)
+    flights = connection.ops.quote_name(Flight._meta.db_table)
+    events = connection.ops.quote_name(FlightStatusEvent._meta.db_table)
+    excluded = ", ".join(["%s"] * len(terminal)) or "NULL"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        last_event = FlightStatusEvent.objects.aggregate(last=Max("id"))["last"] or 0
+        cursor.execute(
+            f"INSERT INTO {events} (flight_id, old_status, new_status, occurred_at, cause) "
+            f"SELECT id, status, new_status, %s, cause FROM ("
+            f"SELECT {flights}.id AS id, {flights}.status AS status, {status_sql} AS new_status, {cause_sql} AS cause "
+            f"FROM {flights} WHERE {flights}.status NOT IN ({excluded})"
+            f") WHERE new_status <> status",
+            [connection.ops.adapt_datetimefield_value(now), *status_params, *cause_params, *terminal],
+        )
+        if not cursor.rowcount:
+            return 0
+        cursor.execute(
+            f"UPDATE {flights} SET status = {status_sql} "
+            f"WHERE id IN (SELECT flight_id FROM {events} WHERE id > %s)",
+            [*status_params, last_event],
+        )
+        changed = cursor.rowcount
+        changes = list(FlightStatusEvent.objects.filter(id__gt=last_event).values_list("flight_id", "old_status", "new_status"))
+        _statuses_changed(changes)
+    return changed
+
+
+def _statuses_changed(changes):
+    # the UPDATE sends no signals, so do here what flight_saved would for
+    # each (flight id, old status, new status)
+    propagation_utils.flights_changed([flight_id for flight_id, _, _ in changes])
+    cancelled = [flight_id for flight_id, old, new in changes if (old == "Cancelled") != (new == "Cancelled")]
+    for flight in Flight.objects.filter(id__in=cancelled):
+        record_flight_conflicts(flight)
+    for index in (availability_utils, itinerary_utils, pricing_utils):
+        transaction.on_commit(index.invalidate)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from flights.models import Delay, WeatherReport
+
+# a delay is matched with the latest report from its departure airport at
+# or before the flight's scheduled departure, if that report is recent enough
+TOLERANCE = pd.Timedelta(hours=3)
+# visibility in km, wind speed in km/h as WeatherReport stores it; the last
+# bin is open-ended
+VISIBILITY_BANDS = ([0, 1, 3, 5, 10, np.inf], ["< 1 km", "1-3 km", "3-5 km", "5-10 km", "10+ km"])
+WIND_BANDS = ([0, 10, 25, 40, 60, np.inf], ["< 10 km/h", "10-25 km/h", "25-40 km/h", "40-60 km/h", "60+ km/h"])
+NO_REPORT = "No report"
+LONG_DELAY_MINUTES = 60
+
+DELAY_COLUMNS = ["id", "minutes_delayed", "flight__route__departure_airport_id", "flight__departure_time"]
+WEATHER_COLUMNS = ["airport_id", "timestamp", "conditions", "visibility", "wind_speed"]
+
+
+def _frame(queryset, columns, names, time_column):
+    # streamed in chunks rather than materialising model instances
+    frame = pd.DataFrame.from_records(queryset.values_list(*columns).iterator(chunk_size=50000), columns=names)
+    frame[time_column] = pd.to_datetime(frame[time_column], utc=True)
+    return frame
+
+
+def load_delays(start=None, end=None):
+    delays = Delay.objects.filter(flight__route__departure_airport__isnull=False)
+    if start is not None:
+        delays = delays.filter(flight__departure_time__gte=start)
+    if end is not None:
+        delays = delays.filter(flight__departure_time__lt=end)
+    return _frame(delays, DELAY_COLUMNS, ["id", "minutes_delayed", "airport_id", "at"], "at")
+
+
+def load_weather(start=None, end=None):
+    reports = WeatherReport.objects.all()
+    if start is not None:
+        reports = reports.filter(timestamp__gte=start - TOLERANCE)
+    if end is not None:
+        reports = reports.filter(timestamp__lt=end)
+    return _frame(reports, WEATHER_COLUMNS, ["airport_id", "at", "conditions", "visibility", "wind_speed"], "at")
+
+
+def match_weather(delays, weather, tolerance=TOLERANCE):
+    # as-of join: both sides sorted by time and matched per airport with the
+    # nearest prior report; delays without one inside `tolerance` keep NaN
+    delays = delays.sort_values("at", kind="stable")
+    weather = weather.sort_values("at", kind="stable").rename(columns={"at": "reported_at"})
+    weather["at"] = weather["reported_at"]
+    matched = pd.merge_asof(
+        delays.astype({"airport_id": "int64", "minutes_delayed": "int64"}), weather.astype({"airport_id": "int64", "visibility": "float64", "wind_speed": "float64"}),
+        on="at", by="airport_id", direction="backward", tolerance=tolerance,
+    )
+    matched["visibility_band"] = pd.cut(matched["visibility"], VISIBILITY_BANDS[0], labels=VISIBILITY_BANDS[1], right=False)
+    matched["wind_band"] = pd.cut(matched["wind_speed"], WIND_BANDS[0], labels=WIND_BANDS[1], right=False)
+    return matched
+
+
+def _stats(matched, column, order=None):
+    keys = matched[column].astype(object).where(matched[column].notna(), NO_REPORT)
+    minutes = matched["minutes_delayed"]
+    grouped = minutes.groupby(keys, sort=False)
+    stats = pd.DataFrame({
+        "delays": grouped.size(),
+        "avg_minutes": grouped.mean(),
+        "median_minutes": grouped.median(),
+        "p90_minutes": grouped.quantile(0.9),
+        "long_delay_pct": (minutes >= LONG_DELAY_MINUTES).groupby(keys, sort=False).mean() * 100,
+    }).rename_axis(column.replace("_band", "")).reset_index()
+    if order is not None:
+        rank = {label: position for position, label in enumerate([*order, NO_REPORT])}
+        return stats.sort_values(stats.columns[0], key=lambda labels: labels.map(rank), ignore_index=True)
+    return stats.sort_values("delays", ascending=False, ignore_index=True)
+
+
+def analyse_weather_impact(matched):
+    # delay statistics by condition, visibility band and wind band; delays
+    # with no report in tolerance are grouped under NO_REPORT
+    return {
+        "conditions": _stats(matched, "conditions"),
+        "visibility": _stats(matched, "visibility_band", VISIBILITY_BANDS[1]),
+        "wind": _stats(matched, "wind_band", WIND_BANDS[1]),
+    }
+
+
+def get_weather_impact(start=None, end=None, tolerance=TOLERANCE):
+    # analyse_weather_impact as one frame, with the dimension in a column
+    # and each table's first column as "band"
+    matched = match_weather(load_delays(start, end), load_weather(start, end), tolerance)
+    return pd.concat(
+        [stats.rename(columns={dimension: "band"}).assign(dimension=dimension)
+         for dimension, stats in analyse_weather_impact(matched).items()],
+        ignore_index=True,
+    )